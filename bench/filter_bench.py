@@ -0,0 +1,119 @@
+"""
+Micro-benchmark: Watchlist tab filtering on a synthetic offers table.
+
+Builds a random CSV-shaped offers table (default 1M rows), then times one
+filter combination (countries + services + owned services + sources, and the
+movies/countries/providers counts) two ways:
+
+- the original pandas path from app.py: isin masks, an OR loop of
+  str.contains per owned pattern, apply() over the source strings,
+  drop_duplicates + groupby aggregate, iterrows() for the counts
+- watchlist_data.WatchlistData: codes and bitmasks built once, then
+  row_mask() + counts() (+ movies() for the per-movie lists)
+
+Usage (from the repo root):
+    python bench/filter_bench.py [--rows 1000000] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+from providers import OWNED_SERVICES  # noqa: E402
+from watchlist_data import WatchlistData  # noqa: E402
+
+SOURCES = ["Watchlist", "Mubi", "Criterion", "Tarkovsky", "Noir", "Prime VPN", "Filmin", "Alyssa"]
+
+
+def synthetic_offers(rows, seed=0):
+    """Random offers: ~rows/20 films, 40 countries, 150 providers, 1-2 sources per film."""
+    rng = np.random.default_rng(seed)
+    n_films = max(1, rows // 20)
+    countries = [f"C{i:02d}" for i in range(40)]
+    providers = [p for names in OWNED_SERVICES.values() for p in names]
+    providers += [f"Provider {i}" for i in range(150 - len(providers))]
+
+    film = rng.integers(0, n_films, rows)
+    film_sources = np.array([
+        ", ".join(sorted(set(rng.choice(SOURCES, rng.integers(1, 3)))))
+        for _ in range(n_films)
+    ], dtype=object)
+    return pd.DataFrame({
+        "title": pd.Series(film).map(lambda f: f"Film {f}"),
+        "year": 1950 + film % 70,
+        "country": np.array(countries, dtype=object)[rng.integers(0, len(countries), rows)],
+        "provider": np.array(providers, dtype=object)[rng.integers(0, len(providers), rows)],
+        "poster_url": pd.Series(film).map(lambda f: f"https://image.tmdb.org/t/p/w500/{f}.jpg"),
+        "runtime": 80 + film % 100,
+        "last_updated": "2026-10-01",
+        "source": film_sources[film],
+    })
+
+
+def pandas_filter(df, countries, services, owned, sources):
+    """The pre-optimisation app.py filter chain."""
+    filtered_df = df[df["country"].isin(countries) & df["provider"].isin(services)]
+    mask = pd.Series(False, index=filtered_df.index)
+    for pattern in [p for label in owned for p in OWNED_SERVICES[label]]:
+        mask = mask | filtered_df["provider"].str.contains(pattern, regex=False)
+    filtered_df = filtered_df[mask]
+    source_mask = filtered_df["source"].fillna("").apply(lambda val: any(s in val for s in sources))
+    filtered_df = filtered_df[source_mask]
+    filtered_df = filtered_df.drop_duplicates(subset=["title", "year", "country", "provider"], keep="first")
+    movies = filtered_df.groupby(["title", "year"]).agg({
+        "country": list, "provider": list, "poster_url": "first", "runtime": "first",
+    }).reset_index()
+    unique_countries, unique_providers = set(), set()
+    for _, m in movies.iterrows():
+        unique_countries.update(m["country"])
+        unique_providers.update(m["provider"])
+    return len(movies), len(unique_countries), len(unique_providers)
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    df = synthetic_offers(args.rows)
+    build, data = timed(lambda: WatchlistData(df, OWNED_SERVICES), 1)
+    print(f"{len(df):,} rows, {len(data.films):,} films; one-time build {build * 1000:.0f} ms")
+
+    countries = data.countries[: len(data.countries) // 2]
+    services = data.services
+    owned = ["Netflix", "Prime", "Filmin"]
+    sources = ["Watchlist", "Mubi"]
+
+    baseline, expected = timed(lambda: pandas_filter(df, countries, services, owned, sources), 1)
+    mask_time, counts = timed(lambda: data.counts(data.row_mask(countries, services, owned, sources)), args.repeat)
+    movies_time, _ = timed(lambda: data.movies(data.row_mask(countries, services, owned, sources)), args.repeat)
+    if counts != expected:
+        sys.exit(f"Mismatch: engine {counts} vs pandas {expected}")
+
+    print(f"{'path':<34}{'ms':>10}{'speedup':>10}")
+    for name, seconds in (("pandas (original app.py)", baseline),
+                          ("row_mask + counts", mask_time),
+                          ("row_mask + movies aggregate", movies_time)):
+        print(f"{name:<34}{seconds * 1000:>10.1f}{baseline / seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: per-film vs batched JustWatch lookups against the local mock.
+
+Resolves and fetches offers for synthetic films (every third one also with a
+localized title, as TMDB provides) two ways, on a thread pool like the scan:
+
+- per film: resolve_movie_id + get_streaming_offers (1-2 searches + 1 offers
+  request per film)
+- batched: justwatch_batch.resolve_movie_ids + streaming_offers_batch per
+  chunk of --batch-size films
+
+and reports round trips, wall time and whether both produced the same node
+IDs and offers. `--max-aliases` makes the mock reject big batches, to
+exercise the single-query fallback.
+
+Usage (from the repo root):
+    python bench/justwatch_batch_bench.py [--films 200] [--batch-size 10] [--latency 0.08]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+import justwatch_query  # noqa: E402
+from justwatch_batch import resolve_movie_ids, streaming_offers_batch  # noqa: E402
+from justwatch_query import resolve_movie_id, get_streaming_offers  # noqa: E402
+from mock_upstreams import MockJustWatch, film_year  # noqa: E402
+from rate_limit import configure_limiter  # noqa: E402
+
+COUNTRIES = ["US", "ES", "GB", "FR", "DE", "IT"]
+
+
+def synthetic_films(n):
+    films = []
+    for i in range(n):
+        title = f"Film Number {i}"
+        local = f"La Película {i}" if i % 3 == 0 else None
+        # The mock dates each title by hash; the local title must agree for a match
+        films.append((title, film_year(local or title), local))
+    return films
+
+
+def per_film(films, workers):
+    def one(film):
+        title, year, local = film
+        node_id, confidence = resolve_movie_id(title, year, local_title=local)
+        return node_id, get_streaming_offers(node_id, COUNTRIES) if node_id else {}
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(one, films))
+
+
+def batched(films, workers, batch_size):
+    def chunk_lookup(chunk):
+        node_ids = [node_id for node_id, _ in resolve_movie_ids(chunk, batch_size)]
+        found = [n for n in node_ids if n]
+        offers = iter(streaming_offers_batch(found, COUNTRIES, batch_size))
+        return [(n, next(offers) if n else {}) for n in node_ids]
+    chunks = [films[i:i + batch_size] for i in range(0, len(films), batch_size)]
+    with ThreadPoolExecutor(workers) as executor:
+        return [r for results in executor.map(chunk_lookup, chunks) for r in results]
+
+
+def run(name, fn, mock):
+    before = mock.requests
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = fn()
+    return name, time.perf_counter() - start, mock.requests - before, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--films", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.08, help="Mock seconds per response")
+    parser.add_argument("--rps", type=float, default=0.0, help="Client JustWatch req/s (0 = unlimited)")
+    parser.add_argument("--max-aliases", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    mock = MockJustWatch(latency=args.latency, max_aliases=args.max_aliases).start()
+    justwatch_query.GRAPHQL_URL = mock.url
+    configure_limiter("justwatch", args.rps)
+    films = synthetic_films(args.films)
+
+    rows = [
+        run("per film", lambda: per_film(films, args.workers), mock),
+        run(f"batched ({args.batch_size}/request)", lambda: batched(films, args.workers, args.batch_size), mock),
+    ]
+    mock.stop()
+
+    print(f"{len(films)} films, {len(COUNTRIES)} countries, {args.workers} workers, "
+          f"{args.latency * 1000:.0f} ms mock latency")
+    print(f"{'path':<26}{'requests':>10}{'seconds':>10}")
+    for name, seconds, requests, _ in rows:
+        print(f"{name:<26}{requests:>10}{seconds:>10.2f}")
+    baseline, batch = rows[0][3], rows[1][3]
+    same = [(n, o and {c: sorted(p) for c, p in o.items()}) for n, o in baseline] == \
+           [(n, o and {c: sorted(p) for c, p in o.items()}) for n, o in batch]
+    print(f"round trips cut {rows[0][2] / max(1, rows[1][2]):.1f}x; results identical: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Micro-benchmark: scoring JustWatch search results against target titles.
+
+Scores --candidates synthetic search results (accented, punctuated,
+multilingual titles, like JustWatch returns) against each of --films target
+titles two ways:
+
+- the original justwatch_query path: NFD + a per-character
+  unicodedata.category loop + a regex per normalize(), and the stopword set
+  rebuilt on every validate_match(); once first-hit-wins, and once scoring
+  every result (what ranking them costs on that path)
+- justwatch_query.best_match: str.translate accent folding, cached
+  per-title tokens, the best-scoring result picked
+
+and checks that both accept the same matches.
+
+Usage (from the repo root):
+    python bench/match_bench.py [--films 2000] [--candidates 10] [--repeat 3]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+import unicodedata
+from collections import namedtuple
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+import justwatch_query  # noqa: E402
+
+# Shaped like simplejustwatchapi's MediaEntry as far as matching goes
+Result = namedtuple("Result", "entry_id title release_year object_type")
+
+WORDS = ["The", "Amélie", "Cité", "des", "Enfants", "Perdus", "Noir", "de", "la", "L'Été", "Straße", "Alien",
+         "Space", "Odyssey", "Crónica", "Año", "Ça", "Rêve", "Children", "Paradise", "Smultronstället",
+         "Ōkami", "Çocuklar", "Dziewczyna", "Łódź", "Mélodie", "Brief", "Encounter", "Night", "Río"]
+
+
+def old_normalize(text):
+    text = unicodedata.normalize('NFD', text.lower())
+    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+    text = re.sub(r'[^\w\s]', '', text)
+    return text.strip()
+
+
+def old_validate_match(target_title, target_year, found_title, found_year):
+    if found_year is None or abs(target_year - found_year) > 1:
+        return False
+    target_words = set(old_normalize(target_title).split())
+    found_words = set(old_normalize(found_title).split())
+    stopwords = {'the', 'a', 'an', 'of', 'in', 'on', 'at', 'to', 'and', 'or',
+                 'el', 'la', 'los', 'las', 'de', 'del', 'en', 'un', 'una', 'y',
+                 'le', 'les', 'des', 'du', 'et', 'der', 'die', 'das', 'und'}
+    significant = {w for w in target_words if len(w) > 2 and w not in stopwords}
+    if not significant:
+        significant = target_words
+    matched = sum(1 for w in significant if w in found_words)
+    if len(significant) <= 2:
+        return matched >= len(significant)
+    return matched >= max(2, len(significant) // 2)
+
+
+def old_match_confidence(target_title, target_year, found_title, found_year):
+    if not old_validate_match(target_title, target_year, found_title, found_year):
+        return 0.0
+    if old_normalize(target_title) == old_normalize(found_title):
+        return 1.0 if target_year == found_year else 0.9
+    return 0.6
+
+
+def old_pick(results, title, target_year):
+    """First-hit-wins, as before."""
+    for r in results:
+        if r.object_type == "MOVIE" and old_match_confidence(title, target_year, r.title, r.release_year):
+            return r
+    return None
+
+
+def old_score_all(results, title, target_year):
+    return [old_match_confidence(title, target_year, r.title, r.release_year)
+            for r in results if r.object_type == "MOVIE"]
+
+
+def synthetic_searches(films, candidates, seed=0):
+    """[(results, title, year)]: each film's results hold near-misses plus (usually) the film itself."""
+    rng = random.Random(seed)
+    searches = []
+    for i in range(films):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5)))
+        year = 1930 + i % 90
+        results = []
+        for k in range(candidates):
+            words = title.split()
+            if k and words and rng.random() < 0.6:
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+            if rng.random() < 0.3:
+                words.append(rng.choice(WORDS))
+            results.append(Result(f"tm{i}-{k}", " ".join(words) + rng.choice(["", ":", "!", " (Restored)"]),
+                                  year + rng.choice([0, 0, 1, -1, 3]), rng.choice(["MOVIE"] * 4 + ["SHOW"])))
+        rng.shuffle(results)
+        searches.append((results, title, year))
+    return searches
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--films", type=int, default=2000)
+    parser.add_argument("--candidates", type=int, default=10, help="Search results per film")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    searches = synthetic_searches(args.films, args.candidates)
+    first_hit, old = timed(lambda: [old_pick(*s) for s in searches], args.repeat)
+    baseline, _ = timed(lambda: [old_score_all(*s) for s in searches], args.repeat)
+    justwatch_query.title_tokens.cache_clear()
+    cold, _ = timed(lambda: [justwatch_query.best_match(*s) for s in searches], 1)
+    warm, new = timed(lambda: [justwatch_query.best_match(*s) for s in searches], args.repeat)
+
+    accepted_old = [r is not None for r in old]
+    accepted_new = [m is not None for m in new]
+    if accepted_old != accepted_new:
+        sys.exit("Mismatch: the two paths accept different films")
+    reranked = sum(1 for r, m in zip(old, new) if r is not None and r is not m[1])
+
+    print(f"{args.films} films x {args.candidates} results, {sum(accepted_new)} matched, "
+          f"{reranked} now pick a better-scoring result than the first hit")
+    print(f"{'path':<36}{'ms':>10}{'speedup':>10}")
+    for name, seconds in (("original, first hit only", first_hit),
+                          ("original, every result scored", baseline),
+                          ("best_match (cold token cache)", cold),
+                          ("best_match (warm token cache)", warm)):
+        print(f"{name:<36}{seconds * 1000:>10.1f}{baseline / seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: streaming a scan's offers into the store and merging them, by store size.
+
+For each --rows size, a child process builds a synthetic store (filter_bench's
+generator), stages a rescan of --rescan of its films through OfferSink (with
+fresh offers for --countries countries), merges it (prune, replace, change
+log) and exports the CSV. Reports the merge and export times and how much the
+child's peak RSS grew past the point where the store was built, which should
+stay flat as the store grows.
+
+Usage (from the repo root):
+    python bench/merge_bench.py [--rows 100000 --rows 800000] [--rescan 0.2]
+"""
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if platform.system() == "Darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+
+def run_one(rows, rescan, countries):
+    """One size, in this process. Returns a result dict."""
+    from filter_bench import synthetic_offers
+    from offers_store import OfferSink, export_csv, save_offers
+
+    with tempfile.TemporaryDirectory(prefix="lbjw-merge-") as tmp:
+        store = Path(tmp) / "offers.sqlite"
+        df = synthetic_offers(rows, seed=1)
+        save_offers(df, store)
+        films = list(df[["title", "year"]].drop_duplicates().itertuples(index=False, name=None))
+        del df
+        baseline = _peak_rss_mb()
+
+        start = time.perf_counter()
+        sink = OfferSink(store)
+        scanned = films[: int(len(films) * rescan)]
+        for position, (title, year) in enumerate(scanned):
+            offers = [(f"C{(position + i) % 40:02d}", "Netflix") for i in range(countries)]
+            sink.add(position, title, year, offers, runtime=100, sources=["Watchlist"], last_updated="2026-01-01")
+        merged = sink.merge(films[len(films) // 50:])  # 2% of the films left every source
+        sink.close()
+        merge_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        exported = export_csv(store, Path(tmp) / "offers.csv")
+        export_s = time.perf_counter() - start
+        return {
+            "rows": rows, "films": len(films), "staged": len(scanned), "rows_after": exported,
+            "events": sum(merged["events"].values()), "merge_s": merge_s, "export_s": export_s,
+            "rss_growth_mb": _peak_rss_mb() - baseline,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, action="append", help="Store size in offer rows (repeatable)")
+    parser.add_argument("--rescan", type=float, default=0.2, help="Share of the films staged as rescanned")
+    parser.add_argument("--countries", type=int, default=10, help="Offers per staged film")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_one(args.rows[0], args.rescan, args.countries)))
+        return
+
+    print(f"{'rows':>9}{'staged':>9}{'events':>9}{'merge s':>9}{'export s':>10}{'RSS growth MiB':>16}")
+    for rows in args.rows or [100_000, 400_000, 800_000]:
+        child = subprocess.run(
+            [sys.executable, __file__, "--child", "--rows", str(rows),
+             "--rescan", str(args.rescan), "--countries", str(args.countries)],
+            capture_output=True, text=True, check=True,
+        )
+        r = json.loads(child.stdout.splitlines()[-1])
+        print(f"{r['rows']:>9}{r['staged']:>9}{r['events']:>9}{r['merge_s']:>9.2f}{r['export_s']:>10.2f}"
+              f"{r['rss_growth_mb']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Local stand-ins for Letterboxd, TMDB and the JustWatch GraphQL endpoint.
+
+All three serve one deterministic fake catalogue, so a scan against them
+resolves every film the way a real one would:
+
+- MockLetterboxd: a user's watchlist and lists (72 posters per page, with
+  pagination, film counts and ETags so list_sync can skip unchanged lists)
+- MockTmdb: /search/movie and /movie/<id> (runtime, poster, no translations)
+- MockJustWatch: search (`popularTitles`) and offers (`node`) queries,
+  aliased or not; every searched title is a MOVIE from film_year(title),
+  every node has 0-3 offers per country
+
+Each server can add latency, answer 429 (+ Retry-After) above a request rate
+or for a random share of requests, and counts what it served. Point the app
+at them with LETTERBOXD_URL, TMDB_API_URL and JUSTWATCH_GRAPHQL_URL, e.g.:
+
+    python bench/mock_upstreams.py --latency 0.05
+    (then export the printed variables and run src/main.py)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PROVIDERS = ["Netflix", "Amazon Prime Video", "HBO Max", "Disney Plus", "Filmin", "Mubi", "Apple TV Plus"]
+MONETIZATION = ["FLATRATE", "FREE", "ADS", "RENT", "BUY"]
+POSTERS_PER_PAGE = 72
+
+
+def _hash(text):
+    return zlib.crc32(text.encode())
+
+
+def film_year(title):
+    """Release year every mock reports for `title`."""
+    return 1950 + _hash(title) % 70
+
+
+def film_title(i):
+    return f"Bench Film {i}"
+
+
+def film_slug(i):
+    return f"bench-film-{i}"
+
+
+class MockServer:
+    """Threaded HTTP server with latency, 429 injection and request counters."""
+
+    def __init__(self, port=0, latency=0.0, rps=0.0, throttle_rate=0.0, retry_after=None, seed=0):
+        self.latency = latency
+        self.rps = rps
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._tokens = max(1.0, rps)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.throttled = 0
+
+    def _admit(self):
+        """False if this request gets a 429 (rate above `rps`, or a random `throttle_rate` hit)."""
+        with self._lock:
+            self.requests += 1
+            admitted = self._random.random() >= self.throttle_rate
+            if admitted and self.rps > 0:
+                now = time.monotonic()
+                self._tokens = min(max(1.0, self.rps), self._tokens + (now - self._updated) * self.rps)
+                self._updated = now
+                admitted = self._tokens >= 1
+                if admitted:
+                    self._tokens -= 1
+            if not admitted:
+                self.throttled += 1
+            return admitted
+
+    def handle(self, method, path, params, headers, body):
+        """Return (status, headers, payload bytes). Overridden per upstream."""
+        raise NotImplementedError
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if not mock._admit():
+                    status, headers, payload = 429, [], b""
+                    if mock.retry_after is not None:
+                        # delta-seconds must be an integer (urllib3 rejects "0.5")
+                        headers.append(("Retry-After", str(math.ceil(mock.retry_after))))
+                else:
+                    if mock.latency:
+                        time.sleep(mock.latency)
+                    url = urlsplit(self.path)
+                    params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                    status, headers, payload = mock.handle(method, url.path, params, self.headers, body)
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+        return Handler
+
+
+def _json(payload, status=200):
+    return status, [("Content-Type", "application/json")], json.dumps(payload).encode()
+
+
+class MockLetterboxd(MockServer):
+    """
+    /<user>/watchlist/ with `watchlist` films and /<user>/lists/ with `lists`
+    lists of `list_size` films each. Films are numbered; lists overlap the
+    watchlist by half so sources share films like real libraries do.
+    """
+
+    def __init__(self, user="benchuser", watchlist=300, lists=3, list_size=100, **kwargs):
+        super().__init__(**kwargs)
+        self.user = user
+        self.sources = {"watchlist": list(range(watchlist))}
+        for k in range(lists):
+            start = watchlist // 2 + k * list_size // 2
+            self.sources[f"list/bench-list-{k}"] = list(range(start, start + list_size))
+
+    def _films_page(self, key, page):
+        films = self.sources[key]
+        pages = max(1, -(-len(films) // POSTERS_PER_PAGE))
+        if page > pages:
+            return None
+        base = f"/{self.user}/{key}/"
+        posters = "".join(
+            f'<li class="poster-container"><div class="react-component" data-component-class="LazyPoster" '
+            f'data-item-slug="{film_slug(i)}" data-item-name="{film_title(i)} ({film_year(film_title(i))})" '
+            f'data-item-link="/film/{film_slug(i)}/"></div></li>'
+            for i in films[(page - 1) * POSTERS_PER_PAGE:page * POSTERS_PER_PAGE]
+        )
+        pagination = "".join(f'<li class="paginate-page"><a href="{base}page/{p}/">{p}</a></li>'
+                             for p in range(1, pages + 1)) if pages > 1 else ""
+        next_link = f'<a class="next" href="{base}page/{page + 1}/">Older</a>' if page < pages else ""
+        return (
+            f'<!DOCTYPE html><html><head><meta charset="UTF-8"><title>{key}</title>'
+            f'<meta name="description" content="A list of {len(films)} films compiled on Letterboxd.">'
+            f'</head><body><ul class="poster-list">{posters}</ul>'
+            f'<div class="pagination">{next_link}<ul>{pagination}</ul></div></body></html>'
+        )
+
+    def _lists_page(self):
+        items = "".join(
+            f'<section class="list-set"><h2 class="name"><a href="/{self.user}/{key}/">'
+            f'Bench List {key.rsplit("-", 1)[1]}</a></h2></section>'
+            for key in self.sources if key != "watchlist"
+        )
+        return f'<!DOCTYPE html><html><head><meta charset="UTF-8"></head><body>{items}</body></html>'
+
+    def handle(self, method, path, params, headers, body):
+        match = re.fullmatch(rf"/{re.escape(self.user)}/(.+?)/(?:page/(\d+)/)?", path)
+        html = None
+        if match and match.group(1) == "lists":
+            html = self._lists_page() if (match.group(2) or "1") == "1" else None
+        elif match and match.group(1) in self.sources:
+            html = self._films_page(match.group(1), int(match.group(2) or 1))
+        if html is None:
+            return 404, [], b"Not found"
+        etag = f'"{hashlib.sha1(html.encode()).hexdigest()}"'
+        if headers.get("If-None-Match") == etag:
+            return 304, [("ETag", etag)], b""
+        return 200, [("Content-Type", "text/html; charset=utf-8"), ("ETag", etag)], html.encode()
+
+
+class MockTmdb(MockServer):
+    """TMDB v3 search + details; titles starting with "Bench Film" are known."""
+
+    def handle(self, method, path, params, headers, body):
+        if path.endswith("/search/movie"):
+            title = params.get("query", "")
+            if not title.startswith("Bench Film"):
+                return _json({"results": []})
+            return _json({"results": [{
+                "id": _hash(title) % 1_000_000, "title": title,
+                "release_date": f"{film_year(title)}-01-01", "poster_path": f"/{_hash(title)}.jpg",
+            }]})
+        match = re.search(r"/movie/(\d+)$", path)
+        if match:
+            movie_id = int(match.group(1))
+            return _json({"id": movie_id, "imdb_id": f"tt{movie_id:07d}", "runtime": 80 + movie_id % 90,
+                          "original_language": "en", "translations": {"translations": []}})
+        return _json({"status_message": "not found"}, 404)
+
+
+SEARCH_FIELD = re.compile(r"(?:(\w+):\s*)?popularTitles\(([^)]*)\)")
+NODE_FIELD = re.compile(r"(?:(\w+):\s*)?node\(id:\s*\$(\w+)\)")
+COUNTRY_FIELD = re.compile(r"\w+:\s*offers\(country:\s*(\w+)")
+FILTER_VAR = re.compile(r"filter:\s*\$(\w+)")
+
+
+def node_id(title):
+    return f"tm{_hash(title)}"
+
+
+def search_node(title):
+    return {
+        "id": node_id(title), "objectId": _hash(title), "objectType": "MOVIE",
+        "content": {"title": title, "originalReleaseYear": film_year(title), "fullPath": f"/movie/{node_id(title)}"},
+        "offers": [],
+    }
+
+
+def country_offers(node, country):
+    seed = _hash(f"{node}/{country}")
+    return [
+        {
+            "id": f"{node}-{country}-{k}",
+            "monetizationType": MONETIZATION[(seed >> (3 * k)) % len(MONETIZATION)],
+            "package": {"packageId": (seed >> k) % len(PROVIDERS),
+                        "clearName": PROVIDERS[(seed >> k) % len(PROVIDERS)]},
+        }
+        for k in range(seed % 4)
+    ]
+
+
+class MockJustWatch(MockServer):
+    """
+    GraphQL endpoint for the search and offers queries. `max_aliases` rejects
+    queries with more root fields with a complexity error (0 = no limit).
+    """
+
+    def __init__(self, max_aliases=0, **kwargs):
+        super().__init__(**kwargs)
+        self.max_aliases = max_aliases
+        self.fields = 0
+
+    @property
+    def url(self):
+        return f"{self.base_url}/graphql"
+
+    def answer(self, body):
+        query, variables = body["query"], body.get("variables", {})
+        data = {}
+        for alias, args in SEARCH_FIELD.findall(query):
+            title = variables[FILTER_VAR.search(args).group(1)]["searchQuery"]
+            data[alias or "popularTitles"] = {"edges": [{"node": search_node(title)}]}
+        countries = COUNTRY_FIELD.findall(query)
+        for alias, var in NODE_FIELD.findall(query):
+            data[alias or "node"] = {c: country_offers(variables[var], c) for c in countries}
+        with self._lock:
+            self.fields += len(data)
+        if self.max_aliases and len(data) > self.max_aliases:
+            return {"errors": [{"message": "query complexity too high"}], "data": None}
+        return {"data": data}
+
+    def handle(self, method, path, params, headers, body):
+        return _json(self.answer(json.loads(body)))
+
+
+def start_upstreams(latency=0.0, throttle_rate=0.0, retry_after=None, **letterboxd):
+    """Start all three mocks; returns ({name: server}, {env var: base URL})."""
+    common = {"latency": latency, "throttle_rate": throttle_rate, "retry_after": retry_after}
+    servers = {
+        "letterboxd": MockLetterboxd(**letterboxd, **common).start(),
+        "tmdb": MockTmdb(**common).start(),
+        "justwatch": MockJustWatch(**common).start(),
+    }
+    env = {
+        "LETTERBOXD_URL": servers["letterboxd"].base_url,
+        "TMDB_API_URL": f"{servers['tmdb'].base_url}/3",
+        "JUSTWATCH_GRAPHQL_URL": servers["justwatch"].url,
+    }
+    return servers, env
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--watchlist", type=int, default=300)
+    parser.add_argument("--lists", type=int, default=3)
+    parser.add_argument("--list-size", type=int, default=100)
+    args = parser.parse_args(argv)
+    servers, env = start_upstreams(args.latency, args.throttle_rate, args.retry_after,
+                                   watchlist=args.watchlist, lists=args.lists, list_size=args.list_size)
+    print(f"Letterboxd user: {servers['letterboxd'].user}")
+    for name, value in env.items():
+        print(f"export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: Letterboxd list-page parsing.
+
+Compares the original full-tree BeautifulSoup("html.parser") extraction with
+the fast paths in letterbox_scraper.parse_films_page (lxml, and the
+streaming html.parser scanner used when lxml is not installed), on the
+pages in bench/fixtures/letterboxd/ (synthetic pages modelled on
+Letterboxd's list/watchlist markup, ~90 KB and 72 posters each).
+
+Peak memory comes from tracemalloc, which only sees Python allocations:
+lxml's C-level tree is not included in its figure.
+
+Usage (from the repo root):
+    python bench/parse_bench.py [--repeat 20]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+import letterbox_scraper  # noqa: E402
+from letterbox_scraper import YEAR_RE, _page_count  # noqa: E402
+
+FIXTURES = BENCH_DIR / "fixtures" / "letterboxd"
+
+
+def parse_full_tree(html):
+    """The pre-optimisation scrape_films extraction: full html.parser tree."""
+    soup = BeautifulSoup(html, "html.parser")
+    films = []
+    for comp in soup.find_all("div", class_="react-component"):
+        slug = comp.get("data-item-slug")
+        title_raw = comp.get("data-item-name") or ""
+        if not slug:
+            continue
+        year_match = YEAR_RE.search(title_raw)
+        year = int(year_match.group(1)) if year_match else None
+        title = YEAR_RE.sub("", title_raw).strip()
+        films.append({"title": title, "year": year, "slug": slug})
+    return films, _page_count(soup), soup.find("a", class_="next") is not None
+
+
+PARSERS = {
+    "html.parser (full tree)": parse_full_tree,
+    "streaming fallback": letterbox_scraper._parse_films_page_stream,
+    "lxml fast path": letterbox_scraper._parse_films_page_lxml,
+}
+
+
+def measure(parse, html, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(html)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    pages = sorted(FIXTURES.glob("*.html"))
+    if not pages:
+        sys.exit(f"No fixtures in {FIXTURES}")
+
+    print(f"{'page':<24}{'parser':<26}{'ms/page':>10}{'peak KiB':>12}{'speedup':>10}")
+    for page in pages:
+        html = page.read_text()
+        expected = parse_full_tree(html)
+        baseline = None
+        for name, parse in PARSERS.items():
+            if parse(html) != expected:
+                sys.exit(f"{name} disagrees with the baseline on {page.name}")
+            median, peak = measure(parse, html, args.repeat)
+            baseline = baseline or median
+            print(f"{page.name:<24}{name:<26}{median * 1000:>10.2f}{peak / 1024:>12.0f}{baseline / median:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
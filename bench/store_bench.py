@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: offers dataset on disk, CSV vs the normalized SQLite store.
+
+Loads data/unwatched_by_country.csv (or --csv), optionally scales it up by
+replicating films under new titles (--scale), and compares file size, load
+time and in-memory footprint of pd.read_csv against offers_store.load_offers.
+
+Usage (from the repo root):
+    python bench/store_bench.py [--scale 1 --scale 20] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+from offers_store import save_offers, load_offers  # noqa: E402
+
+DEFAULT_CSV = BENCH_DIR.parent / "data" / "unwatched_by_country.csv"
+
+
+def replicate(df, scale):
+    """`scale` copies of the dataset, each under distinct film titles."""
+    if scale == 1:
+        return df
+    copies = [df.assign(title=df["title"] + f" #{i}") if i else df for i in range(scale)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--csv", type=Path, default=DEFAULT_CSV)
+    parser.add_argument("--scale", type=int, action="append", help="Replication factor (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if not args.csv.exists():
+        sys.exit(f"No dataset at {args.csv}")
+    base = pd.read_csv(args.csv)
+
+    print(f"{'rows':>8}{'format':>8}{'size KiB':>10}{'load ms':>10}{'mem KiB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scale or [1, 20]:
+            df = replicate(base, scale)
+            csv_path = Path(tmp) / f"offers_{scale}.csv"
+            store_path = Path(tmp) / f"offers_{scale}.sqlite"
+            df.to_csv(csv_path, index=False)
+            save_offers(df, store_path)
+
+            for name, path, load in (("csv", csv_path, pd.read_csv), ("sqlite", store_path, load_offers)):
+                seconds, loaded = median_time(lambda: load(path), args.repeat)
+                print(f"{len(df):>8}{name:>8}{path.stat().st_size / 1024:>10.0f}"
+                      f"{seconds * 1000:>10.1f}{loaded.memory_usage(deep=True).sum() / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
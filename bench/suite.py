@@ -0,0 +1,248 @@
+"""
+Benchmark suite: end-to-end scans and hot-path microbenchmarks, all offline.
+
+Scans run main.main() in a child process against the local stand-ins in
+mock_upstreams (no live Letterboxd, TMDB or JustWatch), in a temporary data
+directory:
+
+- cold: empty data directory, every film is new
+- warm: same sources again, nothing changed (list sync and caches hit)
+- full: --full-scan, every known film re-checked
+
+Each reports wall time, requests (and 429s) per upstream, the child's peak
+RSS and offer rows written per second.
+
+Microbenchmarks, in process: scrape_films (mock Letterboxd),
+get_film_offers_api (mock JustWatch, search + offers), find_new_availability
+and the app's Watchlist filter path (WatchlistData row_mask + counts +
+movies) on synthetic offers tables.
+
+--save writes the results as JSON; --compare reports every metric against a
+saved baseline and exits non-zero if one got worse by more than --tolerance.
+
+Usage (from the repo root):
+    python bench/suite.py [--films 300] [--latency 0.02] [--throttle-rate 0.05] [--save base.json]
+    python bench/suite.py --compare base.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+import justwatch_query  # noqa: E402
+import letterbox_scraper  # noqa: E402
+from alert_service import find_new_availability  # noqa: E402
+from filter_bench import synthetic_offers  # noqa: E402
+from justwatch_query import get_film_offers_api  # noqa: E402
+from letterbox_scraper import make_fetcher, scrape_films  # noqa: E402
+from mock_upstreams import MockJustWatch, MockLetterboxd, start_upstreams, film_title, film_year  # noqa: E402
+from offers_store import load_dataset  # noqa: E402
+from providers import OWNED_SERVICES  # noqa: E402
+from rate_limit import configure_limiter  # noqa: E402
+from watchlist_data import WatchlistData  # noqa: E402
+
+SCENARIOS = [("cold", []), ("warm", []), ("full", ["--full-scan"])]
+COUNTRIES = ["US", "ES", "GB", "FR", "DE"]
+
+# Metrics where a bigger number is better; everything else is a cost
+HIGHER_IS_BETTER = {"rows_per_s", "per_s"}
+
+
+def _peak_rss_mb(rusage) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if platform.system() == "Darwin" else 1024
+    return rusage.ru_maxrss * scale / 2 ** 20
+
+
+def run_scan(argv, env, log_path):
+    """Run main.main(argv) in a child process. Returns (seconds, peak RSS MiB, exit code)."""
+    code = f"import sys; sys.path.insert(0, {str(SRC_DIR)!r}); import main; main.main({argv!r})"
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        child = subprocess.Popen([sys.executable, "-c", code], env=env, cwd=SRC_DIR,
+                                 stdout=log, stderr=subprocess.STDOUT)
+        _, status, rusage = os.wait4(child.pid, 0)
+    return time.perf_counter() - start, _peak_rss_mb(rusage), os.waitstatus_to_exitcode(status)
+
+
+def bench_scans(args, workdir):
+    servers, urls = start_upstreams(args.latency, args.throttle_rate, args.retry_after,
+                                    watchlist=args.films, lists=args.lists, list_size=args.films // 3)
+    config = workdir / "config.json"
+    config.write_text(json.dumps({"letterboxd_user": servers["letterboxd"].user, "tmdb_key": "bench",
+                                  "country_scan": COUNTRIES}))
+    data_dir = workdir / "data"
+    env = {k: v for k, v in os.environ.items() if k not in ("EMAIL_ADDRESS", "EMAIL_APP_PASSWORD")}
+    env.update(urls, WATCHLIST_DATA_DIR=str(data_dir), WATCHLIST_CONFIG=str(config), TMDB_TOKEN="bench")
+    base_argv = ["--fetcher", "http", "--workers", str(args.workers), "--refresh-films", "0",
+                 "--rps", str(args.client_rps), "--tmdb-rps", str(args.client_rps),
+                 "--letterboxd-rps", str(args.client_rps), *args.main_args.split()]
+
+    results = {}
+    try:
+        for name, extra in SCENARIOS:
+            for server in servers.values():
+                server.reset_counters()
+            seconds, rss, exit_code = run_scan(base_argv + extra, env, workdir / f"{name}.log")
+            if exit_code:
+                sys.exit(f"{name} scan failed (exit {exit_code}), see {workdir / f'{name}.log'}")
+            rows = len(load_dataset(data_dir / "offers.sqlite", data_dir / "unwatched_by_country.csv"))
+            results[name] = {
+                "wall_s": seconds,
+                "peak_rss_mb": rss,
+                "rows": rows,
+                "rows_per_s": rows / seconds,
+                **{f"requests_{n}": s.requests for n, s in servers.items()},
+                **{f"throttled_{n}": s.throttled for n, s in servers.items()},
+            }
+    finally:
+        for server in servers.values():
+            server.stop()
+    return results
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_micro(args):
+    results = {}
+    configure_limiter("letterboxd", 0)
+    configure_limiter("justwatch", 0)
+
+    # scrape_films: paginated watchlist from the mock, over the pooled HTTP fetcher
+    letterboxd = MockLetterboxd(watchlist=args.films * 4, lists=0).start()
+    letterbox_scraper.LETTERBOXD_URL = letterboxd.base_url
+    fetcher = make_fetcher("http")
+    url = f"{letterboxd.base_url}/{letterboxd.user}/watchlist/"
+    seconds = timed(lambda: scrape_films(url, fetcher=fetcher), args.repeat)
+    results["scrape_films"] = {"seconds": seconds, "per_s": args.films * 4 / seconds}
+    fetcher.close()
+    letterboxd.stop()
+
+    # get_film_offers_api: search + offers for each film
+    justwatch = MockJustWatch().start()
+    justwatch_query.GRAPHQL_URL = justwatch.url
+    titles = [film_title(i) for i in range(50)]
+    seconds = timed(lambda: [get_film_offers_api(t, film_year(t), COUNTRIES) for t in titles], args.repeat)
+    results["get_film_offers_api"] = {"seconds": seconds, "per_s": len(titles) / seconds}
+    justwatch.stop()
+
+    # find_new_availability: yesterday's table vs today's (5% of offers replaced)
+    old = synthetic_offers(args.rows, seed=1)
+    rng = np.random.default_rng(2)
+    changed = rng.random(len(old)) < 0.05
+    new = old.copy()
+    new.loc[changed, "country"] = new.loc[changed, "country"].map(lambda c: f"{c}X")
+    seconds = timed(lambda: find_new_availability(old, new), args.repeat)
+    results["find_new_availability"] = {"seconds": seconds, "per_s": len(new) / seconds}
+
+    # app.py Watchlist filter path on a prebuilt WatchlistData
+    data = WatchlistData(old, OWNED_SERVICES)
+    countries = data.countries[: len(data.countries) // 2]
+
+    def filter_path():
+        mask = data.row_mask(countries, data.services, ["Netflix", "Prime", "Filmin"], ["Watchlist", "Mubi"])
+        data.counts(mask)
+        data.movies(mask)
+
+    seconds = timed(filter_path, args.repeat)
+    results["app_filter"] = {"seconds": seconds, "per_s": len(old) / seconds}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print every metric next to the baseline; returns the regressed ones."""
+    regressions = []
+    print(f"\n{'metric':<42}{'baseline':>12}{'now':>12}{'change':>10}")
+    for group, entries in results.items():
+        for name, metrics in entries.items():
+            for metric, value in metrics.items():
+                base = baseline.get(group, {}).get(name, {}).get(metric)
+                if not base or metric == "rows" or metric.startswith("throttled_"):
+                    continue
+                change = value / base - 1
+                worse = -change if metric in HIGHER_IS_BETTER else change
+                flag = "  ⚠️" if worse > tolerance else ""
+                print(f"{group + '.' + name + '.' + metric:<42}{base:>12.3f}{value:>12.3f}{change:>+10.0%}{flag}")
+                if flag:
+                    regressions.append(f"{group}.{name}.{metric}")
+    return regressions
+
+
+def report(results):
+    scans = results.get("scan", {})
+    if scans:
+        upstreams = ["letterboxd", "tmdb", "justwatch"]
+        print(f"{'scan':<8}{'wall s':>9}{'rows':>8}{'rows/s':>10}{'RSS MiB':>9}  "
+              + "".join(f"{u + ' req (429)':>22}" for u in upstreams))
+        for name, r in scans.items():
+            print(f"{name:<8}{r['wall_s']:>9.2f}{r['rows']:>8}{r['rows_per_s']:>10.1f}{r['peak_rss_mb']:>9.0f}  "
+                  + "".join(f"{str(r['requests_' + u]) + ' (' + str(r['throttled_' + u]) + ')':>22}"
+                            for u in upstreams))
+    micro = results.get("micro", {})
+    if micro:
+        print(f"\n{'microbenchmark':<24}{'ms':>10}{'items/s':>12}")
+        for name, r in micro.items():
+            print(f"{name:<24}{r['seconds'] * 1000:>10.1f}{r['per_s']:>12.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--films", type=int, default=300, help="Watchlist size (lists add about half as many)")
+    parser.add_argument("--lists", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock seconds per response")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of mock responses that are 429")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After sent with injected 429s")
+    parser.add_argument("--client-rps", type=float, default=50.0, help="--rps/--tmdb-rps/--letterboxd-rps for scans")
+    parser.add_argument("--main-args", default="", help="Extra main.py arguments for every scan")
+    parser.add_argument("--rows", type=int, default=200_000, help="Offers table size for the pandas microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", choices=["scan", "micro"], help="Run one half of the suite")
+    parser.add_argument("--save", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON from --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs the baseline")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="lbjw-bench-") as workdir:
+        if args.only != "micro":
+            results["scan"] = bench_scans(args, Path(workdir))
+        if args.only != "scan":
+            results["micro"] = bench_micro(args)
+    report(results)
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+        print(f"\nSaved to {args.save}")
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            sys.exit(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}: "
+                     + ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
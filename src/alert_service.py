@@ -4,74 +4,103 @@ and sends an email notification.
 """
 
 import os
-import re
 import smtplib
 import pandas as pd
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from pathlib import Path
 
-# Owned services — must match the provider names in the CSV
-OWNED_SERVICES = [
-    "Netflix",
-    "Amazon Prime Video",
-    "HBO Max",
-    "Apple TV",
-    "Disney Plus",
-    "YouTube",
-    "rtve",
-]
+from offers_store import read_table
+from change_log import read_events, get_cursor
+from providers import is_alert_service
 
 # Sources to exclude from alerts
 EXCLUDED_SOURCES = {"Alyssa"}
 
+# Cursor name of the alert e-mail in the offers change log
+ALERT_CONSUMER = "alert_email"
 
-def match_owned(provider: str) -> bool:
-    """Check if a provider name matches any owned service."""
-    provider_lower = provider.lower()
-    for svc in OWNED_SERVICES:
-        if svc.lower() in provider_lower:
-            return True
-    return False
+OFFER_KEY = ["title", "year", "country", "provider"]
 
 
-def find_new_availability(old_csv: Path, new_csv: Path) -> pd.DataFrame:
-    """
-    Compare old and new CSVs to find movies that are newly available
-    on owned services (excluding certain sources).
-    """
-    if not old_csv.exists():
-        return pd.DataFrame()
+def _per_distinct(values: pd.Series, predicate) -> pd.Series:
+    """Evaluate `predicate` once per distinct string and broadcast the result to every row."""
+    values = values.astype(str)
+    distinct = values.unique()
+    return values.map(dict(zip(distinct, map(predicate, distinct)))).astype(bool)
+
+
+def _only_excluded_sources(source: str) -> bool:
+    return all(src.strip() in EXCLUDED_SOURCES for src in source.split(","))
 
-    df_old = pd.read_csv(old_csv)
-    df_new = pd.read_csv(new_csv)
 
-    # Filter to owned services only
-    df_old_owned = df_old[df_old["provider"].apply(match_owned)].copy()
-    df_new_owned = df_new[df_new["provider"].apply(match_owned)].copy()
+def _offer_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Key columns with comparable dtypes (CSV and store frames differ in year/categoricals)."""
+    return pd.DataFrame({
+        "title": df["title"].astype(str),
+        "year": pd.to_numeric(df["year"], errors="coerce"),
+        "country": df["country"].astype(str),
+        "provider": df["provider"].astype(str),
+    }, index=df.index)
+
+
+def _alertable(df: pd.DataFrame) -> pd.DataFrame:
+    """Offers on owned services, minus films that only come from excluded sources."""
+    # Filter to owned services only (providers.ALERT_LABELS, one lookup per distinct provider)
+    df = df[_per_distinct(df["provider"], is_alert_service)]
 
     # Exclude Alyssa source
-    if "source" in df_new_owned.columns:
-        df_new_owned = df_new_owned[
-            ~df_new_owned["source"].fillna("").apply(
-                lambda s: all(src.strip() in EXCLUDED_SOURCES for src in s.split(","))
-            )
-        ]
+    if "source" in df.columns:
+        df = df[~_per_distinct(df["source"].fillna(""), _only_excluded_sources)]
+    return df
+
+
+def _as_frame(dataset) -> pd.DataFrame | None:
+    if isinstance(dataset, pd.DataFrame):
+        return dataset
+    path = Path(dataset)
+    return read_table(path) if path.exists() else None
 
-    # Build keys for comparison
-    def make_key(row):
-        return f"{row['title']}|{row['year']}|{row['country']}|{row['provider']}"
 
-    old_keys = set(df_old_owned.apply(make_key, axis=1))
-    df_new_owned["_key"] = df_new_owned.apply(make_key, axis=1)
+def find_new_availability(old, new) -> pd.DataFrame:
+    """
+    Find offers on owned services that are in `new` but not in `old`
+    (excluding films that only come from excluded sources).
+    Each side is a DataFrame or a path to the offers store / CSV.
+    """
+    df_old = _as_frame(old)
+    if df_old is None:
+        return pd.DataFrame()
+    df_new = _as_frame(new)
 
-    # New = in new but not in old
-    newly_available = df_new_owned[~df_new_owned["_key"].isin(old_keys)].copy()
-    newly_available.drop(columns=["_key"], inplace=True)
+    df_old_owned = df_old[_per_distinct(df_old["provider"], is_alert_service)]
+    df_new_owned = _alertable(df_new)
+
+    # New = in new but not in old: anti-join on the offer key
+    merged = _offer_keys(df_new_owned).merge(
+        _offer_keys(df_old_owned).drop_duplicates(), on=OFFER_KEY, how="left", indicator=True
+    )
+    newly_available = df_new_owned[(merged["_merge"] == "left_only").to_numpy()].copy()
 
     return newly_available
 
 
+def pending_alerts(store_path: Path) -> tuple[pd.DataFrame, int]:
+    """
+    Offers added on owned services since the alert cursor, read from the change log.
+    An offer that was added and removed again since then is skipped.
+    Returns (offers, id of the last event read) - advance the cursor to it once sent.
+    """
+    cursor = get_cursor(store_path, ALERT_CONSUMER) or 0
+    events = read_events(store_path, since=cursor, kinds=("offer_added", "offer_removed"))
+    if events.empty:
+        return events, cursor
+
+    latest = events.drop_duplicates(subset=OFFER_KEY, keep="last")
+    added = latest[latest["kind"] == "offer_added"]
+    return _alertable(added).drop(columns=["event_id", "kind"]), int(events["event_id"].max())
+
+
 def country_to_flag(code: str) -> str:
     code = code.upper()
     if code == "UK":
@@ -125,18 +154,18 @@ def build_email_html(newly_available: pd.DataFrame) -> str:
     """
 
 
-def send_alert_email(newly_available: pd.DataFrame):
-    """Send an email alert for newly available movies."""
+def send_alert_email(newly_available: pd.DataFrame) -> bool:
+    """Send an email alert for newly available movies. Returns False if sending failed."""
     email_address = os.environ.get("EMAIL_ADDRESS")
     email_password = os.environ.get("EMAIL_APP_PASSWORD")
 
     if not email_address or not email_password:
         print("⚠️ Email credentials not set. Skipping alert.")
-        return
+        return True
 
     if newly_available.empty:
         print("📭 No new availability to alert about.")
-        return
+        return True
 
     n_movies = newly_available.groupby(["title", "year"]).ngroups
     print(f"📧 Sending alert for {n_movies} newly available movie(s)...")
@@ -154,5 +183,7 @@ def send_alert_email(newly_available: pd.DataFrame):
             server.login(email_address, email_password)
             server.send_message(msg)
         print("✅ Alert email sent!")
+        return True
     except Exception as e:
         print(f"⚠️ Failed to send email: {e}")
+        return False
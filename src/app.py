@@ -1,7 +1,13 @@
 import streamlit as st
 import pandas as pd
+from html import escape
 from pathlib import Path
 
+from offers_store import load_dataset
+from watchlist_data import WatchlistData, dataset_signature
+from lookup_service import LookupService, load_countries
+from providers import OWNED_SERVICES
+
 st.set_page_config(
     page_title="Global Watchlist",
     layout="wide",
@@ -89,6 +95,44 @@ div[data-testid="stImage"] img:hover {
     box-shadow: 0 8px 25px rgba(0, 0, 0, 0.3);
 }
 
+/* Poster grid: one HTML block per page */
+.poster-grid {
+    display: grid;
+    grid-template-columns: repeat(5, minmax(0, 1fr));
+    gap: 1.5rem 1rem;
+    margin-bottom: 16px;
+}
+
+@media (max-width: 900px) {
+    .poster-grid {
+        grid-template-columns: repeat(2, minmax(0, 1fr));
+    }
+}
+
+.poster-card img.poster {
+    width: 100%;
+    aspect-ratio: 2 / 3;
+    object-fit: cover;
+    border-radius: 8px;
+    transition: transform 0.2s ease, box-shadow 0.2s ease;
+}
+
+.poster-card img.poster:hover {
+    transform: scale(1.03);
+    box-shadow: 0 8px 25px rgba(0, 0, 0, 0.3);
+}
+
+.poster-card details {
+    border-radius: 8px;
+    border: 1px solid rgba(128, 128, 128, 0.15);
+    padding: 4px 8px;
+    font-size: 0.8rem;
+}
+
+.poster-card summary {
+    cursor: pointer;
+}
+
 /* Search input */
 div[data-testid="stTextInput"] input {
     border-radius: 20px !important;
@@ -131,14 +175,14 @@ tab_watchlist, tab_lookup = st.tabs(["🍿 Watchlist", "🔍 Quick Lookup"])
 # 📁 PATHING
 # =========================
 BASE_DIR = Path(__file__).resolve().parent.parent
+store_path = BASE_DIR / "data" / "offers.sqlite"
 file_path = BASE_DIR / "data" / "unwatched_by_country.csv"
+CONFIG_PATH = BASE_DIR / "src" / "config.json"
 
-if not file_path.exists():
-    st.error("❌ CSV file not found. Run your scraper first!")
+if not store_path.exists() and not file_path.exists():
+    st.error("❌ No offers data found. Run your scraper first!")
     st.stop()
 
-df = pd.read_csv(file_path)
-
 # =========================
 # 🧠 HELPERS
 # =========================
@@ -157,19 +201,48 @@ def format_runtime(runtime):
         return f"{hours}h {mins}m" if hours else f"{mins}m"
     return ""
 
+def movie_card_html(movie) -> str:
+    """One poster card; per-country offers sit in a native <details> instead of an st.expander."""
+    country_providers: dict[str, list[str]] = {}
+    for c, p in zip(movie.country, movie.provider):
+        country_providers.setdefault(c, []).append(p)
+
+    n_places = sum(len(v) for v in country_providers.values())
+    offers = "".join(
+        f'<div class="country-header">{country_to_flag(country)} {escape(country)}</div>'
+        + "".join(f'<span class="provider-badge">{escape(p)}</span>' for p in sorted(set(country_providers[country])))
+        for country in sorted(country_providers.keys())
+    )
+    poster = escape(movie.poster_url) if isinstance(movie.poster_url, str) else ""
+    return (
+        '<div class="poster-card">'
+        f'<img class="poster" src="{poster}" loading="lazy" alt="">'
+        f'<div class="movie-title">{escape(movie.title)}</div>'
+        f'<div class="movie-meta">{int(movie.year)} · {format_runtime(movie.runtime)}</div>'
+        f'<details><summary>📍 {len(country_providers)} countries · {n_places} offers</summary>{offers}</details>'
+        '</div>'
+    )
+
 # =========================
-# 🏠 OWNED SERVICES MAP
+# 📄 POSTER GRID
 # =========================
-OWNED_SERVICES_MAP: dict[str, list[str]] = {
-    "Netflix":  ["Netflix"],
-    "Prime":    ["Amazon Prime Video"],
-    "HBO":      ["HBO Max"],
-    "Apple":    ["Apple TV"],
-    "Disney":   ["Disney Plus"],
-    "Youtube":  ["YouTube"],
-    "RTVE":     ["RTVE"],
-    "Filmin":   ["Filmin"],
-}
+PAGE_SIZES = [25, 50, 100]  # Posters rendered per page
+
+@st.cache_resource(show_spinner="Loading watchlist...", max_entries=2)
+def load_watchlist(store: str, csv: str, signature: tuple, owned_services: dict) -> WatchlistData:
+    """Parse the dataset and build filter views once per file version (`signature`)."""
+    return WatchlistData(load_dataset(Path(store), Path(csv)), owned_services)
+
+data_version = dataset_signature(store_path, file_path)
+data = load_watchlist(str(store_path), str(file_path), data_version, OWNED_SERVICES)
+
+def config_signature(path: Path):
+    return path.stat().st_mtime_ns if path.exists() else None
+
+@st.cache_resource(max_entries=2)
+def get_lookup_service(_data: WatchlistData, data_version: tuple, config_version) -> LookupService:
+    """One lookup service (and cache) per dataset/config version, shared across reruns and sessions."""
+    return LookupService(load_countries(CONFIG_PATH), _data)
 
 # =========================
 # 🎛️ SIDEBAR FILTERS
@@ -182,7 +255,7 @@ def toggle_all(group_prefix, items, select_all_key):
         st.session_state[f"{group_prefix}_{item}"] = val
 
 # --- 🌍 Countries ---
-countries = sorted(df["country"].unique().tolist())
+countries = data.countries
 
 if "all_countries" not in st.session_state:
     st.session_state["all_countries"] = True
@@ -202,8 +275,7 @@ if not selected_countries:
     selected_countries = countries
 
 # --- 📺 Services ---
-country_filtered_df = df[df["country"].isin(selected_countries)]
-services = sorted(country_filtered_df["provider"].unique().tolist())
+services = data.services_in(selected_countries)
 
 if "all_services" not in st.session_state:
     st.session_state["all_services"] = True
@@ -224,7 +296,7 @@ if not selected_services:
     selected_services = services
 
 # --- 🏠 Services I own ---
-owned_labels = list(OWNED_SERVICES_MAP.keys())
+owned_labels = list(OWNED_SERVICES.keys())
 
 if "all_owned" not in st.session_state:
     st.session_state["all_owned"] = True
@@ -242,14 +314,11 @@ with st.sidebar.popover("🏠 Services I own", use_container_width=True):
 selected_owned_services = [label for label in owned_labels if st.session_state.get(f"owned_{label}", False)]
 
 # --- 📋 Sources (multi-select) ---
-has_source_column = "source" in df.columns
+has_source_column = data.has_source
 selected_sources = []
 
 if has_source_column:
-    source_filtered_df = country_filtered_df[country_filtered_df["provider"].isin(selected_services)]
-    all_sources = sorted(
-        {s.strip() for val in source_filtered_df["source"].dropna() for s in str(val).split(",")}
-    )
+    all_sources = data.sources_in(data.row_mask(selected_countries, selected_services))
 
     if "all_sources" not in st.session_state:
         st.session_state["all_sources"] = False
@@ -270,9 +339,8 @@ if has_source_column:
 
 # --- ⚡ Actions ---
 st.sidebar.markdown("---")
-if "last_updated" in df.columns:
-    last_date = df["last_updated"].max()
-    st.sidebar.caption(f"📅 Data last updated: {last_date}")
+if data.last_updated is not None:
+    st.sidebar.caption(f"📅 Data last updated: {data.last_updated}")
 
 st.sidebar.link_button(
     "⚡ Trigger data refresh",
@@ -287,37 +355,9 @@ with tab_watchlist:
     st.markdown("## 🍿 Watchlist Availability")
     st.caption("Where your watchlist is streaming worldwide")
 
-    filtered_df = df[
-        (df["country"].isin(selected_countries)) &
-        (df["provider"].isin(selected_services))
-    ]
-
-    if selected_owned_services:
-        patterns = []
-        for label in selected_owned_services:
-            patterns.extend(OWNED_SERVICES_MAP[label])
-        mask = pd.Series(False, index=filtered_df.index)
-        for pattern in patterns:
-            mask = mask | filtered_df["provider"].str.contains(pattern, regex=False)
-        filtered_df = filtered_df[mask]
-
-    if has_source_column and selected_sources:
-        all_selected = has_source_column and len(selected_sources) == len(all_sources)
-        if not all_selected:
-            source_mask = filtered_df["source"].fillna("").apply(
-                lambda val: any(s in val for s in selected_sources)
-            )
-            filtered_df = filtered_df[source_mask]
-
-    if has_source_column:
-        filtered_df = filtered_df.drop_duplicates(subset=["title", "year", "country", "provider"], keep="first")
-
-    movies = filtered_df.groupby(["title", "year"]).agg({
-        "country": list,
-        "provider": list,
-        "poster_url": "first",
-        "runtime": "first"
-    }).reset_index()
+    source_filter = None
+    if has_source_column and selected_sources and len(selected_sources) < len(all_sources):
+        source_filter = selected_sources
 
     # Active filter tags
     filter_tags = []
@@ -334,8 +374,10 @@ with tab_watchlist:
         st.markdown(f'<div class="filter-tags">{tags_html}</div>', unsafe_allow_html=True)
 
     search_query = st.text_input("Search", placeholder="🔍 Search movie titles...", key="watchlist_search", label_visibility="collapsed")
-    if search_query:
-        movies = movies[movies["title"].str.contains(search_query, case=False, na=False)]
+
+    mask = data.row_mask(selected_countries, selected_services, selected_owned_services, source_filter, search_query)
+    movies = data.matching_films(mask)
+    n_movies, n_countries, n_providers = data.counts(mask)
 
     sort_col1, sort_col2 = st.columns([3, 1])
     with sort_col2:
@@ -352,24 +394,18 @@ with tab_watchlist:
     elif sort_option == "Year ↑":
         movies = movies.sort_values("year")
 
-    unique_countries = set()
-    unique_providers = set()
-    for _, m in movies.iterrows():
-        unique_countries.update(m["country"])
-        unique_providers.update(m["provider"])
-
     st.markdown(f"""
     <div class="stats-bar">
         <div class="stat-item">
-            <div class="stat-value">{len(movies)}</div>
+            <div class="stat-value">{n_movies}</div>
             <div class="stat-label">Movies</div>
         </div>
         <div class="stat-item">
-            <div class="stat-value">{len(unique_countries)}</div>
+            <div class="stat-value">{n_countries}</div>
             <div class="stat-label">Countries</div>
         </div>
         <div class="stat-item">
-            <div class="stat-value">{len(unique_providers)}</div>
+            <div class="stat-value">{n_providers}</div>
             <div class="stat-label">Providers</div>
         </div>
     </div>
@@ -378,33 +414,28 @@ with tab_watchlist:
     if movies.empty:
         st.info("😕 No movies match your filters.")
     else:
-        n_cols = 5
-        for i in range(0, len(movies), n_cols):
-            cols = st.columns(n_cols, gap="medium")
-            for j, col in enumerate(cols):
-                if i + j < len(movies):
-                    movie = movies.iloc[i + j]
-                    with col:
-                        st.image(movie["poster_url"], use_container_width=True)
-                        runtime_text = format_runtime(movie.get("runtime"))
-                        year_text = int(movie["year"])
-                        st.markdown(f'<div class="movie-title">{movie["title"]}</div>', unsafe_allow_html=True)
-                        st.markdown(f'<div class="movie-meta">{year_text} · {runtime_text}</div>', unsafe_allow_html=True)
-
-                        country_providers: dict[str, list[str]] = {}
-                        for c, p in zip(movie["country"], movie["provider"]):
-                            country_providers.setdefault(c, []).append(p)
-
-                        n_places = sum(len(v) for v in country_providers.values())
-                        with st.expander(f"📍 {len(country_providers)} countries · {n_places} offers"):
-                            for country in sorted(country_providers.keys()):
-                                flag = country_to_flag(country)
-                                st.markdown(f'<div class="country-header">{flag} {country}</div>', unsafe_allow_html=True)
-                                badges = "".join(
-                                    f'<span class="provider-badge">{p}</span>'
-                                    for p in sorted(set(country_providers[country]))
-                                )
-                                st.markdown(badges, unsafe_allow_html=True)
+        # Only the current page is aggregated and rendered, as a single HTML block
+        page_size = st.session_state.get("watchlist_page_size", PAGE_SIZES[0])
+        n_pages = max(1, -(-len(movies) // page_size))
+        view_key = (tuple(selected_countries), tuple(selected_services), tuple(selected_owned_services),
+                    tuple(selected_sources), search_query, sort_option, page_size)
+        if st.session_state.get("watchlist_view") != view_key:
+            st.session_state["watchlist_view"] = view_key
+            st.session_state["watchlist_page"] = 1
+        page = min(st.session_state.get("watchlist_page", 1), n_pages)
+
+        page_films = movies.iloc[(page - 1) * page_size: page * page_size]
+        page_movies = data.movies(mask, page_films["film_id"])
+        cards = "".join(movie_card_html(movie) for movie in page_movies.itertuples(index=False))
+        st.markdown(f'<div class="poster-grid">{cards}</div>', unsafe_allow_html=True)
+
+        nav_col1, nav_col2, nav_col3 = st.columns([2, 1, 1])
+        with nav_col1:
+            st.caption(f"Showing {(page - 1) * page_size + 1}–{(page - 1) * page_size + len(page_films)} of {len(movies)} movies")
+        with nav_col2:
+            st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, step=1, key="watchlist_page")
+        with nav_col3:
+            st.selectbox("Per page", PAGE_SIZES, key="watchlist_page_size")
 
 
 # =========================
@@ -423,49 +454,22 @@ with tab_lookup:
     if lookup_query:
         with st.spinner("Searching JustWatch..."):
             try:
-                from simplejustwatchapi import search as jw_search, offers_for_countries as jw_offers
-                import json
-
-                # Load countries from config
-                config_path = BASE_DIR / "src" / "config.json"
-                if config_path.exists():
-                    with open(config_path) as f:
-                        config = json.load(f)
-                    lookup_countries = config.get("country_scan", ["US"])
-                else:
-                    lookup_countries = ["US"]
+                lookup = get_lookup_service(data, data_version, config_signature(CONFIG_PATH)).lookup(lookup_query, lookup_year)
 
-                # Search
-                results = jw_search(lookup_query, country="US", language="en", count=5)
-
-                # Filter by year if provided
-                movie_results = [r for r in results if r.object_type == "MOVIE"]
-                if lookup_year:
-                    year_filtered = [r for r in movie_results if r.release_year and abs(r.release_year - lookup_year) <= 1]
-                    if year_filtered:
-                        movie_results = year_filtered
-
-                if not movie_results:
+                if not lookup:
                     st.warning("No movies found. Try a different search term.")
                 else:
-                    match = movie_results[0]
-                    st.markdown(f"### {match.title} ({match.release_year})")
-
-                    # Get offers
-                    offers = jw_offers(match.entry_id, [c.upper() for c in lookup_countries])
-
-                    has_offers = False
-                    for country_code, country_offers in sorted(offers.items()):
-                        streaming = [o for o in country_offers if o.monetization_type in ('FLATRATE', 'FREE', 'ADS')]
-                        if streaming:
-                            has_offers = True
-                            flag = country_to_flag(country_code)
-                            st.markdown(f'<div class="country-header">{flag} {country_code}</div>', unsafe_allow_html=True)
-                            providers = sorted({o.package.name for o in streaming})
-                            badges = "".join(f'<span class="provider-badge">{p}</span>' for p in providers)
-                            st.markdown(badges, unsafe_allow_html=True)
-
-                    if not has_offers:
+                    st.markdown(f"### {lookup['title']} ({lookup['year']})")
+                    if lookup["source"] == "dataset":
+                        st.caption(f"From your scanned lists · data from {data.last_updated}")
+
+                    for country_code, providers in sorted(lookup["offers"].items()):
+                        flag = country_to_flag(country_code)
+                        st.markdown(f'<div class="country-header">{flag} {country_code}</div>', unsafe_allow_html=True)
+                        badges = "".join(f'<span class="provider-badge">{p}</span>' for p in sorted(set(providers)))
+                        st.markdown(badges, unsafe_allow_html=True)
+
+                    if not lookup["offers"]:
                         st.info("😕 No streaming offers found in your countries.")
 
             except Exception as e:
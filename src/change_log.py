@@ -0,0 +1,129 @@
+"""
+Append-only change log of the offers dataset.
+
+Every run records what changed between the previous dataset and the one it
+writes, as events in the offers store (data/offers.sqlite):
+
+    film_added / film_removed    a film appeared in / left the dataset
+    offer_added / offer_removed  a (film, country, provider) offer did
+
+A scan's events are computed in SQL by the offers store's merge
+(append_table_diff), in the same transaction as the data.
+
+Consumers such as the alert e-mail keep a cursor (the last event id they
+handled) and read only the events after it, so their work scales with the
+number of changes rather than the size of the dataset.
+"""
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+EVENT_KINDS = ("film_added", "film_removed", "offer_added", "offer_removed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS offer_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    at       TEXT NOT NULL,
+    kind     TEXT NOT NULL,
+    title    TEXT NOT NULL,
+    year     INTEGER,
+    country  TEXT,
+    provider TEXT,
+    source   TEXT
+);
+CREATE INDEX IF NOT EXISTS offer_events_film ON offer_events (title, year);
+CREATE TABLE IF NOT EXISTS event_cursors (
+    consumer TEXT PRIMARY KEY,
+    event_id INTEGER NOT NULL
+);
+"""
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    ensure_schema(conn)
+    return conn
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Create the log tables on a connection to the store (commits any open transaction)."""
+    conn.executescript(SCHEMA)
+
+
+def append_table_diff(conn: sqlite3.Connection, before: str, after: str, at: str | None = None) -> dict:
+    """
+    Log the events turning `before` into `after`, for the offers store's merge: both
+    are tables of (title, year, country, provider, source) rows
+    on `conn`. Runs inside the caller's transaction, so the events commit
+    together with the data (see ensure_schema). Returns the number of events per kind.
+    """
+    at = at or datetime.now().isoformat(timespec="seconds")
+    films = "SELECT DISTINCT title, year, source FROM {}"
+    same_film = "o.title = n.title AND o.year IS n.year"
+    same_offer = f"{same_film} AND o.country = n.country AND o.provider = n.provider"
+    counts = {}
+    for kind, new, old, rows, match in (
+        ("film_added", after, before, films, same_film),
+        ("film_removed", before, after, films, same_film),
+        ("offer_added", after, before, "SELECT * FROM {}", same_offer),
+        ("offer_removed", before, after, "SELECT * FROM {}", same_offer),
+    ):
+        film_level = kind.startswith("film")
+        cursor = conn.execute(
+            "INSERT INTO offer_events (at, kind, title, year, country, provider, source) "
+            f"SELECT ?, ?, n.title, n.year, {'NULL, NULL' if film_level else 'n.country, n.provider'}, n.source "
+            f"FROM ({rows.format(new)}) n "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {old} o WHERE {match})",
+            (at, kind),
+        )
+        if cursor.rowcount:
+            counts[kind] = cursor.rowcount
+    return counts
+
+
+def read_events(path: Path, since: int = 0, kinds=None) -> pd.DataFrame:
+    """Events with event_id > `since`, oldest first, optionally only some kinds."""
+    conn = _connect(path)
+    try:
+        query = "SELECT * FROM offer_events WHERE event_id > ?"
+        params = [since]
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        return pd.read_sql(query + " ORDER BY event_id", conn, params=params)
+    finally:
+        conn.close()
+
+
+def latest_event_id(path: Path) -> int:
+    conn = _connect(path)
+    try:
+        return conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM offer_events").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def get_cursor(path: Path, consumer: str) -> int | None:
+    """Last event id handled by `consumer`, or None if it never read the log."""
+    conn = _connect(path)
+    try:
+        row = conn.execute("SELECT event_id FROM event_cursors WHERE consumer = ?", (consumer,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def set_cursor(path: Path, consumer: str, event_id: int):
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO event_cursors (consumer, event_id) VALUES (?, ?) "
+                "ON CONFLICT (consumer) DO UPDATE SET event_id = excluded.event_id",
+                (consumer, event_id),
+            )
+    finally:
+        conn.close()
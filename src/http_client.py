@@ -0,0 +1,134 @@
+"""
+Shared pooled HTTP client for upstream APIs.
+
+All TMDB calls go through one `requests.Session`, so connections are kept
+alive and reused across films and worker threads. The session adds a default
+timeout, retries 429/5xx responses with exponential backoff (honouring
+`Retry-After`), and keeps per-host request/latency counters (plus a latency
+histogram per host in `metrics`).
+
+Upstreams with an adaptive limiter (JustWatch) get a named session of their
+own that leaves 429s to the caller, so every throttle reaches the limiter
+instead of being absorbed by urllib3's retries.
+
+HTTP/2 is not available in requests/urllib3; keep-alive reuse already removes
+the per-call TCP + TLS handshake, which is where most of the cost was.
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import observe
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (5, 20)  # (connect, read) seconds
+DEFAULT_RETRIES = 4
+BACKOFF_FACTOR = 1.0       # 1s, 2s, 4s, ... unless the server sends Retry-After
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Per-session overrides of the statuses urllib3 retries by itself
+SESSION_RETRY_STATUSES = {
+    "justwatch": (500, 502, 503, 504),
+}
+
+
+class _Stats:
+    """Per-host request counters, updated from every worker thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: dict[str, dict] = {}
+
+    def record(self, host: str, latency: float, status: int | None, retries: int):
+        with self._lock:
+            s = self._hosts.setdefault(host, {
+                "requests": 0, "errors": 0, "retries": 0,
+                "total_latency": 0.0, "max_latency": 0.0,
+            })
+            s["requests"] += 1
+            s["retries"] += retries
+            s["total_latency"] += latency
+            s["max_latency"] = max(s["max_latency"], latency)
+            if status is None or status >= 400:
+                s["errors"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                host: {**s, "avg_latency": s["total_latency"] / s["requests"] if s["requests"] else 0.0}
+                for host, s in self._hosts.items()
+            }
+
+
+STATS = _Stats()
+
+
+class PooledSession(requests.Session):
+    """Session with a default timeout and per-host counters."""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_RETRIES, retry_statuses=RETRY_STATUSES):
+        super().__init__()
+        self.timeout = timeout
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=retry_statuses,
+            allowed_methods=None,  # POST too: GraphQL reads are idempotent
+            # urllib3 retries any 429/503 carrying Retry-After; only do that if asked to retry 429s
+            respect_retry_after_header=429 in retry_statuses,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).hostname or ""
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException:
+            latency = time.monotonic() - start
+            STATS.record(host, latency, None, 0)
+            observe("http_request_seconds", latency, upstream=host, status="error")
+            raise
+        latency = time.monotonic() - start
+        retries = getattr(response.raw, "retries", None)
+        STATS.record(host, latency, response.status_code, len(retries.history) if retries else 0)
+        observe("http_request_seconds", latency, upstream=host, status=f"{response.status_code // 100}xx")
+        return response
+
+
+_SESSIONS: dict[str, PooledSession] = {}
+_SESSION_LOCK = threading.Lock()
+
+
+def configure_session(pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                      max_retries: int = DEFAULT_RETRIES, name: str = "default") -> PooledSession:
+    """(Re)create a shared session, e.g. with a pool sized for the worker count."""
+    with _SESSION_LOCK:
+        if name in _SESSIONS:
+            _SESSIONS[name].close()
+        _SESSIONS[name] = PooledSession(pool_size, timeout, max_retries,
+                                        SESSION_RETRY_STATUSES.get(name, RETRY_STATUSES))
+        return _SESSIONS[name]
+
+
+def get_session(name: str = "default") -> PooledSession:
+    """Return a shared session, creating it with defaults on first use."""
+    with _SESSION_LOCK:
+        if name not in _SESSIONS:
+            _SESSIONS[name] = PooledSession(retry_statuses=SESSION_RETRY_STATUSES.get(name, RETRY_STATUSES))
+        return _SESSIONS[name]
+
+
+def host_stats() -> dict:
+    """Per-host counters: requests, errors, retries, total/avg/max latency (seconds)."""
+    return STATS.snapshot()
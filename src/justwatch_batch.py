@@ -0,0 +1,222 @@
+"""
+Batched JustWatch lookups: many title searches, or many offers lookups, in
+one GraphQL request.
+
+The JustWatch endpoint accepts several aliased root fields in one query
+(`r0: popularTitles(...) r1: popularTitles(...)`), so a chunk of films costs
+one round trip and one rate-limiter token instead of one or two per film.
+The batched documents are derived from simplejustwatchapi's own queries, with
+the per-item variable ($searchTitlesFilter / $nodeId) renamed per alias, and
+every alias is parsed with the library's parser. Aliases that come back with
+errors, or a whole batch that fails (e.g. a query JustWatch finds too
+complex), fall back to the single-item queries.
+"""
+
+import re
+from functools import lru_cache
+
+from simplejustwatchapi.query import (
+    parse_offers_for_countries_response,
+    parse_search_response,
+    prepare_offers_for_countries_request,
+    prepare_search_request,
+)
+
+from justwatch_query import (
+    _post_graphql, search_titles, offers_by_country, best_match, _found, _preferred, streaming_providers,
+)
+from jw_index import MIN_CONFIDENCE
+from metrics import incr
+from rate_limit import CircuitOpenError
+
+BATCH_SIZE = 10      # aliases per request; JustWatch rejects overly complex queries
+SEARCH_COUNT = 5
+
+
+def _closing(text, start):
+    """Index of the bracket closing the one at text[start]."""
+    opening = text[start]
+    closing = {"(": ")", "{": "}"}[opening]
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == opening:
+            depth += 1
+        elif text[i] == closing:
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError("Unbalanced GraphQL document")
+
+
+@lru_cache(maxsize=64)
+def batched_query(query, item_var, count, name):
+    """
+    Rewrite a single-item GraphQL operation into `count` aliased copies of its
+    root field (r0, r1, ...), each reading its own `$<item_var>_<i>` variable.
+    Fragments and the other variables are shared.
+    """
+    open_vars = query.index("(")
+    close_vars = _closing(query, open_vars)
+    open_body = query.index("{", close_vars)
+    close_body = _closing(query, open_body)
+    declarations = query[open_vars + 1:close_vars]
+    body = query[open_body + 1:close_body]
+    root = body[:_closing(body, body.index("{")) + 1].strip()
+
+    item = re.compile(rf"\${item_var}\b")
+    item_decl = re.search(rf"\${item_var}\s*:\s*[\w!\[\]]+", declarations).group(0)
+    # Commas are insignificant in GraphQL, so a dangling one after the removal is fine
+    shared = declarations.replace(item_decl, "")
+    item_decls = "".join(f"\n    {item.sub(f'${item_var}_{i}', item_decl)}," for i in range(count))
+    aliases = "\n".join(f"    r{i}: {item.sub(f'${item_var}_{i}', root)}" for i in range(count))
+    return f"query {name}({shared}{item_decls}\n) {{\n{aliases}\n    __typename\n}}\n{query[close_body + 1:]}"
+
+
+def _run_batch(requests, item_var, name, parse, single):
+    """
+    Send `requests` (single-item request bodies differing only in `item_var`)
+    as one aliased query. Returns one entry per request: parse(alias data), or
+    single(i) for items whose alias failed, or the exception if that fails too.
+    """
+    variables = {k: v for k, v in requests[0]["variables"].items() if k != item_var}
+    for i, request in enumerate(requests):
+        variables[f"{item_var}_{i}"] = request["variables"][item_var]
+    body = {
+        "operationName": name,
+        "variables": variables,
+        "query": batched_query(requests[0]["query"], item_var, len(requests), name),
+    }
+
+    results = [None] * len(requests)
+    failed = set(range(len(requests)))
+    try:
+        response = _post_graphql(body)
+        data = response.get("data") or {}
+        errors = response.get("errors") or []
+        if not any(not e.get("path") for e in errors):  # errors without a path sink the whole batch
+            failed = {int(e["path"][0][1:]) for e in errors if str(e["path"][0]).startswith("r")}
+            for i in range(len(requests)):
+                if i in failed or data.get(f"r{i}") is None:
+                    failed.add(i)
+                    continue
+                try:
+                    results[i] = parse(data[f"r{i}"])
+                except Exception:
+                    failed.add(i)
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        print(f"   ⚠️ Batched {name} failed ({e}); falling back to single queries")
+
+    if failed:
+        incr("justwatch_batch_fallbacks", len(failed), operation=name)
+    for i in sorted(failed):
+        try:
+            results[i] = single(i)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            results[i] = e
+    return results
+
+
+def search_batch(titles, count=SEARCH_COUNT, batch_size=BATCH_SIZE):
+    """
+    JustWatch search (US, English) for many titles, `batch_size` per request.
+    Returns one MediaEntry list per title, or the exception if its search failed.
+    """
+    unique = list(dict.fromkeys(titles))
+    found = {}
+    for start in range(0, len(unique), batch_size):
+        chunk = unique[start:start + batch_size]
+        requests = [prepare_search_request(t, "US", "en", count, True, 0, None, None, None, None) for t in chunk]
+        results = _run_batch(
+            requests, "searchTitlesFilter", "GetSearchTitlesBatch",
+            lambda alias: parse_search_response({"data": {"popularTitles": alias}}),
+            lambda i: search_titles(chunk[i], count),
+        )
+        found.update(zip(chunk, results))
+    return [found[t] for t in titles]
+
+
+def offers_batch(node_ids, countries, batch_size=BATCH_SIZE):
+    """
+    Offers for many JustWatch nodes, `batch_size` per request.
+    Returns one {country: [Offer, ...]} dict per node, or the exception if its lookup failed.
+    """
+    countries = {c.upper() for c in countries}
+    if not countries:
+        return [{} for _ in node_ids]
+    results = []
+    for start in range(0, len(node_ids), batch_size):
+        chunk = node_ids[start:start + batch_size]
+        requests = [prepare_offers_for_countries_request(n, countries, "en", True) for n in chunk]
+        results += _run_batch(
+            requests, "nodeId", "GetTitleOffersBatch",
+            lambda alias: parse_offers_for_countries_response({"data": {"node": alias}}, countries),
+            lambda i: offers_by_country(chunk[i], countries),
+        )
+    return results
+
+
+def resolve_movie_ids(films, batch_size=BATCH_SIZE):
+    """
+    Batched resolve_movie_id for [(title, year, local_title), ...]: the
+    localized searches go out together, then the English searches for every
+    film whose localized match fell below MIN_CONFIDENCE. Returns one
+    (node_id, confidence) per film with the same meaning as resolve_movie_id.
+    """
+    years = []
+    for _, year, _ in films:
+        try:
+            years.append(int(year))
+        except (TypeError, ValueError):
+            years.append(None)
+    pending = [i for i, year in enumerate(years) if year is not None]
+
+    # Localized titles first
+    local = {}
+    localized = [i for i in pending if films[i][2] and films[i][2].lower() != films[i][0].lower()]
+    if localized:
+        print(f"   🔎 Searching for {len(localized)} localized titles ({batch_size} per request)...")
+        for i, results in zip(localized, search_batch([films[i][2] for i in localized], batch_size=batch_size)):
+            if not isinstance(results, Exception):
+                local[i] = best_match(results, films[i][2], years[i])
+
+    # English titles where the localized match isn't good enough
+    english = [i for i in pending if not (local.get(i) and local[i][0] >= MIN_CONFIDENCE)]
+    if english:
+        print(f"   🔎 Searching for {len(english)} English titles ({batch_size} per request)...")
+    found = dict(zip(english, search_batch([films[i][0] for i in english], batch_size=batch_size)))
+
+    resolved = []
+    for i, (title, year, _) in enumerate(films):
+        if years[i] is None:
+            resolved.append((None, None))
+            continue
+        if i not in found:
+            resolved.append(_found(local[i]))
+            continue
+        results = found[i]
+        english_match = None if isinstance(results, Exception) else best_match(results, title, years[i])
+        match = _found(_preferred(local.get(i), english_match))
+        if match:
+            resolved.append(match)
+        elif isinstance(results, Exception):
+            print(f"   ⚠️ Search error for '{title} ({year})': {results}")
+            resolved.append((None, None))
+        else:
+            resolved.append((None, 0.0))
+    return resolved
+
+
+def streaming_offers_batch(node_ids, countries, batch_size=BATCH_SIZE):
+    """Batched get_streaming_offers: {country: [provider, ...]} per node (None on errors)."""
+    offers = []
+    for node_id, result in zip(node_ids, offers_batch(node_ids, countries, batch_size)):
+        if isinstance(result, Exception):
+            print(f"   ⚠️ Offers error for {node_id}: {result}")
+            offers.append(None)
+        else:
+            offers.append(streaming_providers(result))
+    return offers
@@ -1,102 +1,271 @@
 """
 JustWatch query module using the GraphQL API via simple-justwatch-python-api.
 Replaces the previous Playwright-based scraping approach for much faster lookups.
+
+Requests are built and parsed with the library's query helpers but sent
+through the pooled "justwatch" session, paced by the adaptive limiter in
+rate_limit (which reacts to 429s and their Retry-After).
 """
 
+import os
 import re
 import time
 import unicodedata
-from simplejustwatchapi import search, offers_for_countries
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+import requests
+from simplejustwatchapi.exceptions import JustWatchHttpError
+from simplejustwatchapi.query import (
+    parse_offers_for_countries_response,
+    parse_search_response,
+    prepare_offers_for_countries_request,
+    prepare_search_request,
+)
+
+from http_client import get_session
+from jw_index import MIN_CONFIDENCE
+from metrics import observe
+from providers import get_providers
+from rate_limit import get_limiter, CircuitOpenError
 
-# Rate limit config
+# Overridable to point scans at a local mock (see bench/mock_upstreams.py)
+GRAPHQL_URL = os.environ.get("JUSTWATCH_GRAPHQL_URL", "https://apis.justwatch.com/graphql")
+
+# Rate limit config: pacing and backoff live in the adaptive "justwatch" limiter
 MAX_RETRIES = 5
-BASE_DELAY = 3  # seconds
 
 
-def _retry_on_429(func, *args, **kwargs):
-    """Retry a function call with exponential backoff on 429 errors."""
+def _retry_after(response) -> float | None:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _post_graphql(request_json: dict) -> dict:
+    """
+    POST a prepared GraphQL request through the shared JustWatch session and
+    adaptive limiter. 429s are retried (up to MAX_RETRIES) after the pause the
+    limiter sets; other failures raise JustWatchHttpError, or CircuitOpenError
+    once JustWatch keeps failing.
+    """
+    limiter = get_limiter("justwatch")
+    session = get_session("justwatch")
     for attempt in range(MAX_RETRIES):
+        limiter.acquire()
+        start = time.perf_counter()
         try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            if "429" in str(e):
-                delay = BASE_DELAY * (2 ** attempt)
-                print(f"   ⏳ Rate limited, waiting {delay}s (attempt {attempt + 1}/{MAX_RETRIES})...")
-                time.sleep(delay)
-            else:
-                raise
-    raise Exception(f"Rate limited after {MAX_RETRIES} retries")
+            response = session.post(GRAPHQL_URL, json=request_json)
+        except requests.RequestException as e:
+            limiter.on_failure()
+            raise JustWatchHttpError(str(e)) from e
+        finally:
+            observe("justwatch_request_seconds", time.perf_counter() - start,
+                    operation=request_json.get("operationName", "unknown"))
+        if response.status_code == 429:
+            pause = limiter.on_throttle(_retry_after(response))
+            print(f"   ⏳ Rate limited, pausing JustWatch calls {pause:.1f}s "
+                  f"(attempt {attempt + 1}/{MAX_RETRIES}, now {limiter.rate:.2f} req/s)...")
+            continue
+        if response.status_code >= 500:
+            limiter.on_failure()
+        if response.status_code >= 400:
+            raise JustWatchHttpError(f"HTTP {response.status_code} from JustWatch", response.text)
+        limiter.on_success()
+        return response.json()
+    raise JustWatchHttpError(f"Rate limited after {MAX_RETRIES} retries")
+
+
+def search_titles(title, count=5):
+    """JustWatch search (US, English) as simplejustwatchapi MediaEntry tuples."""
+    request = prepare_search_request(title, "US", "en", count, True, 0, None, None, None, None)
+    return parse_search_response(_post_graphql(request))
+
+
+def offers_by_country(node_id, countries):
+    """All offers of a JustWatch node per country: {country: [Offer, ...]}."""
+    if not countries:
+        return {}
+    request = prepare_offers_for_countries_request(node_id, set(countries), "en", True)
+    return parse_offers_for_countries_response(_post_graphql(request), set(countries))
+
+
+# Words ignored when deciding whether a fuzzy title match is significant
+STOPWORDS = frozenset({
+    'the', 'a', 'an', 'of', 'in', 'on', 'at', 'to', 'and', 'or',
+    'el', 'la', 'los', 'las', 'de', 'del', 'en', 'un', 'una', 'y',
+    'le', 'les', 'des', 'du', 'et', 'der', 'die', 'das', 'und',
+})
+
+
+class _FoldTable(dict):
+    """str.translate table that drops accents and punctuation, filled in once per code point."""
+
+    def __missing__(self, codepoint):
+        decomposed = unicodedata.normalize('NFD', chr(codepoint))
+        folded = re.sub(r'[^\w\s]', '', ''.join(c for c in decomposed if unicodedata.category(c) != 'Mn'))
+        self[codepoint] = folded
+        return folded
+
+
+_FOLD = _FoldTable()
 
 
 def normalize(text):
     """Lowercase, strip accents, remove punctuation for fuzzy comparison."""
-    text = unicodedata.normalize('NFD', text.lower())
-    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
-    text = re.sub(r'[^\w\s]', '', text)
-    return text.strip()
+    return text.lower().translate(_FOLD).strip()
+
+
+@lru_cache(maxsize=65536)
+def title_tokens(title):
+    """(normalized title, its words, its significant words), cached per title."""
+    normalized = normalize(title)
+    words = frozenset(normalized.split())
+    significant = frozenset(w for w in words if len(w) > 2 and w not in STOPWORDS) or words
+    return normalized, words, significant
+
+
+def title_score(target_title, found_title):
+    """
+    1.0 for the same normalized title; 0.4-0.6 for a fuzzy word match, by how
+    much the two titles' significant words overlap; 0.0 for no match.
+    """
+    target, _, significant = title_tokens(target_title)
+    found, found_words, found_significant = title_tokens(found_title)
+    if target == found:
+        return 1.0
+    matched = len(significant & found_words)
+    if matched < (len(significant) if len(significant) <= 2 else max(2, len(significant) // 2)):
+        return 0.0
+    union = significant | found_significant
+    return round(0.4 + 0.2 * len(significant & found_significant) / len(union), 3) if union else 0.4
+
+
+def match_confidence(target_title, target_year, found_title, found_year):
+    """
+    Score a search result against the target movie: title_score() for the same
+    year, 0.9 (exact title) or 0.05 less (fuzzy) one year off, 0.0 for no match.
+    """
+    if found_year is None or abs(target_year - found_year) > 1:
+        return 0.0
+    score = title_score(target_title, found_title)
+    if target_year == found_year or not score:
+        return score
+    return 0.9 if score == 1.0 else round(score - 0.05, 3)
 
 
 def validate_match(target_title, target_year, found_title, found_year):
     """Check if a search result matches the target movie."""
-    if found_year is None or abs(target_year - found_year) > 1:
-        return False
-    target_words = set(normalize(target_title).split())
-    found_words = set(normalize(found_title).split())
-    stopwords = {'the', 'a', 'an', 'of', 'in', 'on', 'at', 'to', 'and', 'or',
-                 'el', 'la', 'los', 'las', 'de', 'del', 'en', 'un', 'una', 'y',
-                 'le', 'les', 'des', 'du', 'et', 'der', 'die', 'das', 'und'}
-    significant = {w for w in target_words if len(w) > 2 and w not in stopwords}
-    if not significant:
-        significant = target_words
-    matched = sum(1 for w in significant if w in found_words)
-    if len(significant) <= 2:
-        return matched >= len(significant)
-    return matched >= max(2, len(significant) // 2)
+    return match_confidence(target_title, target_year, found_title, found_year) > 0
 
 
-def find_movie_id(title, year, local_title=None):
+def best_match(results, title, target_year):
+    """Highest-confidence MOVIE in search `results` as (confidence, result), or None (ties keep search order)."""
+    best = None
+    for r in results:
+        if r.object_type != "MOVIE":
+            continue
+        confidence = match_confidence(title, target_year, r.title, r.release_year)
+        if confidence and (best is None or confidence > best[0]):
+            best = confidence, r
+    return best
+
+
+def _found(match):
+    """Report a best_match() as (node_id, confidence), or None."""
+    if not match:
+        return None
+    confidence, r = match
+    print(f"   ✅ Found: {r.title} ({r.release_year}) [id={r.entry_id}, confidence {confidence:.2f}]")
+    return r.entry_id, confidence
+
+
+def _preferred(local, english):
+    """The better of the localized and English title matches (the localized one on a tie)."""
+    if local and (not english or local[0] >= english[0]):
+        return local
+    return english
+
+
+def resolve_movie_id(title, year, local_title=None):
     """
-    Search JustWatch for a movie and return its node ID.
-    Tries localized title first, then English title.
+    Search JustWatch for a movie and return (node_id, confidence).
+    Tries the localized title first and stops there on a match of at least
+    MIN_CONFIDENCE; otherwise the English title is searched too and the better
+    match wins.
+    Returns (None, 0.0) if nothing matched, or (None, None) if the search failed.
     """
     target_year = int(year)
 
     # Try localized title first
+    local = None
     if local_title and local_title.lower() != title.lower():
         try:
-            results = _retry_on_429(search, local_title, country="US", language="en", count=5)
-            for r in results:
-                if r.object_type == "MOVIE" and validate_match(local_title, target_year, r.title, r.release_year):
-                    print(f"   ✅ Found: {r.title} ({r.release_year}) [id={r.entry_id}]")
-                    return r.entry_id
+            local = best_match(search_titles(local_title), local_title, target_year)
+            if local and local[0] >= MIN_CONFIDENCE:
+                return _found(local)
+        except CircuitOpenError:
+            raise
         except Exception:
             pass
 
     # Fall back to English title
     try:
         print(f"   🔎 Searching for: '{title} ({year})'...")
-        results = _retry_on_429(search, title, country="US", language="en", count=5)
-        for r in results:
-            if r.object_type == "MOVIE" and validate_match(title, target_year, r.title, r.release_year):
-                print(f"   ✅ Found: {r.title} ({r.release_year}) [id={r.entry_id}]")
-                return r.entry_id
+        english = best_match(search_titles(title), title, target_year)
+    except CircuitOpenError:
+        raise
     except Exception as e:
         print(f"   ⚠️ Search error: {e}")
+        return _found(local) or (None, None)
+
+    return _found(_preferred(local, english)) or (None, 0.0)
 
-    return None
+
+def find_movie_id(title, year, local_title=None):
+    """
+    Search JustWatch for a movie and return its node ID.
+    Tries localized title first, then English title.
+    """
+    node_id, _ = resolve_movie_id(title, year, local_title=local_title)
+    return node_id
 
 
 def get_streaming_offers(node_id, countries):
     """
     Get streaming offers for a movie across multiple countries in one API call.
-    Returns dict: {country_code: [provider_name, ...]}
+    Returns dict: {country_code: [provider_name, ...]}, or None if the lookup
+    failed (unlike {}, which means JustWatch lists no streaming offers).
     """
     try:
-        all_offers = _retry_on_429(offers_for_countries, node_id, countries)
+        all_offers = offers_by_country(node_id, countries)
+    except CircuitOpenError:
+        # Abort the run (the journal keeps finished films) rather than record empty offers
+        raise
     except Exception as e:
         print(f"   ⚠️ Offers error: {e}")
-        return {}
+        return None
 
+    return streaming_providers(all_offers)
+
+
+def streaming_providers(all_offers):
+    """
+    Reduce an offers_by_country() response to subscription/free providers,
+    under their canonical names (see providers.py).
+    Returns dict: {country_code: [provider_name, ...]}
+    """
+    registry = get_providers()
     result = {}
     for country, country_offers in all_offers.items():
         streaming = [
@@ -104,30 +273,37 @@ def get_streaming_offers(node_id, countries):
             if o.monetization_type in ('FLATRATE', 'FREE', 'ADS')
         ]
         if streaming:
-            providers = list({o.package.name for o in streaming})
+            providers = list({registry.canonicalize(o.package.package_id, o.package.name) for o in streaming})
             result[country] = providers
 
     return result
 
 
-def get_film_offers_api(title, year, countries, local_title=None):
+def get_film_offers_api(title, year, countries, local_title=None, node_id=None):
     """
     High-level function: find a movie and get streaming offers for all countries.
-    Returns dict: {country_code: [provider_name, ...]}
+    Pass `node_id` (e.g. from the resolution index) to skip the search.
+    Returns dict: {country_code: [provider_name, ...]}, or None if the search
+    or the offers lookup failed.
     """
-    try:
-        target_year = int(year)
-    except (TypeError, ValueError):
-        return {}
+    if node_id is None:
+        try:
+            target_year = int(year)
+        except (TypeError, ValueError):
+            return {}
+        node_id, confidence = resolve_movie_id(title, target_year, local_title=local_title)
+        if confidence is None:
+            return None
 
-    node_id = find_movie_id(title, target_year, local_title=local_title)
     if not node_id:
         return {}
 
     offers = get_streaming_offers(node_id, [c.upper() for c in countries])
+    if offers is not None:
+        print_offers(offers)
+    return offers
 
-    if offers:
-        for country, providers in offers.items():
-            print(f"   🎉 {country}: {', '.join(sorted(providers))}")
 
-    return offers
+def print_offers(offers):
+    for country, providers in offers.items():
+        print(f"   🎉 {country}: {', '.join(sorted(providers))}")
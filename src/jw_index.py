@@ -0,0 +1,103 @@
+"""
+Persistent index from Letterboxd slug to JustWatch node ID.
+
+Once a film has been matched with enough confidence, later scans go straight
+to the offers query instead of repeating the fuzzy `search` calls.
+Low-confidence, unmatched and stale entries are handed back for re-resolution.
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent.parent / "data" / "jw_index.json"
+
+MIN_CONFIDENCE = 0.9    # Below this, re-run the search on every scan
+STALE_AFTER_DAYS = 180  # Re-check confident matches twice a year
+MISS_RETRY_DAYS = 7     # Films JustWatch didn't know: retry weekly
+
+
+class JustWatchIndex:
+    """Thread-safe slug -> {node_id, tmdb_id, confidence, ...} map backed by a JSON file."""
+
+    def __init__(self, path: Path = DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (json.JSONDecodeError, ValueError):
+                self._entries = {}
+
+    def get(self, slug: str, now: datetime | None = None) -> dict | None:
+        """
+        Return the entry for `slug` if it can be trusted as-is.
+        An entry with node_id None means "recently searched, not on JustWatch".
+        Returns None when the film needs (re-)resolving.
+        """
+        now = now or datetime.now()
+        with self._lock:
+            entry = self._entries.get(slug)
+        if not entry:
+            return None
+
+        resolved_at = datetime.fromisoformat(entry["resolved_at"])
+        if entry.get("node_id") is None:
+            return entry if now - resolved_at < timedelta(days=MISS_RETRY_DAYS) else None
+        if entry.get("confidence", 0) < MIN_CONFIDENCE:
+            return None
+        if now - resolved_at > timedelta(days=STALE_AFTER_DAYS):
+            return None
+        return entry
+
+    def put(self, slug: str, node_id: str | None, confidence: float, tmdb_id=None,
+            title: str | None = None, year=None):
+        """Record a resolution result (node_id None for "not found")."""
+        with self._lock:
+            self._entries[slug] = {
+                "node_id": node_id,
+                "tmdb_id": tmdb_id,
+                "confidence": round(confidence, 3),
+                "title": title,
+                "year": year,
+                "resolved_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._dirty = True
+
+    def save(self):
+        """Write the index back to disk if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            self._dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_INDEX: JustWatchIndex | None = None
+_INDEX_LOCK = threading.Lock()
+
+
+def configure_index(path: Path = DEFAULT_INDEX_PATH) -> JustWatchIndex:
+    """Load the shared index from `path`."""
+    global _INDEX
+    with _INDEX_LOCK:
+        _INDEX = JustWatchIndex(path)
+        return _INDEX
+
+
+def get_index() -> JustWatchIndex:
+    """Return the shared index, loading it from the default path on first use."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = JustWatchIndex()
+        return _INDEX
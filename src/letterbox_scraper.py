@@ -1,17 +1,271 @@
 import logging
+import os
+import threading
 import time
 import re
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+from html.parser import HTMLParser
 from bs4 import BeautifulSoup
 
+try:
+    from lxml import html as lxml_html
+except ImportError:  # fall back to the streaming html.parser scanner
+    lxml_html = None
+
+from http_client import PooledSession, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+from metrics import observe
+from rate_limit import get_limiter
+
 logger = logging.getLogger(__name__)
 
+# Overridable to scrape a local stand-in (see bench/mock_upstreams.py)
+LETTERBOXD_URL = os.environ.get("LETTERBOXD_URL", "https://letterboxd.com")
+DEFAULT_PAGE_WORKERS = 4
+
 # Regex to extract year from title if present at the end
 YEAR_RE = re.compile(r"\((\d{4})\)$")
 
+# "A list of 1,234 films ..." / "... 56 films ..." in <meta> descriptions
+META_TAG_RE = re.compile(r"<meta\s[^>]*>", re.IGNORECASE)
+FILM_COUNT_RE = re.compile(r"(\d[\d,]*)\s+films?\b", re.IGNORECASE)
+
+# /<user>/list/<slug>/page/3/ -> /<user>/list/<slug>/ (the source a page belongs to)
+PAGE_SUFFIX_RE = re.compile(r"page/\d+/?$")
+
+
+BROWSER_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Statuses / page markers that mean "bot challenge", so the next backend should try
+BLOCKED_STATUSES = {403, 503}
+BLOCKED_MARKERS = ("Just a moment...", "cf-browser-verification", "challenge-platform")
+
+
+class PageBlocked(Exception):
+    """Raised by a fetcher backend when Letterboxd served a bot challenge instead of the page."""
+
+
+def _check_blocked(status_code: int, html: str, url: str):
+    if status_code in BLOCKED_STATUSES or any(m in html[:5000] for m in BLOCKED_MARKERS):
+        raise PageBlocked(f"{url}: HTTP {status_code}")
+
+
+class HttpFetcher:
+    """Plain keep-alive HTTP through a pooled session. Cheapest backend."""
+
+    name = "http"
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE):
+        # 503 is how Cloudflare challenges look, so don't retry it: hand off instead
+        self._session = PooledSession(pool_size, retry_statuses=(429, 500, 502, 504))
+        self._session.headers.update({
+            "User-Agent": BROWSER_USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml",
+            "Accept-Language": "en-US,en;q=0.9",
+        })
 
-def _get_page_html(url: str, pw_page=None) -> str | None:
-    """Fetch page HTML using Playwright if available, else cloudscraper."""
+    def fetch(self, url: str) -> str | None:
+        return self.fetch_conditional(url)[0]
+
+    def fetch_conditional(self, url: str, etag: str | None = None, last_modified: str | None = None):
+        """
+        GET with If-None-Match / If-Modified-Since.
+        Returns (html or None, not_modified, {"etag": ..., "last_modified": ...}).
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        r = self._session.get(url, headers=headers)
+        validators = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+        if r.status_code == 304:
+            return None, True, validators
+        _check_blocked(r.status_code, r.text, url)
+        if r.status_code != 200:
+            logger.warning(f"Failed to fetch {url}: HTTP {r.status_code}")
+            return None, False, validators
+        return r.text, False, validators
+
+    def close(self):
+        self._session.close()
+
+
+class CloudscraperFetcher:
+    """cloudscraper session, created once and reused for every page."""
+
+    name = "cloudscraper"
+
+    def __init__(self):
+        self._scraper = None
+        self._lock = threading.Lock()
+
+    def _get_scraper(self):
+        with self._lock:
+            if self._scraper is None:
+                import cloudscraper
+                self._scraper = cloudscraper.create_scraper()
+            return self._scraper
+
+    def fetch(self, url: str) -> str | None:
+        r = self._get_scraper().get(url, timeout=DEFAULT_TIMEOUT)
+        _check_blocked(r.status_code, r.text, url)
+        if r.status_code != 200:
+            logger.warning(f"Failed to fetch {url}: HTTP {r.status_code}")
+            return None
+        return r.text
+
+    def close(self):
+        if self._scraper is not None:
+            self._scraper.close()
+
+
+class BrowserFetcher:
+    """
+    Headless Chromium, launched only on first use.
+    Playwright's sync API is bound to the thread that started it, so every
+    browser call runs on one dedicated thread.
+    """
+
+    name = "browser"
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._playwright = None
+        self._browser = None
+        self._page = None
+
+    def _goto(self, url: str) -> str:
+        if self._page is None:
+            from playwright.sync_api import sync_playwright
+            print("🧭 Launching headless Chromium fallback...")
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=True)
+            context = self._browser.new_context(user_agent=BROWSER_USER_AGENT)
+            self._page = context.new_page()
+        self._page.goto(url, wait_until="domcontentloaded", timeout=15000)
+        return self._page.content()
+
+    def _stop(self):
+        if self._browser is not None:
+            self._browser.close()
+        if self._playwright is not None:
+            self._playwright.stop()
+        self._page = self._browser = self._playwright = None
+
+    def fetch(self, url: str) -> str | None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chromium")
+        try:
+            return self._executor.submit(self._goto, url).result()
+        except Exception as e:
+            logger.warning(f"Playwright failed for {url}: {e}")
+            return None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.submit(self._stop).result()
+            self._executor.shutdown()
+            self._executor = None
+
+
+class FallbackFetcher:
+    """
+    Try backends in order, moving to the next one when a page is blocked.
+    Once a backend has been blocked it is skipped for the rest of the run.
+    """
+
+    def __init__(self, backends: list):
+        self.backends = backends
+        self._first = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _observe(backend, url: str, start: float):
+        """Page load time per backend and per source listing (see metrics)."""
+        source = PAGE_SUFFIX_RE.sub("", urlsplit(url).path)
+        observe("letterboxd_page_seconds", time.perf_counter() - start, backend=backend.name, source=source)
+
+    def fetch(self, url: str) -> str | None:
+        i = self._first
+        while i < len(self.backends):
+            backend = self.backends[i]
+            start = time.perf_counter()
+            try:
+                return backend.fetch(url)
+            except PageBlocked as e:
+                logger.warning(f"{backend.name} blocked ({e}), falling back")
+            except Exception as e:
+                logger.warning(f"{backend.name} failed for {url}: {e}")
+                return None
+            finally:
+                self._observe(backend, url, start)
+            with self._lock:
+                self._first = max(self._first, i + 1)
+            i += 1
+        return None
+
+    def fetch_conditional(self, url: str, etag: str | None = None, last_modified: str | None = None):
+        """
+        Conditional GET through the first active backend that supports it,
+        else a plain fetch. Returns (html or None, not_modified, validators).
+        """
+        backend = self.backends[self._first] if self._first < len(self.backends) else None
+        if backend is not None and hasattr(backend, "fetch_conditional"):
+            start = time.perf_counter()
+            try:
+                return backend.fetch_conditional(url, etag, last_modified)
+            except PageBlocked as e:
+                logger.warning(f"{backend.name} blocked ({e}), falling back")
+                with self._lock:
+                    self._first = max(self._first, self.backends.index(backend) + 1)
+            except Exception as e:
+                logger.warning(f"{backend.name} failed for {url}: {e}")
+                return None, False, {}
+            finally:
+                self._observe(backend, url, start)
+        return self.fetch(url), False, {}
+
+    def close(self):
+        for backend in self.backends:
+            backend.close()
+
+
+FETCHER_BACKENDS = {
+    "auto": ("http", "cloudscraper", "browser"),
+    "http": ("http",),
+    "cloudscraper": ("cloudscraper", "browser"),
+    "browser": ("browser",),
+}
+
+
+def make_fetcher(backend: str = "auto", pool_size: int = DEFAULT_POOL_SIZE) -> FallbackFetcher:
+    """Build a fetcher chain: 'auto' (HTTP, then cloudscraper, then Chromium), 'http', 'cloudscraper' or 'browser'."""
+    factories = {
+        "http": lambda: HttpFetcher(pool_size),
+        "cloudscraper": CloudscraperFetcher,
+        "browser": BrowserFetcher,
+    }
+    return FallbackFetcher([factories[name]() for name in FETCHER_BACKENDS[backend]])
+
+
+_DEFAULT_FETCHER: FallbackFetcher | None = None
+
+
+def _get_default_fetcher() -> FallbackFetcher:
+    global _DEFAULT_FETCHER
+    if _DEFAULT_FETCHER is None:
+        _DEFAULT_FETCHER = make_fetcher("cloudscraper")
+    return _DEFAULT_FETCHER
+
+
+def _get_page_html(url: str, pw_page=None, fetcher=None) -> str | None:
+    """Fetch page HTML with an existing Playwright page, the given fetcher, or a shared cloudscraper fetcher."""
     if pw_page:
         try:
             pw_page.goto(url, wait_until="domcontentloaded", timeout=15000)
@@ -19,97 +273,285 @@ def _get_page_html(url: str, pw_page=None) -> str | None:
         except Exception as e:
             logger.warning(f"Playwright failed for {url}: {e}")
             return None
-    else:
-        import cloudscraper
-        scraper = cloudscraper.create_scraper()
-        r = scraper.get(url)
-        if r.status_code != 200:
-            logger.warning(f"Failed to fetch {url}: HTTP {r.status_code}")
-            return None
-        return r.text
+    return (fetcher or _get_default_fetcher()).fetch(url)
 
 
-def scrape_films(base_url, pw_page=None, sleep=1, max_pages=100):
-    """
-    Scrape films from any Letterboxd paginated list using react-component metadata.
-    Works for /films/, /watchlist/, /list/<slug>/
-    
-    Args:
-        base_url: Letterboxd list URL
-        pw_page: Optional Playwright page for browser-based fetching
-        sleep: Delay between pages
-        max_pages: Max pages to paginate
-    """
-    films = []
-    seen_slugs = set()
-    next_path = base_url.replace("https://letterboxd.com", "")
+def _page_count(soup) -> int | None:
+    """Highest page number in Letterboxd's pagination block, or None if there is none."""
+    numbers = [
+        int(text) for li in soup.select("li.paginate-page")
+        if (text := li.get_text(strip=True)).isdigit()
+    ]
+    return max(numbers) if numbers else None
 
-    page = 1
-    while next_path and page <= max_pages:
-        url = urljoin("https://letterboxd.com", next_path)
-        print(f"Scraping: {url}")
 
-        html = _get_page_html(url, pw_page)
-        if not html:
-            print(f"Failed to fetch {url}")
-            break
+def film_count(html: str) -> int | None:
+    """Total films in a list/watchlist as stated in the page's meta description, if present."""
+    for tag in META_TAG_RE.findall(html[:20000]):
+        if 'name="description"' in tag or 'property="og:description"' in tag:
+            match = FILM_COUNT_RE.search(tag)
+            if match:
+                return int(match.group(1).replace(",", ""))
+    return None
 
-        soup = BeautifulSoup(html, "html.parser")
 
-        components = soup.find_all("div", class_="react-component")
-        for comp in components:
-            slug = comp.get("data-item-slug")
-            title_raw = comp.get("data-item-name") or ""
+def _film_from_attrs(slug, title_raw):
+    year_match = YEAR_RE.search(title_raw)
+    year = int(year_match.group(1)) if year_match else None
+    title = YEAR_RE.sub("", title_raw).strip()
+    return {"title": title, "year": year, "slug": slug}
 
-            if not slug or slug in seen_slugs:
-                continue
 
-            year_match = YEAR_RE.search(title_raw)
-            year = int(year_match.group(1)) if year_match else None
-            title = YEAR_RE.sub("", title_raw).strip()
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
 
-            films.append({"title": title, "year": year, "slug": slug})
-            seen_slugs.add(slug)
 
-        next_link = soup.find("a", class_="next")
-        next_path = next_link.get("href") if next_link else None
+# Only the nodes scrape_films reads: poster components, pagination items, the next link
+_FILM_NODES_XPATH = (
+    f"//div[{_has_class('react-component')}][@data-item-slug]"
+    f" | //li[{_has_class('paginate-page')}]"
+    f" | //a[{_has_class('next')}]"
+)
 
-        page += 1
-        time.sleep(sleep)
 
-    return films
+def _parse_films_page_lxml(html: str):
+    doc = lxml_html.fromstring(html)
+    films = []
+    numbers = []
+    has_next = False
+    for node in doc.xpath(_FILM_NODES_XPATH):
+        if node.tag == "div":
+            slug = node.get("data-item-slug")
+            if slug:
+                films.append(_film_from_attrs(slug, node.get("data-item-name") or ""))
+        elif node.tag == "li":
+            text = node.text_content().strip()
+            if text.isdigit():
+                numbers.append(int(text))
+        else:
+            has_next = True
+    return films, max(numbers) if numbers else None, has_next
+
+
+class _FilmPageScanner(HTMLParser):
+    """Streaming extractor: reads poster/pagination attributes without building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.films = []
+        self.numbers = []
+        self.has_next = False
+        self._page_text = None  # collecting text inside li.paginate-page
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in ("div", "li", "a"):
+            return
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "div" and "react-component" in classes and attrs.get("data-item-slug"):
+            self.films.append(_film_from_attrs(attrs["data-item-slug"], attrs.get("data-item-name") or ""))
+        elif tag == "li" and "paginate-page" in classes:
+            self._page_text = []
+        elif tag == "a" and "next" in classes:
+            self.has_next = True
+
+    def handle_data(self, data):
+        if self._page_text is not None:
+            self._page_text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "li" and self._page_text is not None:
+            text = "".join(self._page_text).strip()
+            if text.isdigit():
+                self.numbers.append(int(text))
+            self._page_text = None
+
+
+def _parse_films_page_stream(html: str):
+    scanner = _FilmPageScanner()
+    scanner.feed(html)
+    scanner.close()
+    return scanner.films, max(scanner.numbers) if scanner.numbers else None, scanner.has_next
+
+
+def parse_films_page(html: str):
+    """
+    Returns (films, page_count, has_next) for one list page.
+    Uses lxml when installed (only the poster, pagination and next-link nodes
+    are visited), else a streaming html.parser scan that builds no tree.
+    """
+    if lxml_html is not None:
+        return _parse_films_page_lxml(html)
+    return _parse_films_page_stream(html)
+
 
+def page_url(base_path: str, page: int) -> str:
+    if page == 1:
+        return urljoin(LETTERBOXD_URL, base_path)
+    return urljoin(LETTERBOXD_URL, f"{base_path.rstrip('/')}/page/{page}/")
 
-def discover_lists(username: str, pw_page=None, sleep_time: float = 1, max_pages: int = 10) -> list:
+
+def fetch_paginated(base_paths, parse, fetcher=None, pw_page=None, max_pages=100,
+                    workers=DEFAULT_PAGE_WORKERS, sleep=1, first_pages=None, finished=None):
     """
-    Scrape the user's Letterboxd lists page to discover all personal lists.
+    Fetch every page of several paginated Letterboxd listings concurrently.
+
+    Page 1 of every listing is fetched first; once it shows the page count,
+    all remaining pages (of all listings) are fetched together, paced by the
+    shared "letterboxd" rate limiter. Listings without a page count are
+    followed one `a.next` page at a time.
 
     Args:
-        username: Letterboxd username
-        pw_page: Optional Playwright page for browser-based fetching
-        sleep_time: Delay between page requests
-        max_pages: Maximum pages to paginate through
+        base_paths: Listing paths (or full URLs) such as /<user>/watchlist/
+        parse: Function html -> (items, page_count, has_next)
+        fetcher: Optional fetcher from make_fetcher()
+        pw_page: Optional Playwright page (forces one page at a time, `sleep` apart)
+        max_pages: Max pages per listing
+        workers: Concurrent page fetches
+        first_pages: Optional {base_path: parsed page 1} already fetched by the caller
+        finished: Optional dict, filled with base_path -> time.perf_counter() when
+            the listing's last page arrived (per-listing timing within the shared pool)
 
     Returns:
-        List of dicts with keys: 'name' (str), 'url' (str), 'slug' (str)
+        Dict base_path -> list of per-page item lists in page order, stopping at
+        the first page that failed, or None if page 1 failed.
     """
-    lists = []
-    seen_slugs = set()
-    next_path = f"/{username}/lists/"
-
-    page = 1
-    while next_path and page <= max_pages:
-        url = urljoin("https://letterboxd.com", next_path)
-        logger.info(f"Discovering lists: {url}")
+    base_paths = [p.replace(LETTERBOXD_URL, "") for p in base_paths]
+    if pw_page:
+        workers = 1
+    finished_lock = threading.Lock()
 
-        html = _get_page_html(url, pw_page)
+    def load(job):
+        path, page = job
+        url = page_url(path, page)
+        print(f"Scraping: {url}")
+        if pw_page:
+            time.sleep(sleep)
+        else:
+            get_limiter("letterboxd").acquire()
+        html = _get_page_html(url, pw_page, fetcher)
+        if finished is not None:
+            with finished_lock:
+                finished[path] = max(finished.get(path, 0.0), time.perf_counter())
         if not html:
-            logger.warning(f"Failed to fetch {url}")
-            return lists
+            print(f"Failed to fetch {url}")
+            return None
+        return parse(html)
+
+    pages: dict[str, dict[int, list | None]] = {path: {} for path in base_paths}
+
+    def record(path, page, parsed):
+        """Store one parsed page and return the follow-up jobs it reveals."""
+        if parsed is None:
+            pages[path][page] = None
+            return []
+        items, page_count, has_next = parsed
+        pages[path][page] = items
+        if page == 1 and page_count:
+            return [(path, n) for n in range(2, min(page_count, max_pages) + 1)]
+        if not page_count and has_next and page < max_pages:
+            return [(path, page + 1)]
+        return []
+
+    seeded = {p.replace(LETTERBOXD_URL, ""): parsed for p, parsed in (first_pages or {}).items()}
+    jobs = [(path, 1) for path in base_paths if path not in seeded]
+    for path, parsed in seeded.items():
+        jobs += record(path, 1, parsed)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pages") as executor:
+        while jobs:
+            next_jobs = []
+            for (path, page), parsed in zip(jobs, executor.map(load, jobs)):
+                next_jobs += record(path, page, parsed)
+            jobs = next_jobs
+
+    results = {}
+    for path, by_page in pages.items():
+        if by_page.get(1) is None:
+            results[path] = None
+            continue
+        ordered = []
+        for page in sorted(by_page):
+            if by_page[page] is None:
+                break
+            ordered.append(by_page[page])
+        results[path] = ordered
+    return results
+
+
+def dedupe(page_lists, key):
+    """Flatten per-page item lists, keeping the first occurrence of each key."""
+    seen = set()
+    items = []
+    for page_items in page_lists:
+        for item in page_items:
+            if item[key] not in seen:
+                seen.add(item[key])
+                items.append(item)
+    return items
+
+
+def scrape_sources(base_urls, fetcher=None, pw_page=None, max_pages=100,
+                   workers=DEFAULT_PAGE_WORKERS, first_pages=None, finished=None, last_pages=None):
+    """
+    Scrape several Letterboxd film lists at once with a shared page pool.
+
+    Args:
+        first_pages: Optional {base_url: parse_films_page(page 1 html)} already fetched
+        finished: Optional dict, filled with base_url -> time.perf_counter() when
+            the list's last page arrived (see fetch_paginated)
+        last_pages: Optional dict, filled with base_url -> the films on the list's last page
+
+    Returns:
+        Dict base_url -> list of film dicts (title, year, slug) in list order,
+        or None for a list whose first page could not be fetched.
+    """
+    by_path = {} if finished is not None else None
+    pages = fetch_paginated(base_urls, parse_films_page, fetcher=fetcher, pw_page=pw_page,
+                            max_pages=max_pages, workers=workers, first_pages=first_pages, finished=by_path)
+    if finished is not None:
+        for url in base_urls:
+            path = url.replace(LETTERBOXD_URL, "")
+            if path in by_path:
+                finished[url] = by_path[path]
+    if last_pages is not None:
+        for url in base_urls:
+            listing = pages[url.replace(LETTERBOXD_URL, "")]
+            if listing:
+                last_pages[url] = listing[-1]
+    return {
+        url: None if pages[url.replace(LETTERBOXD_URL, "")] is None
+        else dedupe(pages[url.replace(LETTERBOXD_URL, "")], "slug")
+        for url in base_urls
+    }
+
+
+def scrape_films(base_url, pw_page=None, sleep=1, max_pages=100, fetcher=None,
+                 workers=DEFAULT_PAGE_WORKERS):
+    """
+    Scrape films from any Letterboxd paginated list using react-component metadata.
+    Works for /films/, /watchlist/, /list/<slug>/
+    
+    Args:
+        base_url: Letterboxd list URL
+        pw_page: Optional Playwright page for browser-based fetching
+        sleep: Delay between pages (Playwright only; otherwise the shared rate limiter paces requests)
+        max_pages: Max pages to paginate
+        fetcher: Optional fetcher from make_fetcher() (used when pw_page is not given)
+        workers: Concurrent page fetches
+    """
+    path = base_url.replace(LETTERBOXD_URL, "")
+    pages = fetch_paginated([path], parse_films_page, fetcher=fetcher, pw_page=pw_page,
+                            max_pages=max_pages, workers=workers, sleep=sleep)[path]
+    return dedupe(pages or [], "slug")
 
-        soup = BeautifulSoup(html, "html.parser")
 
-        list_pattern = re.compile(rf"^/{re.escape(username)}/list/([^/]+)/$")
+def _list_page_parser(username: str):
+    list_pattern = re.compile(rf"^/{re.escape(username)}/list/([^/]+)/$")
+
+    def parse(html: str):
+        soup = BeautifulSoup(html, "html.parser")
+        lists = []
 
         # Only match links inside <h2> tags to get the actual list name,
         # not poster overlay links which may contain film titles
@@ -123,22 +565,38 @@ def discover_lists(username: str, pw_page=None, sleep_time: float = 1, max_pages
             if not match:
                 continue
 
-            slug = match.group(1)
-            if slug in seen_slugs:
-                continue
-
             name = link.get_text(strip=True)
             if not name:
                 continue
 
-            lists.append({"name": name, "url": href, "slug": slug})
-            seen_slugs.add(slug)
+            lists.append({"name": name, "url": href, "slug": match.group(1)})
+
+        return lists, _page_count(soup), soup.find("a", class_="next") is not None
+
+    return parse
+
+
+def discover_lists(username: str, pw_page=None, sleep_time: float = 1, max_pages: int = 10,
+                   fetcher=None, workers: int = DEFAULT_PAGE_WORKERS) -> list:
+    """
+    Scrape the user's Letterboxd lists page to discover all personal lists.
 
-        next_link = soup.find("a", class_="next")
-        next_path = next_link.get("href") if next_link else None
+    Args:
+        username: Letterboxd username
+        pw_page: Optional Playwright page for browser-based fetching
+        sleep_time: Delay between page requests (Playwright only)
+        max_pages: Maximum pages to paginate through
+        fetcher: Optional fetcher from make_fetcher() (used when pw_page is not given)
+        workers: Concurrent page fetches
 
-        page += 1
-        time.sleep(sleep_time)
+    Returns:
+        List of dicts with keys: 'name' (str), 'url' (str), 'slug' (str)
+    """
+    path = f"/{username}/lists/"
+    logger.info(f"Discovering lists: {page_url(path, 1)}")
+    pages = fetch_paginated([path], _list_page_parser(username), fetcher=fetcher, pw_page=pw_page,
+                            max_pages=max_pages, workers=workers, sleep=sleep_time)[path]
+    lists = dedupe(pages or [], "slug")
 
     if not lists:
         logger.info(f"No lists found for user '{username}'.")
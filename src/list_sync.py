@@ -0,0 +1,235 @@
+"""
+Incremental Letterboxd list sync.
+
+Stores a fingerprint per source (hash of page-1 slugs, page count, film count,
+ETag/Last-Modified when the server sends them, and for multi-page lists the
+hash of the last page's slugs) together with the films seen last time. On the
+next run only page 1 is requested per source, plus the last page of a
+multi-page list whose page 1 looks unchanged:
+
+- 304 Not Modified, or an unchanged fingerprint -> reuse the stored films.
+  (A removal plus an addition past page 1 keeps page 1 and both counts; the
+  last page catches it. Watchlists don't need it: additions land on page 1.)
+- Watchlists (newest additions first) -> read pages only until a known slug
+  shows up, as long as the film count confirms nothing was removed.
+- Anything else -> full paginated scrape.
+"""
+
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from letterbox_scraper import (
+    LETTERBOXD_URL, DEFAULT_PAGE_WORKERS, page_url, parse_films_page, dedupe, film_count, scrape_sources,
+)
+from metrics import record_span
+from rate_limit import get_limiter
+
+DEFAULT_STATE_PATH = Path(__file__).resolve().parent.parent / "data" / "list_sync.json"
+
+FINGERPRINT_KEYS = ("page1_hash", "page_count", "film_count", "etag", "last_modified", "last_page_hash")
+
+
+def load_state(path: Path = DEFAULT_STATE_PATH) -> dict:
+    """Load per-source sync state. Returns empty dict if missing or corrupt."""
+    if path.exists():
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, ValueError):
+            return {}
+    return {}
+
+
+def save_state(state: dict, path: Path = DEFAULT_STATE_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(state, f)
+
+
+def _page_hash(films) -> str:
+    return hashlib.sha1("\n".join(f["slug"] for f in films).encode()).hexdigest()
+
+
+def _fetch_first_page(url, fetcher, previous):
+    """Returns (html or None, not_modified, validators)."""
+    get_limiter("letterboxd").acquire()
+    print(f"Scraping: {url}")
+    if hasattr(fetcher, "fetch_conditional"):
+        return fetcher.fetch_conditional(url, previous.get("etag"), previous.get("last_modified"))
+    return fetcher.fetch(url), False, {}
+
+
+def _fetch_last_page_hash(url, page, fetcher):
+    """Hash of page `page`'s slugs, or None if it failed."""
+    get_limiter("letterboxd").acquire()
+    last_url = page_url(url.replace(LETTERBOXD_URL, ""), page)
+    print(f"Scraping: {last_url}")
+    html = fetcher.fetch(last_url)
+    return _page_hash(parse_films_page(html)[0]) if html else None
+
+
+def _extend_watchlist(url, first_films, page_count, known_slugs, fetcher, max_pages):
+    """
+    Read a newest-first watchlist only until an already-known slug appears.
+    Returns the new films (in order), or None if a page failed.
+    """
+    path = url.replace(LETTERBOXD_URL, "")
+    new_films = []
+    films = first_films
+    page = 1
+    while True:
+        for f in films:
+            if f["slug"] in known_slugs:
+                return new_films
+            new_films.append(f)
+        page += 1
+        if page > min(page_count or 1, max_pages):
+            return new_films
+        get_limiter("letterboxd").acquire()
+        next_url = page_url(path, page)
+        print(f"Scraping: {next_url}")
+        html = fetcher.fetch(next_url)
+        if not html:
+            return None
+        films = parse_films_page(html)[0]
+
+
+def sync_sources(sources, fetcher, state: dict, incremental: bool = True, max_pages: int = 100,
+                 workers: int = DEFAULT_PAGE_WORKERS):
+    """
+    Scrape sources (dicts with 'url' and 'key'), skipping work for unchanged ones.
+    Updates `state` in place.
+
+    Each source's time from the start of the sync to its last page is recorded
+    as the "scrape:<key>" stage; all sources share one page pool, so these overlap.
+
+    Returns:
+        Dict url -> list of film dicts, or None for a source that failed.
+    """
+    start = time.perf_counter()
+    done = {}
+    if not incremental:
+        results = scrape_sources([s["url"] for s in sources], fetcher=fetcher, max_pages=max_pages,
+                                 workers=workers, finished=done)
+        for source in sources:
+            films = results[source["url"]]
+            if films is not None:
+                state[source["key"]] = {"films": films, "synced_at": datetime.now().isoformat(timespec="seconds")}
+        _record_source_times(sources, start, done)
+        return results
+
+    def first_page(source):
+        fetched = _fetch_first_page(source["url"], fetcher, state.get(source["key"], {}))
+        done[source["url"]] = time.perf_counter()
+        return fetched
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sync") as executor:
+        firsts = list(executor.map(first_page, sources))
+
+    results = {}
+    checked = []
+    for source, (html, not_modified, validators) in zip(sources, firsts):
+        key, url = source["key"], source["url"]
+        previous = state.get(key, {})
+
+        if not_modified and "films" in previous:
+            if key != "watchlist" and (previous.get("page_count") or 1) > 1:
+                # Page 1 is the same, but the pages after it may not be
+                fingerprint = {k: previous.get(k) for k in FINGERPRINT_KEYS}
+                checked.append((source, previous, fingerprint, None, True))
+                continue
+            print(f"✔️ {source['name']}: not modified, {len(previous['films'])} films")
+            results[url] = previous["films"]
+            continue
+        if html is None:
+            print(f"Failed to fetch {url}")
+            results[url] = None
+            continue
+
+        films, page_count, has_next = parse_films_page(html)
+        fingerprint = {
+            "page1_hash": _page_hash(films),
+            "page_count": page_count,
+            "film_count": film_count(html),
+            "etag": validators.get("etag"),
+            "last_modified": validators.get("last_modified"),
+        }
+        # Without a film count, page 1 only vouches for single-page lists
+        comparable = fingerprint["film_count"] is not None or page_count is None
+        unchanged = comparable and "films" in previous and all(
+            previous.get(k) == fingerprint[k] for k in ("page1_hash", "page_count", "film_count")
+        )
+        checked.append((source, previous, fingerprint, (films, page_count, has_next), unchanged))
+
+    # Multi-page lists that look unchanged: confirm with the last page
+    last_checks = [
+        (source["url"], min(fingerprint["page_count"], max_pages))
+        for source, _, fingerprint, _, unchanged in checked
+        if unchanged and source["key"] != "watchlist" and (fingerprint["page_count"] or 1) > 1
+    ]
+    if last_checks:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sync") as executor:
+            last_hashes = dict(zip(
+                (url for url, _ in last_checks),
+                executor.map(lambda check: _fetch_last_page_hash(*check, fetcher), last_checks),
+            ))
+        for url in last_hashes:
+            done[url] = time.perf_counter()
+    else:
+        last_hashes = {}
+
+    to_scrape = {}
+    for source, previous, fingerprint, parsed, unchanged in checked:
+        key, url = source["key"], source["url"]
+        if url in last_hashes:
+            fingerprint["last_page_hash"] = last_hashes[url]
+            unchanged = last_hashes[url] is not None and previous.get("last_page_hash") == last_hashes[url]
+        if unchanged:
+            print(f"✔️ {source['name']}: unchanged, {len(previous['films'])} films")
+            results[url] = previous["films"]
+            state[key] = {**previous, **fingerprint}
+            continue
+
+        if key == "watchlist" and "films" in previous and fingerprint["film_count"] is not None:
+            films, page_count, _ = parsed
+            known = {f["slug"] for f in previous["films"]}
+            new_films = _extend_watchlist(url, films, page_count, known, fetcher, max_pages)
+            done[url] = time.perf_counter()
+            if new_films is not None and len(new_films) + len(previous["films"]) == fingerprint["film_count"]:
+                print(f"➕ {source['name']}: {len(new_films)} new films")
+                merged = dedupe([new_films, previous["films"]], "slug")
+                results[url] = merged
+                state[key] = {**fingerprint, "films": merged,
+                              "synced_at": datetime.now().isoformat(timespec="seconds")}
+                continue
+            # Count doesn't add up (films removed or reordered): rescan the whole list
+
+        to_scrape[url] = (key, fingerprint, parsed)
+
+    if to_scrape:
+        last_pages = {}
+        scraped = scrape_sources(
+            list(to_scrape), fetcher=fetcher, max_pages=max_pages, workers=workers,
+            first_pages={url: parsed for url, (_, _, parsed) in to_scrape.items() if parsed is not None},
+            finished=done, last_pages=last_pages,
+        )
+        for url, (key, fingerprint, _) in to_scrape.items():
+            results[url] = scraped[url]
+            if scraped[url] is not None:
+                if (fingerprint["page_count"] or 1) > 1 and url in last_pages:
+                    fingerprint["last_page_hash"] = _page_hash(last_pages[url])
+                state[key] = {**fingerprint, "films": scraped[url],
+                              "synced_at": datetime.now().isoformat(timespec="seconds")}
+
+    _record_source_times(sources, start, done)
+    return {s["url"]: results.get(s["url"]) for s in sources}
+
+
+def _record_source_times(sources, start, done):
+    for source in sources:
+        if source["url"] in done:
+            record_span(f"scrape:{source['key']}", done[source["url"]] - start)
@@ -0,0 +1,160 @@
+"""
+Concurrent lookup engine for the per-film TMDB + JustWatch step of a scan.
+
+Films are looked up on a bounded thread pool. Pacing comes from the shared
+per-upstream token buckets in `rate_limit`, not from sleeping between films,
+and results are returned in input order so output matches the serial path.
+
+By default films are handled in chunks (one chunk per worker at a time): TMDB
+per film, then every JustWatch search of the chunk in one aliased GraphQL
+request and every offers lookup in another (justwatch_batch), instead of one
+or two round trips per film.
+
+The tmdb, resolve and offers stages are timed in `metrics` (busy time summed
+over the workers).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from justwatch_batch import resolve_movie_ids, streaming_offers_batch, BATCH_SIZE
+from justwatch_query import get_film_offers_api, resolve_movie_id, print_offers
+from jw_index import get_index
+from metrics import span
+from poster_service import resolve_movie, NO_POSTER_URL
+
+DEFAULT_WORKERS = 4
+
+
+def _local_title(film, movie, countries):
+    """Title to search JustWatch with first: TMDB's title for the first configured country."""
+    if movie:
+        return movie["localized_titles"].get(countries[0].lower(), film["title"])
+    return film["title"]
+
+
+def _index_slug(film):
+    return film.get("slug") or f"{film['title']}_{film['year']}"
+
+
+def _has_year(film):
+    try:
+        int(film["year"])
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _result(movie, offers):
+    return {
+        "tmdb_id": movie["tmdb_id"] if movie else None,
+        "poster_url": movie["poster_url"] if movie else NO_POSTER_URL,
+        "runtime": movie["runtime"] if movie else None,
+        "offers": offers,
+    }
+
+
+def lookup_film(film, countries, tmdb_token):
+    """
+    Run every upstream lookup for a single film.
+    Returns dict with keys: tmdb_id, poster_url, runtime, offers ({country: [provider, ...]},
+    or None when the JustWatch search or offers lookup failed, so the film's stored offers are kept)
+    """
+    # One TMDB search + details call covers poster, runtime and every localized title
+    with span("tmdb"):
+        movie = resolve_movie(film["title"], film["year"], tmdb_token)
+
+    # Get localized title (use first configured country for search hint)
+    local_title = _local_title(film, movie, countries)
+
+    # Reuse a confident JustWatch match from earlier scans, else search and remember it
+    index = get_index()
+    slug = _index_slug(film)
+    entry = index.get(slug)
+    failed = False
+    if entry is not None:
+        node_id = entry["node_id"]
+    else:
+        try:
+            with span("resolve"):
+                node_id, confidence = resolve_movie_id(film["title"], int(film["year"]), local_title=local_title)
+        except (TypeError, ValueError):
+            node_id, confidence = None, 0.0
+        else:
+            # (None, None): the search failed, so the film's stored offers are kept
+            failed = confidence is None
+            if confidence is not None:
+                index.put(slug, node_id, confidence, tmdb_id=movie["tmdb_id"] if movie else None,
+                          title=film["title"], year=film["year"])
+
+    # Single API call gets offers for ALL countries
+    offers = None if failed else {}
+    if node_id:
+        with span("offers"):
+            offers = get_film_offers_api(film["title"], film["year"], countries, node_id=node_id)
+
+    return _result(movie, offers)
+
+
+def lookup_batch(films, countries, tmdb_token, batch_size=BATCH_SIZE):
+    """
+    lookup_film for a chunk of films, with the chunk's JustWatch searches and
+    offers lookups sent as batched GraphQL requests. Returns results in order.
+    """
+    with span("tmdb"):
+        movies = [resolve_movie(film["title"], film["year"], tmdb_token) for film in films]
+
+    index = get_index()
+    entries = [index.get(_index_slug(film)) for film in films]
+    node_ids = [entry["node_id"] if entry is not None else None for entry in entries]
+
+    unresolved = [i for i, entry in enumerate(entries) if entry is None]
+    searches = [(films[i]["title"], films[i]["year"], _local_title(films[i], movies[i], countries))
+                for i in unresolved]
+    with span("resolve"):
+        resolved = resolve_movie_ids(searches, batch_size)
+    offers = [{} for _ in films]
+    for i, (node_id, confidence) in zip(unresolved, resolved):
+        node_ids[i] = node_id
+        if confidence is not None:
+            index.put(_index_slug(films[i]), node_id, confidence,
+                      tmdb_id=movies[i]["tmdb_id"] if movies[i] else None,
+                      title=films[i]["title"], year=films[i]["year"])
+        elif _has_year(films[i]):
+            offers[i] = None  # the search failed: keep the stored offers
+
+    found = [i for i, node_id in enumerate(node_ids) if node_id]
+    with span("offers"):
+        found_offers = streaming_offers_batch([node_ids[i] for i in found], countries, batch_size)
+    for i, film_offers in zip(found, found_offers):
+        if film_offers is not None:
+            print_offers(film_offers)
+        offers[i] = film_offers
+
+    return [_result(movie, film_offers) for movie, film_offers in zip(movies, offers)]
+
+
+def lookup_films(films, countries, tmdb_token, workers=DEFAULT_WORKERS, batch_size=BATCH_SIZE):
+    """
+    Look up many films concurrently, `batch_size` films per JustWatch request
+    (1 = one request per search/offers lookup, as before).
+    Yields (film, result) pairs in the same order as `films`.
+    """
+    if batch_size > 1:
+        chunks = [films[i:i + batch_size] for i in range(0, len(films), batch_size)]
+        if workers <= 1:
+            for chunk in chunks:
+                yield from zip(chunk, lookup_batch(chunk, countries, tmdb_token, batch_size))
+            return
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lookup") as executor:
+            for chunk, results in zip(chunks, executor.map(lambda c: lookup_batch(c, countries, tmdb_token, batch_size), chunks)):
+                yield from zip(chunk, results)
+        return
+
+    if workers <= 1:
+        for film in films:
+            yield film, lookup_film(film, countries, tmdb_token)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lookup") as executor:
+        results = executor.map(lambda f: lookup_film(f, countries, tmdb_token), films)
+        yield from zip(films, results)
@@ -0,0 +1,164 @@
+"""
+Backend for the app's Quick Lookup tab.
+
+A lookup first checks the local offers dataset (films already in a scanned
+list answer instantly, with no upstream call). Otherwise it searches
+JustWatch and fetches offers for the configured countries. Search results and
+offers are kept in an in-process TTL/LRU cache, and identical lookups that
+are in flight at the same time (reruns, several browser sessions) share one
+upstream call instead of each spending JustWatch rate limit.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+from justwatch_query import search_titles, offers_by_country, streaming_providers, title_score
+
+DEFAULT_COUNTRIES = ["US"]
+CACHE_TTL = 30 * 60      # seconds; offers change daily at most
+CACHE_MAX_ENTRIES = 512
+SEARCH_COUNT = 5
+
+
+def load_countries(config_path: Path) -> list[str]:
+    """Countries to look up, from config.json's `country_scan` (US if missing)."""
+    if config_path.exists():
+        with open(config_path) as f:
+            return json.load(f).get("country_scan", DEFAULT_COUNTRIES)
+    return DEFAULT_COUNTRIES
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (True, value) for a fresh entry, else (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class LookupService:
+    """
+    Cached, coalescing movie lookups. `data` is the app's WatchlistData (or
+    None); films found there are answered from the dataset.
+    """
+
+    def __init__(self, countries, data=None, ttl: float = CACHE_TTL,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.countries = [c.upper() for c in countries]
+        self.data = data
+        self.cache = TTLCache(ttl, max_entries)
+        self._in_flight: dict = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key, fetch):
+        """
+        Return the cached value for `key`, or run `fetch()` once for all
+        concurrent callers asking for the same key. Errors are not cached.
+        """
+        found, value = self.cache.get(key)
+        if found:
+            return value
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+            self.cache.put(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def search(self, query: str, year: int | None = None) -> list[dict]:
+        """JustWatch movie matches as dicts (node_id, title, year), best first."""
+        key = ("search", query.strip().casefold(), year)
+
+        def fetch():
+            results = search_titles(query.strip(), count=SEARCH_COUNT)
+            movies = [r for r in results if r.object_type == "MOVIE"]
+            if year:
+                year_filtered = [r for r in movies if r.release_year and abs(r.release_year - year) <= 1]
+                if year_filtered:
+                    movies = year_filtered
+            # Closest titles first; JustWatch's order breaks ties
+            movies.sort(key=lambda r: -title_score(query, r.title))
+            return [{"node_id": r.entry_id, "title": r.title, "year": r.release_year} for r in movies]
+
+        return self._cached(key, fetch)
+
+    def offers(self, node_id: str) -> dict[str, list[str]]:
+        """Streaming providers per country for a JustWatch node."""
+        return self._cached(
+            ("offers", node_id, tuple(self.countries)),
+            lambda: streaming_providers(offers_by_country(node_id, self.countries)),
+        )
+
+    def local_match(self, query: str, year: int | None = None) -> dict | None:
+        """The film from the offers dataset with this exact title (and year ±1), if any."""
+        if self.data is None or not len(self.data.films):
+            return None
+        films = self.data.films
+        candidates = films[films["title"].str.casefold() == query.strip().casefold()]
+        if year:
+            candidates = candidates[(candidates["year"] - year).abs() <= 1]
+        if candidates.empty:
+            return None
+
+        film_id = int(candidates.index[0])
+        movie = self.data.movies(np.ones(len(self.data), dtype=bool), [film_id]).iloc[0]
+        offers: dict[str, list[str]] = {}
+        for country, provider in zip(movie["country"], movie["provider"]):
+            offers.setdefault(country, []).append(provider)
+        return {"title": movie["title"], "year": int(movie["year"]), "offers": offers, "source": "dataset"}
+
+    def lookup(self, query: str, year: int | None = None) -> dict | None:
+        """
+        Best match for `query` as {title, year, offers: {country: [providers]},
+        source: "dataset" | "justwatch"}, or None when nothing was found.
+        """
+        local = self.local_match(query, year)
+        if local:
+            return local
+        matches = self.search(query, year)
+        if not matches:
+            return None
+        match = matches[0]
+        return {**match, "offers": self.offers(match["node_id"]), "source": "justwatch"}
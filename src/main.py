@@ -1,28 +1,45 @@
+import argparse
 import json
 import os
 import pandas as pd
-import time
-import random
-import re
 from datetime import datetime
 from pathlib import Path
-from playwright.sync_api import sync_playwright
 
 # --- LOCAL MODULES ---
-from letterbox_scraper import scrape_films, discover_lists
-from justwatch_query import get_film_offers_api
-from poster_service import get_movie_metadata, get_localized_title
-from alert_service import find_new_availability, send_alert_email
+from letterbox_scraper import discover_lists, make_fetcher, FETCHER_BACKENDS, DEFAULT_PAGE_WORKERS, LETTERBOXD_URL
+from list_sync import sync_sources, load_state, save_state
+from lookup_engine import lookup_films, DEFAULT_WORKERS, BATCH_SIZE
+from rate_limit import configure_limiter, limiter_stats, CircuitOpenError, DEFAULT_RATES
+from http_client import configure_session, host_stats, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+from tmdb_cache import configure_cache
+from jw_index import configure_index
+from providers import configure_providers
+from offers_store import OfferSink, save_offers, export_csv
+from alert_service import pending_alerts, send_alert_email, ALERT_CONSUMER, EXCLUDED_SOURCES
+from change_log import latest_event_id, set_cursor
+from run_journal import RunJournal
+from refresh_scheduler import RefreshScheduler, DEFAULT_REFRESH_FILMS
+from metrics import configure_metrics, get_metrics, span, write_summary, write_prometheus
 
 # --- PATHS ---
 SCRIPT_DIR = Path(__file__).resolve().parent
 BASE_DIR = SCRIPT_DIR.parent 
-DATA_DIR = BASE_DIR / "data"
+# Both overridable, e.g. to run a scan against local mock upstreams (bench/suite.py)
+DATA_DIR = Path(os.environ.get("WATCHLIST_DATA_DIR", BASE_DIR / "data"))
+CONFIG_FILE = os.environ.get("WATCHLIST_CONFIG")
 OUTPUT_FILE = DATA_DIR / "unwatched_by_country.csv"
+STORE_FILE = DATA_DIR / "offers.sqlite"
+TMDB_CACHE_FILE = DATA_DIR / "tmdb_cache.sqlite"
+JW_INDEX_FILE = DATA_DIR / "jw_index.json"
+PROVIDERS_FILE = DATA_DIR / "providers.json"
+LIST_SYNC_FILE = DATA_DIR / "list_sync.json"
+RUN_JOURNAL_FILE = DATA_DIR / "run_journal.jsonl"
+REFRESH_SCHEDULE_FILE = DATA_DIR / "refresh_schedule.json"
+RUN_METRICS_FILE = DATA_DIR / "run_metrics.json"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 def load_config():
-    paths = [SCRIPT_DIR / "config.json", BASE_DIR / "config.json"]
+    paths = [Path(CONFIG_FILE)] if CONFIG_FILE else [SCRIPT_DIR / "config.json", BASE_DIR / "config.json"]
     config = None
     for p in paths:
         if p.exists():
@@ -60,187 +77,303 @@ def save_history(source_key: str, history_set: set):
     with open(path, "w") as f:
         json.dump(list(history_set), f)
 
-def clean_provider_name(name):
-    if not name or pd.isna(name):
-        return name
-    
-    # 1. Remove specific add-on suffixes
-    name = re.sub(r'\s*(?:on\s+)?(?:Amazon|Apple TV|U-Next|BFI|Curzon|Studiocanal)\s+Channel.*', '', name, flags=re.IGNORECASE)
-    
-    # 2. Remove tier and ad descriptors
-    name = re.sub(r'\s*(?:with Ads|Standard with Ads|Basic with Ads|Premium|Essential|Total|Ficción Total|Player|Extra|Basic|on U-Next).*', '', name, flags=re.IGNORECASE)
-
-    # 3. Specific manual cleanup
-    name = name.replace("Paramount Plus", "Paramount+")
-    name = name.replace("AMC Plus", "AMC+")
-    
-    return name.strip()
-
-def main():
+def stage_result(sink, position, film, result, sources, last_updated):
+    """Write one film's lookup to the store's staging tables (one row per offer)."""
+    offers = [
+        (country.upper(), provider)
+        for country, providers in result["offers"].items()
+        for provider in sorted(set(providers))
+    ]
+    sink.add(position, film["title"], film["year"], offers, poster_url=result["poster_url"],
+             runtime=result["runtime"], sources=sorted(sources), last_updated=last_updated)
+
+def record_checks(scheduler, changed, scanned_ids, refresh_ids, now):
+    """Tell the scheduler which films were checked and whether their offers changed."""
+    changed_ids = {f"{title}_{year}" for title, year in changed}
+    for fid in scanned_ids:
+        scheduler.record(fid, changed=fid in refresh_ids and fid in changed_ids, now=now)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sync a Letterboxd library with JustWatch streaming offers.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Concurrent film lookups (default: {DEFAULT_WORKERS}, 1 = serial)")
+    parser.add_argument("--rps", type=float, default=DEFAULT_RATES["justwatch"],
+                        help=f"Max JustWatch requests per second; the rate backs off on 429s and "
+                             f"recovers gradually (default: {DEFAULT_RATES['justwatch']})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Films per batched JustWatch search/offers request (default: {BATCH_SIZE}, "
+                             f"1 = one request per film)")
+    parser.add_argument("--tmdb-rps", type=float, default=DEFAULT_RATES["tmdb"],
+                        help=f"Max TMDB requests per second (default: {DEFAULT_RATES['tmdb']})")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help=f"HTTP connections kept alive per host (default: max(workers, {DEFAULT_POOL_SIZE}))")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT[1],
+                        help=f"HTTP read timeout in seconds (default: {DEFAULT_TIMEOUT[1]})")
+    parser.add_argument("--page-workers", type=int, default=DEFAULT_PAGE_WORKERS,
+                        help=f"Concurrent Letterboxd page fetches (default: {DEFAULT_PAGE_WORKERS})")
+    parser.add_argument("--letterboxd-rps", type=float, default=DEFAULT_RATES["letterboxd"],
+                        help=f"Max Letterboxd page requests per second (default: {DEFAULT_RATES['letterboxd']})")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="Re-scrape every page of every source instead of skipping unchanged lists")
+    parser.add_argument("--fetcher", choices=sorted(FETCHER_BACKENDS), default="auto",
+                        help="Letterboxd page fetcher: 'auto' tries plain HTTP, then cloudscraper, "
+                             "then headless Chromium when a page is blocked (default: auto)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run: reuse its refresh plan and journaled lookups")
+    parser.add_argument("--refresh-films", "--budget", type=int, default=DEFAULT_REFRESH_FILMS,
+                        help=f"Max already-known films to re-check this run, most overdue first; a film "
+                             f"count, not a request count (default: {DEFAULT_REFRESH_FILMS}; "
+                             f"new films are always checked)")
+    parser.add_argument("--full-scan", action="store_true",
+                        help="Re-check every film regardless of its refresh schedule")
+    parser.add_argument("--metrics-textfile", type=Path, default=os.environ.get("METRICS_TEXTFILE"),
+                        help="Also write the run metrics as a Prometheus textfile (e.g. "
+                             "/var/lib/node_exporter/textfile/watchlist.prom; env METRICS_TEXTFILE)")
+    return parser.parse_args(argv)
+
+def run(args):
+    configure_limiter("justwatch", args.rps)
+    configure_limiter("tmdb", args.tmdb_rps)
+    configure_limiter("letterboxd", args.letterboxd_rps)
+    for session_name in ("default", "justwatch"):
+        configure_session(pool_size=args.pool_size or max(args.workers, DEFAULT_POOL_SIZE),
+                          timeout=(DEFAULT_TIMEOUT[0], args.timeout), name=session_name)
+    tmdb_cache = configure_cache(TMDB_CACHE_FILE)
+    jw_index = configure_index(JW_INDEX_FILE)
+    provider_registry = configure_providers(PROVIDERS_FILE)
+
     config = load_config()
     USERNAME = config["letterboxd_user"]
     TMDB_TOKEN = config["tmdb_key"]
     COUNTRIES = config.get("country_scan", ["US"])
 
+    journal = RunJournal(RUN_JOURNAL_FILE)
+    unfinished = journal.load()
+    resuming = args.resume and unfinished
+    if unfinished and not args.resume:
+        print("⚠️ The previous run did not finish; starting over (pass --resume to continue it).")
+
     # --- 1. Discover sources (Task 4.1) ---
     print(f"--- Fetching Letterboxd data for {USERNAME} ---")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        page = context.new_page()
+    fetcher = make_fetcher(args.fetcher, pool_size=args.pool_size or DEFAULT_POOL_SIZE)
 
-        sources = [{'name': 'Watchlist', 'url': f'https://letterboxd.com/{USERNAME}/watchlist/', 'key': 'watchlist'}]
+    sources = [{'name': 'Watchlist', 'url': f'{LETTERBOXD_URL}/{USERNAME}/watchlist/', 'key': 'watchlist'}]
+    with span("discover"):
         try:
-            discovered = discover_lists(USERNAME, pw_page=page)
+            discovered = discover_lists(USERNAME, fetcher=fetcher, workers=args.page_workers)
         except Exception as e:
             print(f"⚠️ Failed to discover lists: {e}")
             discovered = []
 
-        for lst in discovered:
-            sources.append({
-                'name': lst['name'],
-                'url': f"https://letterboxd.com{lst['url']}",
-                'key': f"list_{lst['slug']}",
-            })
-        print(f"📋 Found {len(sources)} sources: {', '.join(s['name'] for s in sources)}")
-
-        # --- 2. Determine scan mode ---
-        today = datetime.today()
-        is_full_scan = today.weekday() == 6 or today.day == 1
-
-        if is_full_scan:
-            print(f"📅 {today.strftime('%Y-%m-%d')}: FULL SCAN TRIGGERED (Sunday/1st of Month)")
+    for lst in discovered:
+        sources.append({
+            'name': lst['name'],
+            'url': f"{LETTERBOXD_URL}{lst['url']}",
+            'key': f"list_{lst['slug']}",
+        })
+    print(f"📋 Found {len(sources)} sources: {', '.join(s['name'] for s in sources)}")
+
+    # --- 2. Load the refresh schedule ---
+    today = datetime.today()
+    scheduler = RefreshScheduler(REFRESH_SCHEDULE_FILE)
+    if resuming:
+        print(f"♻️ Resuming run from {journal.header['started_at']} "
+              f"({len(journal.done)} lookups already done)")
+
+    # --- 3. Per-source scraping with dedup tracking (Tasks 4.2 & 4.3) ---
+    all_films = {}  # film_id -> {'film': dict, 'sources': set}
+    combined_current_ids = set()
+    new_ids = set()  # film_ids not seen before in their source
+
+    # Every page of every source is fetched through one shared, rate-limited pool;
+    # unchanged lists are answered from the stored sync state after one request
+    print(f"\n📂 Syncing {len(sources)} sources{' (full)' if args.full_sync else ''}...")
+    sync_state = load_state(LIST_SYNC_FILE)
+    with span("scrape"):
+        scraped = sync_sources(sources, fetcher, sync_state, incremental=not args.full_sync,
+                               workers=args.page_workers)
+
+    # Histories are only written once the offers are persisted (step 6), so a
+    # crashed run doesn't mark unscanned films as seen
+    pending_history = {}
+
+    for source in sources:
+        films = scraped[source['url']]
+        if films is None:
+            print(f"⚠️ Failed to scrape {source['name']}")
+            continue
+        print(f"📂 {source['name']}: {len(films)} films")
+
+        history = load_history(source['key'])
+        source_ids = {f"{f['title']}_{f['year']}" for f in films}
+        combined_current_ids.update(source_ids)
+
+        # Track sources per film for deduplication and tagging
+        for f in films:
+            fid = f"{f['title']}_{f['year']}"
+            if fid not in all_films:
+                all_films[fid] = {'film': f, 'sources': set()}
+            all_films[fid]['sources'].add(source['name'])
+
+        # New films for this source are always scanned
+        new_ids.update(source_ids - history)
+
+        pending_history[source['key']] = (source_ids, source_ids - history)
+
+    # Letterboxd is done; release connections (and Chromium, if it was needed)
+    fetcher.close()
+
+    # Known films are re-checked when the scheduler says they're due, up to --refresh-films of them
+    known_ids = [fid for fid in all_films if fid not in new_ids]
+    with span("plan"):
+        if resuming:
+            refresh_ids = set(journal.header.get("refresh", [])) & set(known_ids)
+        elif args.full_scan:
+            refresh_ids = set(known_ids)
         else:
-            print(f"📅 {today.strftime('%Y-%m-%d')}: DAILY SCAN (New movies only)")
-
-        # --- 3. Per-source scraping with dedup tracking (Tasks 4.2 & 4.3) ---
-        all_films = {}  # film_id -> {'film': dict, 'sources': set}
-        combined_current_ids = set()
-        films_to_scan_set = set()  # film_ids that need JustWatch scanning
-
-        for source in sources:
-            print(f"\n📂 Scraping source: {source['name']}")
-            try:
-                films = scrape_films(source['url'], pw_page=page)
-            except Exception as e:
-                print(f"⚠️ Failed to scrape {source['name']}: {e}")
-                continue
-
-            history = load_history(source['key'])
-            source_ids = {f"{f['title']}_{f['year']}" for f in films}
-            combined_current_ids.update(source_ids)
-
-            # Track sources per film for deduplication and tagging
-            for f in films:
-                fid = f"{f['title']}_{f['year']}"
-                if fid not in all_films:
-                    all_films[fid] = {'film': f, 'sources': set()}
-                all_films[fid]['sources'].add(source['name'])
-
-            # Determine what to scan for this source
-            if is_full_scan:
-                for f in films:
-                    films_to_scan_set.add(f"{f['title']}_{f['year']}")
-            else:
-                for f in films:
-                    fid = f"{f['title']}_{f['year']}"
-                    if fid not in history:
-                        films_to_scan_set.add(fid)
-
-            # Save history for this source
-            save_history(source['key'], source_ids)
-
-        # Build deduplicated films_to_scan list
-        films_to_scan = [all_films[fid]['film'] for fid in films_to_scan_set if fid in all_films]
-
-        # --- 4. Query JustWatch via API (all countries per movie in one call) ---
-        new_rows = []
-
-        if not films_to_scan:
-            print("☕ No new movies to check for streaming offers.")
-        else:
-            print(f"🚀 Processing {len(films_to_scan)} movies across {len(COUNTRIES)} countries...")
-            movie_cache = {}
-
-            for film in films_to_scan:
-                movie_id = f"{film['title']}_{film['year']}"
-
-                if movie_id not in movie_cache:
-                    poster, runtime = get_movie_metadata(film["title"], film["year"], TMDB_TOKEN)
-                    movie_cache[movie_id] = {"poster_url": poster, "runtime": runtime}
-
-                # Get localized title (use first non-English country for search hint)
-                local_title = get_localized_title(film["title"], film["year"], COUNTRIES[0], TMDB_TOKEN)
-
-                # Single API call gets offers for ALL countries
-                offers_by_country = get_film_offers_api(
-                    film["title"], film["year"], COUNTRIES, local_title=local_title
-                )
-
-                source_label = ", ".join(sorted(all_films[movie_id]['sources']))
-                for country, providers in offers_by_country.items():
-                    unique_cleaned = {clean_provider_name(p) for p in providers}
-                    for provider in unique_cleaned:
-                        new_rows.append({
-                            "title": film["title"],
-                            "year": film["year"],
-                            "country": country.upper(),
-                            "provider": provider,
-                            "poster_url": movie_cache[movie_id]["poster_url"],
-                            "runtime": movie_cache[movie_id]["runtime"],
-                            "last_updated": today.strftime("%Y-%m-%d"),
-                            "source": source_label,
-                        })
-
-                time.sleep(random.uniform(1.0, 2.0))
-
-        browser.close()
-
-    # --- 5. Pruning with combined multi-source IDs (Task 4.5) ---
-    # Save snapshot of old CSV for alert comparison
-    OLD_SNAPSHOT = DATA_DIR / "unwatched_by_country.old.csv"
-    if OUTPUT_FILE.exists():
-        import shutil
-        shutil.copy2(OUTPUT_FILE, OLD_SNAPSHOT)
-
-    if OUTPUT_FILE.exists():
-        df_existing = pd.read_csv(OUTPUT_FILE)
-        df_existing['temp_id'] = df_existing['title'] + "_" + df_existing['year'].astype(str)
-
-        # PRUNE: Keep only rows where the movie still exists in any current source
-        df_pruned = df_existing[df_existing['temp_id'].isin(combined_current_ids)].copy()
-        df_pruned.drop(columns=['temp_id'], inplace=True)
-
-        rows_removed = len(df_existing) - len(df_pruned)
-        if rows_removed > 0:
-            print(f"🧹 Pruned {rows_removed} rows for movies removed from Letterboxd.")
-    else:
-        df_pruned = pd.DataFrame()
-
-    # --- 6. Save results ---
-    if new_rows:
-        df_new = pd.DataFrame(new_rows)
-        if is_full_scan:
-            # Full scan: Fresh start
-            df_new.to_csv(OUTPUT_FILE, index=False)
-        else:
-            # Daily scan: Merge new findings with the pruned existing database
-            combined_df = pd.concat([df_pruned, df_new]).drop_duplicates(
-                subset=["title", "year", "country", "provider"], keep="last"
-            )
-            combined_df.to_csv(OUTPUT_FILE, index=False)
+            eligible = {fid: any(s not in EXCLUDED_SOURCES for s in all_films[fid]['sources']) for fid in known_ids}
+            refresh_ids = set(scheduler.due(known_ids, eligible, max_films=args.refresh_films, now=today))
+    print(f"📅 {today.strftime('%Y-%m-%d')}: {len(new_ids)} new films, "
+          f"{len(refresh_ids)}/{len(known_ids)} known films due for a refresh"
+          f"{' (full scan)' if args.full_scan and not resuming else ''}")
+
+    # Build deduplicated films_to_scan list (in discovery order, so runs are reproducible)
+    films_to_scan = [entry['film'] for fid, entry in all_films.items() if fid in new_ids or fid in refresh_ids]
+    metrics = get_metrics()
+    metrics.gauge("films", len(all_films), kind="listed")
+    metrics.gauge("films", len(new_ids), kind="new")
+    metrics.gauge("films", len(refresh_ids), kind="refresh")
+
+    # --- 4. Query TMDB + JustWatch concurrently (all countries per movie in one call) ---
+    # Each finished lookup is checkpointed in the run journal (--resume skips those) and
+    # streamed into the store's staging tables, so the run never holds all its rows in memory
+    journal.start({"full_scan": args.full_scan, "refresh": sorted(refresh_ids)}, resume=resuming)
+    pending = [f for f in films_to_scan if f"{f['title']}_{f['year']}" not in journal.done]
+
+    first_run = not STORE_FILE.exists() and not OUTPUT_FILE.exists()
+    if not STORE_FILE.exists() and OUTPUT_FILE.exists():
+        # Data from before the store existed: import the CSV once
+        save_offers(pd.read_csv(OUTPUT_FILE), STORE_FILE)
+    sink = OfferSink(STORE_FILE)
+    last_updated = today.strftime("%Y-%m-%d")
+    positions = {f"{f['title']}_{f['year']}": i for i, f in enumerate(films_to_scan)}
+    failed_ids = set()  # JustWatch lookups that failed: keep their stored offers, retry next run
+    for movie_id, result in journal.results.items():
+        if movie_id in positions:
+            stage_result(sink, positions[movie_id], all_films[movie_id]['film'], result,
+                         all_films[movie_id]['sources'], last_updated)
+    journal.results.clear()
+
+    if not films_to_scan:
+        print("☕ No new movies to check for streaming offers.")
+    elif not pending:
+        print(f"♻️ All {len(films_to_scan)} movies already looked up in the journaled run.")
     else:
-        # No new movies found — still save pruned version to reflect deletions
-        df_pruned.to_csv(OUTPUT_FILE, index=False)
-
-    print(f"✅ Sync complete. Results: {OUTPUT_FILE}")
-
-    # --- 7. Check for new availability and send alerts ---
-    if OLD_SNAPSHOT.exists():
-        newly_available = find_new_availability(OLD_SNAPSHOT, OUTPUT_FILE)
-        send_alert_email(newly_available)
-        OLD_SNAPSHOT.unlink()  # Clean up snapshot
+        print(f"🚀 Processing {len(pending)} movies across {len(COUNTRIES)} countries "
+              f"({args.workers} workers, {args.rps} JustWatch req/s)...")
+        with span("lookup"):
+            try:
+                for film, result in lookup_films(pending, COUNTRIES, TMDB_TOKEN, workers=args.workers,
+                                                 batch_size=args.batch_size):
+                    movie_id = f"{film['title']}_{film['year']}"
+                    if result["offers"] is None:
+                        failed_ids.add(movie_id)
+                        continue
+                    journal.record(movie_id, result)
+                    stage_result(sink, positions[movie_id], film, result,
+                                 all_films[movie_id]['sources'], last_updated)
+            except CircuitOpenError as e:
+                print(f"🔌 JustWatch keeps failing ({e}); stopping. "
+                      f"{len(journal.done)} lookups are journaled, rerun with --resume.")
+                raise
+            finally:
+                # Keep resolved JustWatch IDs and package names even if the run dies here (the TMDB cache autocommits)
+                journal.close()
+                jw_index.save()
+                provider_registry.save()
+
+    evicted = tmdb_cache.evict()
+    stats = tmdb_cache.stats()
+    print(f"🗄️ TMDB cache: {stats['hits']} hits, {stats['negative_hits']} negative hits, "
+          f"{stats['misses'] + stats['expired']} misses, {evicted} evicted, {stats['entries']} entries")
+    tmdb_cache.close()
+    metrics.gauges_from("cache", {"tmdb": stats}, "cache")
+    for host, h in host_stats().items():
+        print(f"🌐 {host}: {h['requests']} requests, {h['errors']} errors, {h['retries']} retries, "
+              f"avg {h['avg_latency'] * 1000:.0f}ms, max {h['max_latency'] * 1000:.0f}ms")
+    for name, lim in limiter_stats().items():
+        adaptive = (f", {lim['throttles']} throttles, {lim['failures']} failures, "
+                    f"{lim['breaker_trips']} breaker trips, {lim['pause_time']:.1f}s paused, "
+                    f"ended at {lim['rate']:.2f}/{lim['max_rate']:.2f} req/s"
+                    if "throttles" in lim else "")
+        print(f"🚦 {name}: {lim['acquired']} calls, waited {lim['wait_time']:.1f}s{adaptive}")
+
+    # --- 5. Prune + save: merge the staged lookups into the store (Task 4.5) ---
+    # In SQL, in one transaction: films gone from every source are dropped, scanned films
+    # get their rows replaced (so offers that went away disappear too), and the
+    # difference goes to the change log. The CSV export is streamed from the store.
+    current_films = [(entry['film']['title'], entry['film']['year']) for entry in all_films.values()]
+    with span("merge"):
+        merged = sink.merge(current_films)
+    sink.close()
+    if merged["pruned"]:
+        print(f"🧹 Pruned {merged['pruned']} rows for movies removed from Letterboxd.")
+    with span("export"):
+        export_csv(STORE_FILE, OUTPUT_FILE)
+
+    metrics.gauge("offer_rows", merged["rows"])
+    print(f"✅ Sync complete. Results: {STORE_FILE} (CSV export: {OUTPUT_FILE})")
+    metrics.gauge("films", len(failed_ids), kind="failed")
+    if failed_ids:
+        print(f"⚠️ {len(failed_ids)} JustWatch lookups failed; their stored offers were kept and they are retried next run.")
+
+    # --- 6. Offers are safe on disk: now the films count as seen/checked, and the run is done ---
+    # (failed lookups of new films stay new, so the next run scans them again)
+    for key, (source_ids, new_in_source) in pending_history.items():
+        save_history(key, source_ids - (new_in_source & failed_ids))
+    save_state(sync_state, LIST_SYNC_FILE)
+    scanned_ids = {f"{f['title']}_{f['year']}" for f in films_to_scan} - failed_ids
+    record_checks(scheduler, merged["changed"], scanned_ids, refresh_ids, today)
+    scheduler.save(keep=combined_current_ids)
+    journal.finish()
+
+    # --- 7. Alert on offers added since the last alert ---
+    events = sorted(merged["events"].items(), key=lambda item: -item[1])
+    print(f"📝 Change log: {sum(n for _, n in events)} events "
+          f"({', '.join(f'{n} {kind}' for kind, n in events) or 'no changes'})")
+    if first_run:
+        # First run: everything is "added", nothing is news
+        set_cursor(STORE_FILE, ALERT_CONSUMER, latest_event_id(STORE_FILE))
+
+    with span("alert"):
+        newly_available, last_event = pending_alerts(STORE_FILE)
+        if send_alert_email(newly_available):
+            set_cursor(STORE_FILE, ALERT_CONSUMER, last_event)
+
+def write_run_metrics(args, status, error=None):
+    """Write the run summary (and the Prometheus textfile, if configured) and print the stage times."""
+    metrics = get_metrics()
+    metrics.gauges_from("http", host_stats(), "upstream")
+    metrics.gauges_from("limiter", limiter_stats(), "upstream")
+    write_summary(RUN_METRICS_FILE, status=status, error=error, args=vars(args))
+    if args.metrics_textfile:
+        write_prometheus(args.metrics_textfile)
+    stages = metrics.stages()
+    if stages:
+        print("⏱️ Stages: " + ", ".join(f"{stage} {s['seconds']:.1f}s" for stage, s in stages.items()))
+    print(f"📈 Run metrics: {RUN_METRICS_FILE}"
+          f"{f' (Prometheus: {args.metrics_textfile})' if args.metrics_textfile else ''}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_metrics()
+    try:
+        run(args)
+    except BaseException as e:
+        write_run_metrics(args, "failed", error=repr(e))
+        raise
+    write_run_metrics(args, "ok")
 
 if __name__ == "__main__":
     main()
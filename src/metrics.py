@@ -0,0 +1,264 @@
+"""
+Run metrics for the scan pipeline: stage timings, latency histograms and counters.
+
+- Stages: `with span("save"): ...` adds the block's wall time to the stage.
+  Stages entered from worker threads (resolve, offers, ...) add up busy
+  time over all workers, so they can exceed the run's wall time.
+  `record_span(stage, seconds)` adds a duration measured elsewhere, e.g. how
+  long each Letterboxd source took inside the shared page pool.
+- Histograms: `observe("http_request_seconds", latency, upstream=host)`,
+  one series per label set, with fixed latency buckets.
+- Counters and gauges: `incr(...)` / `gauge(...)`, e.g. batch fallbacks,
+  or the limiter (throttles, pauses) and host (retries) snapshots taken at
+  the end of a run.
+
+main.py writes everything as a JSON run summary next to the data
+(data/run_metrics.json) and, if asked, as a Prometheus textfile for
+node_exporter's textfile collector.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Upper bounds in seconds; an implicit +Inf bucket follows
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROMETHEUS_PREFIX = "lbjw_"
+
+# HELP lines for the Prometheus export (other series get a generic one)
+DESCRIPTIONS = {
+    "http_request_seconds": "Latency of pooled HTTP requests per upstream host (TMDB, JustWatch, Letterboxd).",
+    "justwatch_request_seconds": "Latency of JustWatch GraphQL requests per operation.",
+    "letterboxd_page_seconds": "Letterboxd page load time per fetcher backend and source listing.",
+}
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the max for the +Inf bucket)."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """Thread-safe store for one run's stages, histograms, counters and gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self._stages: dict[str, dict] = {}
+        self._histograms: dict[tuple, _Histogram] = {}
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(stage, time.perf_counter() - start)
+
+    def record_span(self, stage: str, seconds: float):
+        with self._lock:
+            s = self._stages.setdefault(stage, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            s["count"] += 1
+            s["seconds"] += seconds
+            s["max_seconds"] = max(s["max_seconds"], seconds)
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            key = _key(name, labels)
+            if key not in self._histograms:
+                self._histograms[key] = _Histogram()
+            self._histograms[key].observe(value)
+
+    def incr(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            key = _key(name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def gauges_from(self, name: str, snapshot: dict, label: str):
+        """
+        Record a {key: {stat: number}} snapshot (limiter_stats(), host_stats())
+        as gauges named <name>_<stat>, labelled <label>=key.
+        """
+        for key, stats in snapshot.items():
+            for stat, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.gauge(f"{name}_{stat}", value, **{label: key})
+
+    def stages(self) -> dict:
+        with self._lock:
+            return {stage: dict(s) for stage, s in self._stages.items()}
+
+    def summary(self) -> dict:
+        """Everything recorded so far as plain JSON-able data."""
+        with self._lock:
+            histograms = {}
+            for (name, labels), h in sorted(self._histograms.items()):
+                histograms.setdefault(name, []).append({
+                    "labels": dict(labels), "count": h.count, "sum": h.sum,
+                    "avg": h.sum / h.count if h.count else 0.0,
+                    "p50": h.quantile(0.5), "p95": h.quantile(0.95), "max": h.max,
+                })
+
+            def series(store):
+                grouped = {}
+                for (name, labels), value in sorted(store.items()):
+                    grouped.setdefault(name, []).append({"labels": dict(labels), "value": value})
+                return grouped
+
+            return {
+                "started_at": self.started,
+                "duration_seconds": time.time() - self.started,
+                "stages": {stage: dict(s) for stage, s in self._stages.items()},
+                "histograms": histograms,
+                "counters": series(self._counters),
+                "gauges": series(self._gauges),
+            }
+
+    def prometheus(self, prefix: str = PROMETHEUS_PREFIX) -> str:
+        """
+        The run in Prometheus text exposition format. Values describe the last
+        run only, so everything but the histograms is exported as a gauge.
+        """
+        lines = []
+
+        def family(name, kind, help_text=None):
+            lines.append(f"# HELP {prefix}{name} {help_text or DESCRIPTIONS.get(name, name.replace('_', ' '))}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        def sample(name, labels, value):
+            lines.append(f"{prefix}{name}{_labels(labels)} {value!r}")
+
+        with self._lock:
+            family("last_run_timestamp_seconds", "gauge", "Start of the last scan (unix time).")
+            sample("last_run_timestamp_seconds", (), self.started)
+            family("last_run_duration_seconds", "gauge", "Wall time of the last scan.")
+            sample("last_run_duration_seconds", (), time.time() - self.started)
+
+            family("stage_seconds", "gauge", "Seconds spent per pipeline stage (summed over workers).")
+            for stage, s in sorted(self._stages.items()):
+                sample("stage_seconds", (("stage", stage),), s["seconds"])
+            family("stage_runs", "gauge", "Times each pipeline stage ran.")
+            for stage, s in sorted(self._stages.items()):
+                sample("stage_runs", (("stage", stage),), s["count"])
+
+            for name in sorted({n for n, _ in self._histograms}):
+                family(name, "histogram")
+                for (n, labels), h in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(h.buckets + (float("inf"),), h.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        sample(f"{name}_bucket", labels + (("le", le),), cumulative)
+                    sample(f"{name}_sum", labels, h.sum)
+                    sample(f"{name}_count", labels, h.count)
+
+            for store in (self._counters, self._gauges):
+                for name in sorted({n for n, _ in store}):
+                    family(name, "gauge")
+                    for (n, labels), value in sorted(store.items()):
+                        if n == name:
+                            sample(name, labels, value)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _write_atomic(path: Path, text: str):
+    """Write via a temp file + rename, so readers (node_exporter) never see half a file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+_METRICS = Metrics()
+
+
+def configure_metrics() -> Metrics:
+    """Start a fresh set of run metrics."""
+    global _METRICS
+    _METRICS = Metrics()
+    return _METRICS
+
+
+def get_metrics() -> Metrics:
+    return _METRICS
+
+
+def span(stage: str):
+    """Time a block as a pipeline stage: `with span("prune"): ...`."""
+    return _METRICS.span(stage)
+
+
+def record_span(stage: str, seconds: float):
+    """Add a duration measured outside a `with span(...)` block to a stage."""
+    _METRICS.record_span(stage, seconds)
+
+
+def observe(name: str, value: float, **labels):
+    _METRICS.observe(name, value, **labels)
+
+
+def incr(name: str, value: float = 1, **labels):
+    _METRICS.incr(name, value, **labels)
+
+
+def write_summary(path: Path, **extra) -> dict:
+    """Write the run summary (plus `extra` top-level fields) as JSON. Returns it."""
+    summary = {**extra, **_METRICS.summary()}
+    _write_atomic(path, json.dumps(summary, indent=2, default=str) + "\n")
+    return summary
+
+
+def write_prometheus(path: Path):
+    """Write the run as a Prometheus textfile (*.prom) for node_exporter's textfile collector."""
+    _write_atomic(path, _METRICS.prometheus())
@@ -0,0 +1,407 @@
+"""
+Normalized SQLite store for the streaming offers dataset.
+
+`unwatched_by_country.csv` repeats poster_url, runtime and source on every
+(film, country, provider) row. The store keeps those once per film, and
+countries/providers/sources in lookup tables so offers are three integer ids:
+
+    films(film_id, title, year, poster_url, runtime)
+    countries(country_id, code)      providers(provider_id, name)
+    sources(source_id, name)         film_sources(film_id, source_id)
+    offers(film_id, country_id, provider_id, last_updated)
+
+`load_offers` returns the same columns as the CSV, with country/provider as
+pandas categoricals. The CSV is still written next to it for compatibility.
+
+A scan doesn't build the new dataset in memory: `OfferSink` writes each
+film's offers to staging tables as its lookup finishes, and `merge()` then
+prunes, replaces and logs the changes in SQL, in one transaction.
+`export_csv` streams the store back out in chunks.
+"""
+
+import csv
+import os
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+from change_log import append_table_diff, ensure_schema as ensure_log_schema
+
+CSV_COLUMNS = ["title", "year", "country", "provider", "poster_url", "runtime", "last_updated", "source"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS films (
+    film_id    INTEGER PRIMARY KEY,
+    title      TEXT NOT NULL,
+    year       INTEGER,
+    poster_url TEXT,
+    runtime    INTEGER
+);
+CREATE TABLE IF NOT EXISTS countries (country_id INTEGER PRIMARY KEY, code TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS providers (provider_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS sources (source_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS film_sources (
+    film_id   INTEGER NOT NULL REFERENCES films(film_id),
+    source_id INTEGER NOT NULL REFERENCES sources(source_id),
+    PRIMARY KEY (film_id, source_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS offers (
+    film_id      INTEGER NOT NULL REFERENCES films(film_id),
+    country_id   INTEGER NOT NULL REFERENCES countries(country_id),
+    provider_id  INTEGER NOT NULL REFERENCES providers(provider_id),
+    last_updated TEXT,
+    UNIQUE (film_id, country_id, provider_id)
+);
+CREATE INDEX IF NOT EXISTS films_key ON films (title, year);
+"""
+
+# One scan's lookups, waiting to be merged (emptied when a sink opens, dropped after the merge)
+STAGING_SCHEMA = """
+CREATE TABLE IF NOT EXISTS staged_films (
+    position     INTEGER PRIMARY KEY,
+    title        TEXT NOT NULL,
+    year         INTEGER,
+    poster_url   TEXT,
+    runtime      INTEGER,
+    last_updated TEXT,
+    film_id      INTEGER
+);
+CREATE TABLE IF NOT EXISTS staged_sources (
+    position INTEGER NOT NULL,
+    name     TEXT NOT NULL,
+    PRIMARY KEY (position, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS staged_offers (
+    position INTEGER NOT NULL,
+    country  TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    UNIQUE (position, country, provider)
+);
+"""
+
+# The store as CSV-shaped rows, in offer insertion order ({where} filters the offers)
+OFFER_ROWS = """
+WITH labels AS (
+    SELECT film_id, group_concat(name, ', ') AS source FROM (
+        SELECT fs.film_id, s.name FROM film_sources fs JOIN sources s USING (source_id)
+        ORDER BY fs.film_id, s.name
+    ) GROUP BY film_id
+)
+SELECT f.title, f.year, c.code AS country, p.name AS provider, f.poster_url, f.runtime, o.last_updated, l.source
+FROM offers o
+JOIN films f USING (film_id)
+JOIN countries c USING (country_id)
+JOIN providers p USING (provider_id)
+LEFT JOIN labels l USING (film_id)
+{where}
+ORDER BY o.rowid
+"""
+
+COMMIT_EVERY = 50       # staged films per transaction
+CSV_CHUNK_ROWS = 10_000
+VACUUM_FREE_FRACTION = 0.25   # VACUUM once this share of the file's pages is free
+
+# OfferSink.merge(), in order, inside one transaction (after the "before" snapshot)
+MERGE_STEPS = [
+    # Prune films that left every source
+    "DELETE FROM offers WHERE film_id IN (SELECT film_id FROM pruned_films)",
+    # Staged films: update the known ones, add the rest
+    """UPDATE films SET poster_url = s.poster_url, runtime = s.runtime
+       FROM staged_films s WHERE s.film_id = films.film_id""",
+    """INSERT INTO films (title, year, poster_url, runtime)
+       SELECT title, year, poster_url, runtime FROM staged_films WHERE film_id IS NULL ORDER BY position""",
+    """UPDATE staged_films SET film_id = (
+           SELECT f.film_id FROM films f WHERE f.title = staged_films.title AND f.year IS staged_films.year)
+       WHERE film_id IS NULL""",
+    # Their offers and sources are replaced
+    "DELETE FROM offers WHERE film_id IN (SELECT film_id FROM staged_films)",
+    "DELETE FROM film_sources WHERE film_id IN (SELECT film_id FROM staged_films)",
+    "INSERT OR IGNORE INTO countries (code) SELECT DISTINCT country FROM staged_offers",
+    "INSERT OR IGNORE INTO providers (name) SELECT DISTINCT provider FROM staged_offers",
+    "INSERT OR IGNORE INTO sources (name) SELECT DISTINCT name FROM staged_sources",
+    """INSERT OR IGNORE INTO film_sources
+       SELECT s.film_id, so.source_id FROM staged_sources ss
+       JOIN staged_films s USING (position) JOIN sources so ON so.name = ss.name""",
+    """INSERT OR REPLACE INTO offers (film_id, country_id, provider_id, last_updated)
+       SELECT s.film_id, c.country_id, p.provider_id, s.last_updated FROM staged_offers o
+       JOIN staged_films s USING (position)
+       JOIN countries c ON c.code = o.country
+       JOIN providers p ON p.name = o.provider
+       ORDER BY o.position, o.rowid""",
+    # Films without offers leave the dataset, like vocabulary nothing uses any more
+    "DELETE FROM film_sources WHERE film_id NOT IN (SELECT film_id FROM offers)",
+    "DELETE FROM films WHERE film_id NOT IN (SELECT film_id FROM offers)",
+    "DELETE FROM countries WHERE country_id NOT IN (SELECT country_id FROM offers)",
+    "DELETE FROM providers WHERE provider_id NOT IN (SELECT provider_id FROM offers)",
+    "DELETE FROM sources WHERE source_id NOT IN (SELECT source_id FROM film_sources)",
+]
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _codes(values: pd.Series):
+    """Dictionary-encode a column: (1-based integer ids, vocabulary list)."""
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes + 1, list(uniques)
+
+
+def _nullable(value):
+    return None if pd.isna(value) else value
+
+
+def _vacuum_if_fragmented(conn: sqlite3.Connection):
+    """VACUUM only when free pages make up VACUUM_FREE_FRACTION of the file; SQLite reuses the rest."""
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    if pages and free / pages >= VACUUM_FREE_FRACTION:
+        conn.execute("VACUUM")
+
+
+def save_offers(df: pd.DataFrame, path: Path):
+    """Replace the store's contents with `df` (CSV-shaped rows) in one transaction."""
+    df = df.reset_index(drop=True)
+    if "source" not in df.columns:
+        df = df.assign(source=None)
+
+    # One film per (title, year); per-film fields come from its last row, like the CSV dedup
+    film_keys = df["title"].astype(str) + "\x00" + df["year"].astype(str)
+    film_codes, _ = pd.factorize(film_keys)
+    films = df.assign(_film=film_codes).drop_duplicates("_film", keep="last").sort_values("_film")
+
+    country_ids, country_vocab = _codes(df["country"].astype(str))
+    provider_ids, provider_vocab = _codes(df["provider"].astype(str))
+
+    film_source_pairs = (
+        pd.DataFrame({"film": film_codes, "source": df["source"].fillna("").astype(str).str.split(",")})
+        .explode("source")
+        .assign(source=lambda d: d["source"].str.strip())
+        .query("source != ''")
+        .drop_duplicates()
+    )
+    source_ids, source_vocab = _codes(film_source_pairs["source"])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = _connect(path)
+    try:
+        with conn:
+            for table in ("offers", "film_sources", "films", "countries", "providers", "sources"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                "INSERT INTO films VALUES (?, ?, ?, ?, ?)",
+                (
+                    (int(f), t, None if pd.isna(y) else int(y), _nullable(p), None if pd.isna(r) else int(r))
+                    for f, t, y, p, r in zip(films["_film"] + 1, films["title"], films["year"],
+                                             films["poster_url"], films["runtime"])
+                ),
+            )
+            conn.executemany("INSERT INTO countries VALUES (?, ?)", enumerate(country_vocab, 1))
+            conn.executemany("INSERT INTO providers VALUES (?, ?)", enumerate(provider_vocab, 1))
+            conn.executemany("INSERT INTO sources VALUES (?, ?)", enumerate(source_vocab, 1))
+            conn.executemany(
+                "INSERT INTO film_sources VALUES (?, ?)",
+                zip((film_source_pairs["film"] + 1).tolist(), source_ids.tolist()),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO offers VALUES (?, ?, ?, ?)",
+                zip((film_codes + 1).tolist(), country_ids.tolist(), provider_ids.tolist(),
+                    df["last_updated"].where(df["last_updated"].notna(), None).tolist()),
+            )
+        _vacuum_if_fragmented(conn)
+    finally:
+        conn.close()
+
+
+class OfferSink:
+    """
+    Streams one scan's lookups into the store's staging tables, one film at a
+    time, then folds them into the store with merge(). Single-threaded: feed
+    it from the thread that consumes the lookup results.
+    """
+
+    def __init__(self, path: Path, commit_every: int = COMMIT_EVERY):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.commit_every = commit_every
+        self.films = 0
+        self.rows = 0
+        self._conn = _connect(self.path)
+        self._conn.executescript(STAGING_SCHEMA)
+        ensure_log_schema(self._conn)
+        with self._conn:
+            for table in ("staged_films", "staged_sources", "staged_offers"):
+                self._conn.execute(f"DELETE FROM {table}")
+
+    def add(self, position: int, title: str, year, offers, poster_url=None, runtime=None,
+            sources=(), last_updated=None):
+        """
+        Stage one looked-up film: `offers` are its (country, provider) pairs
+        (possibly none, which removes its old offers), `position` its place in
+        the scan, which orders the merged rows.
+        """
+        self._conn.execute(
+            "INSERT OR REPLACE INTO staged_films (position, title, year, poster_url, runtime, last_updated) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (position, title, None if pd.isna(year) else int(year), _nullable(poster_url),
+             None if pd.isna(runtime) else int(runtime), last_updated),
+        )
+        self._conn.executemany("INSERT OR IGNORE INTO staged_sources VALUES (?, ?)",
+                               ((position, name) for name in sources))
+        cursor = self._conn.executemany("INSERT OR IGNORE INTO staged_offers VALUES (?, ?, ?)",
+                                        ((position, str(c), str(p)) for c, p in offers))
+        self.films += 1
+        self.rows += cursor.rowcount
+        if self.films % self.commit_every == 0:
+            self._conn.commit()
+
+    def merge(self, current, at: str | None = None) -> dict:
+        """
+        Fold the staged films into the store: drop the films not in `current`
+        ((title, year) pairs of every film still in a source), replace the
+        offers, poster, runtime and sources of every staged film, and append
+        the differences to the change log.
+
+        Returns {"rows": offers in the store, "pruned": rows dropped with
+        removed films, "events": {kind: count}, "changed": {(title, year) of
+        films whose offers changed}}.
+        """
+        conn = self._conn
+        conn.commit()
+        conn.executescript("""
+            DROP TABLE IF EXISTS temp.current_films;
+            CREATE TEMP TABLE current_films (title TEXT NOT NULL, year INTEGER);
+            CREATE INDEX temp.current_films_key ON current_films (title, year);
+        """)
+        conn.executemany("INSERT INTO current_films VALUES (?, ?)",
+                         ((t, None if pd.isna(y) else int(y)) for t, y in current))
+        conn.commit()
+
+        conn.execute("BEGIN")
+        try:
+            # Only pruned and staged films can change, so only their rows are diffed
+            conn.execute("""
+                UPDATE staged_films SET film_id = (
+                    SELECT f.film_id FROM films f WHERE f.title = staged_films.title AND f.year IS staged_films.year)
+            """)
+            conn.execute("""
+                CREATE TEMP TABLE pruned_films AS SELECT film_id FROM films f
+                WHERE NOT EXISTS (SELECT 1 FROM current_films c WHERE c.title = f.title AND c.year IS f.year)
+            """)
+            _snapshot(conn, "merge_before", "film_id IN (SELECT film_id FROM pruned_films) "
+                                            "OR film_id IN (SELECT film_id FROM staged_films)")
+            pruned = conn.execute(
+                "SELECT count(*) FROM offers WHERE film_id IN (SELECT film_id FROM pruned_films)"
+            ).fetchone()[0]
+            for statement in MERGE_STEPS:
+                conn.execute(statement)
+            _snapshot(conn, "merge_after", "film_id IN (SELECT film_id FROM staged_films)")
+            last_event = conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM offer_events").fetchone()[0]
+            events = append_table_diff(conn, "merge_before", "merge_after", at)
+            changed = set(conn.execute(
+                "SELECT DISTINCT title, year FROM offer_events WHERE event_id > ? AND kind LIKE 'offer_%'",
+                (last_event,),
+            ).fetchall())
+            rows = conn.execute("SELECT count(*) FROM offers").fetchone()[0]
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        conn.executescript("""
+            DROP TABLE temp.merge_before;
+            DROP TABLE temp.merge_after;
+            DROP TABLE temp.current_films;
+            DROP TABLE temp.pruned_films;
+            DROP TABLE staged_films;
+            DROP TABLE staged_sources;
+            DROP TABLE staged_offers;
+        """)
+        _vacuum_if_fragmented(conn)
+        return {"rows": rows, "pruned": pruned, "events": events, "changed": changed}
+
+    def close(self):
+        self._conn.close()
+
+
+def _snapshot(conn: sqlite3.Connection, table: str, where: str):
+    """Copy some of the store's rows (CSV-shaped) into an indexed temp table, for the change log diff."""
+    conn.execute(f"DROP TABLE IF EXISTS temp.{table}")
+    conn.execute(f"CREATE TEMP TABLE {table} AS {OFFER_ROWS.format(where=f'WHERE {where}')}")
+    conn.execute(f"CREATE INDEX temp.{table}_key ON {table} (title, year, country, provider)")
+
+
+def _categorical(ids: pd.Series, vocab: pd.DataFrame, id_col: str, value_col: str) -> pd.Categorical:
+    positions = pd.Index(vocab[id_col]).get_indexer(ids)
+    return pd.Categorical.from_codes(positions, categories=vocab[value_col])
+
+
+def load_offers(path: Path) -> pd.DataFrame:
+    """Load the store as a CSV-shaped DataFrame (country/provider are categoricals)."""
+    conn = _connect(path)
+    try:
+        offers = pd.read_sql("SELECT film_id, country_id, provider_id, last_updated FROM offers ORDER BY rowid", conn)
+        films = pd.read_sql("SELECT * FROM films", conn).set_index("film_id")
+        countries = pd.read_sql("SELECT country_id, code FROM countries ORDER BY code", conn)
+        providers = pd.read_sql("SELECT provider_id, name FROM providers ORDER BY name", conn)
+        labels = pd.read_sql(
+            "SELECT film_id, group_concat(name, ', ') AS source FROM ("
+            " SELECT fs.film_id, s.name FROM film_sources fs JOIN sources s USING (source_id)"
+            " ORDER BY fs.film_id, s.name"
+            ") GROUP BY film_id", conn
+        ).set_index("film_id")["source"]
+    finally:
+        conn.close()
+
+    film = films.reindex(offers["film_id"])
+    return pd.DataFrame({
+        "title": film["title"].to_numpy(),
+        "year": film["year"].to_numpy(),
+        "country": _categorical(offers["country_id"], countries, "country_id", "code"),
+        "provider": _categorical(offers["provider_id"], providers, "provider_id", "name"),
+        "poster_url": film["poster_url"].to_numpy(),
+        "runtime": film["runtime"].to_numpy(),
+        "last_updated": offers["last_updated"].to_numpy(),
+        "source": labels.reindex(offers["film_id"]).to_numpy(),
+    }, columns=CSV_COLUMNS)
+
+
+def export_csv(store_path: Path, csv_path: Path, chunk_rows: int = CSV_CHUNK_ROWS) -> int:
+    """
+    Write the store back out in the legacy CSV layout, `chunk_rows` rows at a
+    time (replaced atomically). Returns the number of rows.
+    """
+    csv_path = Path(csv_path)
+    tmp = csv_path.with_name(f".{csv_path.name}.tmp")
+    rows = 0
+    conn = _connect(store_path)
+    try:
+        cursor = conn.execute(OFFER_ROWS.format(where=""))
+        with open(tmp, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(CSV_COLUMNS)
+            while chunk := cursor.fetchmany(chunk_rows):
+                writer.writerows(chunk)
+                rows += len(chunk)
+    finally:
+        conn.close()
+    os.replace(tmp, csv_path)
+    return rows
+
+
+def read_table(path: Path) -> pd.DataFrame:
+    """Read an offers dataset from either the SQLite store or a CSV file."""
+    path = Path(path)
+    if path.suffix == ".sqlite":
+        return load_offers(path)
+    return pd.read_csv(path)
+
+
+def load_dataset(store_path: Path, csv_path: Path) -> pd.DataFrame:
+    """Prefer the store; fall back to the CSV for data written before it existed."""
+    if store_path.exists():
+        return load_offers(store_path)
+    return pd.read_csv(csv_path)
@@ -1,58 +1,16 @@
-import requests
+import os
 
-TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
-
-def get_movie_metadata(title, year, api_token):
-    """
-    Fetch poster + runtime from TMDB.
-    Returns: (poster_url, runtime)
-    """
-    search_url = "https://api.themoviedb.org/3/search/movie"
-    headers = {
-        "accept": "application/json",
-        "Authorization": f"Bearer {api_token}"
-    }
-
-    params = {
-        "query": title,
-        "year": year,
-        "language": "en-US"
-    }
-
-    try:
-        search = requests.get(search_url, headers=headers, params=params)
-        search.raise_for_status()
-        data = search.json()
+from http_client import get_session
+from rate_limit import get_limiter
+from tmdb_cache import get_cache, MISSING
 
-        if not data.get("results"):
-            raise ValueError("No TMDB results")
-
-        movie = data["results"][0]
-        movie_id = movie["id"]
-        poster_path = movie.get("poster_path")
-
-        # --- SECOND CALL: movie details ---
-        details_url = f"https://api.themoviedb.org/3/movie/{movie_id}"
-        details = requests.get(details_url, headers=headers)
-        details.raise_for_status()
-        details_data = details.json()
-
-        runtime = details_data.get("runtime")
-
-        poster_url = (
-            f"{TMDB_IMAGE_BASE}{poster_path}"
-            if poster_path
-            else "https://via.placeholder.com/500x750?text=No+Poster"
-        )
+TMDB_API_URL = os.environ.get("TMDB_API_URL", "https://api.themoviedb.org/3")
+TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
+NO_POSTER_URL = "https://via.placeholder.com/500x750?text=No+Poster"
 
-        return poster_url, runtime
 
-    except Exception as e:
-        print(f"⚠️ TMDB error for {title}: {e}")
-        return (
-            "https://via.placeholder.com/500x750?text=No+Poster",
-            None
-        )
+class NoTmdbResults(ValueError):
+    """TMDB search returned nothing for the title/year (cached as a negative entry)."""
 
 
 # TMDB country code mapping (JustWatch country -> TMDB ISO 3166-1)
@@ -73,41 +31,113 @@ COUNTRY_TO_LANG = {
 }
 
 
-def get_localized_title(title, year, country, api_token):
+def _localized_titles(details, title):
+    """Pick a title per country in COUNTRY_TO_LANG from TMDB's appended translations."""
+    translations = (details.get("translations") or {}).get("translations", [])
+    by_locale = {}
+    by_lang = {}
+    for t in translations:
+        localized = (t.get("data") or {}).get("title")
+        if not localized:
+            continue
+        by_locale[(t.get("iso_639_1"), t.get("iso_3166_1"))] = localized
+        by_lang.setdefault(t.get("iso_639_1"), localized)
+
+    # TMDB leaves the translation title empty for the film's original language
+    if details.get("original_language") and details.get("original_title"):
+        by_lang.setdefault(details["original_language"], details["original_title"])
+
+    titles = {}
+    for country, locale in COUNTRY_TO_LANG.items():
+        lang, region = locale.split("-")
+        localized = by_locale.get((lang, region)) or by_lang.get(lang)
+        titles[country] = localized if localized and localized.lower() != title.lower() else title
+    return titles
+
+
+def resolve_movie(title, year, api_token):
     """
-    Get the localized movie title for a given country using TMDB.
-    Returns the localized title, or the original title if not found.
+    Resolve a film on TMDB with one search and one details call
+    (translations appended), served from the on-disk cache when possible.
+
+    Returns dict with keys: tmdb_id, imdb_id, poster_url, runtime,
+    localized_titles ({country: title} for every country in COUNTRY_TO_LANG),
+    or None if TMDB has no match or the lookup failed.
     """
+    cache = get_cache()
+    cached = cache.get("movie", title, year)
+    if cached is not MISSING:
+        return cached
+
     headers = {
         "accept": "application/json",
         "Authorization": f"Bearer {api_token}"
     }
 
-    # First, find the movie on TMDB
-    search_url = "https://api.themoviedb.org/3/search/movie"
-    params = {"query": title, "year": year, "language": "en-US"}
-
     try:
-        search = requests.get(search_url, headers=headers, params=params)
+        get_limiter("tmdb").acquire()
+        search = get_session().get(
+            f"{TMDB_API_URL}/search/movie",
+            headers=headers,
+            params={"query": title, "year": year, "language": "en-US"},
+        )
         search.raise_for_status()
         data = search.json()
 
         if not data.get("results"):
-            return title
+            raise NoTmdbResults("No TMDB results")
 
-        movie_id = data["results"][0]["id"]
+        movie = data["results"][0]
+        poster_path = movie.get("poster_path")
 
-        # Try localized title via translations
-        lang = COUNTRY_TO_LANG.get(country.lower())
-        if lang:
-            details_url = f"https://api.themoviedb.org/3/movie/{movie_id}"
-            details = requests.get(details_url, headers=headers, params={"language": lang})
-            details.raise_for_status()
-            localized = details.json().get("title")
-            if localized and localized.lower() != title.lower():
-                return localized
+        # --- SECOND CALL: details + every translation at once ---
+        get_limiter("tmdb").acquire()
+        details = get_session().get(
+            f"{TMDB_API_URL}/movie/{movie['id']}",
+            headers=headers,
+            params={"append_to_response": "translations"},
+        )
+        details.raise_for_status()
+        details_data = details.json()
 
-        return title
+        record = {
+            "tmdb_id": movie["id"],
+            "imdb_id": details_data.get("imdb_id"),
+            "poster_url": f"{TMDB_IMAGE_BASE}{poster_path}" if poster_path else NO_POSTER_URL,
+            "runtime": details_data.get("runtime"),
+            "localized_titles": _localized_titles(details_data, title),
+        }
+        cache.put("movie", title, year, record)
+        return record
+
+    except NoTmdbResults as e:
+        print(f"⚠️ TMDB error for {title}: {e}")
+        cache.put("movie", title, year, None)
+        return None
 
-    except Exception:
+    except Exception as e:
+        # Network/HTTP errors are not cached so the next run retries
+        print(f"⚠️ TMDB error for {title}: {e}")
+        return None
+
+
+def get_movie_metadata(title, year, api_token):
+    """
+    Fetch poster + runtime from TMDB.
+    Returns: (poster_url, runtime)
+    """
+    record = resolve_movie(title, year, api_token)
+    if record is None:
+        return NO_POSTER_URL, None
+    return record["poster_url"], record["runtime"]
+
+
+def get_localized_title(title, year, country, api_token):
+    """
+    Get the localized movie title for a given country using TMDB.
+    Returns the localized title, or the original title if not found.
+    """
+    record = resolve_movie(title, year, api_token)
+    if record is None:
         return title
+    return record["localized_titles"].get(country.lower(), title)
@@ -0,0 +1,146 @@
+"""
+Provider names: one canonical name per streaming service, shared by the scan,
+the alert e-mail and the app.
+
+JustWatch lists add-on channels and plan tiers as packages of their own
+("MUBI Amazon Channel", "Netflix basic with Ads", "Paramount Plus Premium");
+the scan folds them into the service ("MUBI", "Netflix", "Paramount+").
+
+- canonical_name(raw): precompiled patterns, memoized per raw name.
+- ProviderRegistry.canonicalize(package_id, raw): memoized per JustWatch
+  package ID. The package -> canonical map is persisted with user aliases
+  in data/providers.json, so a service keeps its name when JustWatch renames
+  a package, and a name can be overridden by hand:
+      {"aliases": {"Apple TV Plus": "Apple TV"}, "packages": {"8": "Netflix"}}
+- OWNED_SERVICES: the user's own subscriptions as exact canonical names,
+  for the app's owned filter.
+- ALERT_LABELS / is_alert_service(name): the owned services the alert e-mail
+  covers, matched on the canonical name like the app's filter.
+"""
+
+import json
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+DEFAULT_PROVIDERS_PATH = Path(__file__).resolve().parent.parent / "data" / "providers.json"
+
+# 1. Add-on channels sold through another service
+ADDON_RE = re.compile(r"\s*(?:on\s+)?(?:Amazon|Apple TV|U-Next|BFI|Curzon|Studiocanal)\s+Channel.*", re.IGNORECASE)
+# 2. Plan tiers and ad descriptors
+TIER_RE = re.compile(
+    r"\s*(?:with Ads|Standard with Ads|Basic with Ads|Premium|Essential|Total|Ficción Total|Player|Extra|Basic|on U-Next).*",
+    re.IGNORECASE,
+)
+# 3. Spelling fixes
+REPLACEMENTS = [("Paramount Plus", "Paramount+"), ("AMC Plus", "AMC+"), ("rtve Play", "rtve")]
+
+# Owned services: app filter label -> canonical provider names (matched case-insensitively)
+OWNED_SERVICES: dict[str, list[str]] = {
+    "Netflix": ["Netflix", "Netflix Kids"],
+    "Prime":   ["Amazon Prime Video", "Amazon Prime Video Free"],
+    "HBO":     ["HBO Max"],
+    "Apple":   ["Apple TV", "Apple TV Plus", "Apple TV+"],
+    "Disney":  ["Disney Plus"],
+    "Youtube": ["YouTube", "YouTube Free", "YouTube TV"],
+    "RTVE":    ["rtve"],
+    "Filmin":  ["Filmin"],
+}
+
+# Owned services the alert e-mail covers (OWNED_SERVICES labels)
+ALERT_LABELS = ["Netflix", "Prime", "HBO", "Apple", "Disney", "Youtube", "RTVE"]
+ALERT_NAMES = frozenset(name.casefold() for label in ALERT_LABELS for name in OWNED_SERVICES[label])
+
+
+@lru_cache(maxsize=4096)
+def canonical_name(raw: str) -> str:
+    """Fold a JustWatch package name into its service name ("Netflix basic with Ads" -> "Netflix")."""
+    if not raw or not isinstance(raw, str):
+        return raw
+    name = TIER_RE.sub("", ADDON_RE.sub("", raw))
+    for old, new in REPLACEMENTS:
+        name = name.replace(old, new)
+    return name.strip()
+
+
+def is_alert_service(name: str) -> bool:
+    """Whether the alert e-mail covers a provider (its canonical name belongs to an ALERT_LABELS service)."""
+    return str(canonical_name(str(name))).casefold() in ALERT_NAMES
+
+
+class ProviderRegistry:
+    """Thread-safe JustWatch package ID -> canonical name map with user aliases, backed by a JSON file."""
+
+    def __init__(self, path: Path = DEFAULT_PROVIDERS_PATH):
+        self.path = Path(path)
+        self.aliases: dict[str, str] = {}
+        self._packages: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    saved = json.load(f)
+                self.aliases = dict(saved.get("aliases", {}))
+                self._packages = {int(k): v for k, v in saved.get("packages", {}).items()}
+            except (json.JSONDecodeError, ValueError, AttributeError):
+                self.aliases, self._packages = {}, {}
+
+    def resolve(self, raw: str) -> str:
+        """Canonical name for a raw package name: an alias if one is set, else the patterns."""
+        if raw in self.aliases:
+            return self.aliases[raw]
+        name = canonical_name(raw)
+        return self.aliases.get(name, name)
+
+    def canonicalize(self, package_id, raw: str) -> str:
+        """
+        Canonical name for a JustWatch package. The first name seen for a package
+        ID is kept (aliases still apply on top); without an ID, falls back to resolve().
+        """
+        if package_id is None:
+            return self.resolve(raw)
+        name = self._packages.get(package_id)
+        if name is None:
+            name = canonical_name(raw)
+            with self._lock:
+                name = self._packages.setdefault(package_id, name)
+                self._dirty = True
+        return self.aliases.get(name, name)
+
+    def save(self):
+        """Write the package map back to disk if it grew."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump({"aliases": self.aliases,
+                           "packages": {str(k): v for k, v in sorted(self._packages.items())}},
+                          f, indent=2, ensure_ascii=False)
+            self._dirty = False
+
+    def __len__(self):
+        return len(self._packages)
+
+
+_REGISTRY: ProviderRegistry | None = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def configure_providers(path: Path = DEFAULT_PROVIDERS_PATH) -> ProviderRegistry:
+    """Load the shared provider registry from `path`."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        _REGISTRY = ProviderRegistry(path)
+        return _REGISTRY
+
+
+def get_providers() -> ProviderRegistry:
+    """Return the shared registry, loading it from the default path on first use."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = ProviderRegistry()
+        return _REGISTRY
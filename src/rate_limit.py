@@ -0,0 +1,203 @@
+"""
+Shared rate limiting for upstreams (JustWatch, TMDB, Letterboxd pages).
+
+Every call to an upstream goes through the token bucket registered for it, so
+concurrent workers share one budget instead of each sleeping on its own.
+
+JustWatch publishes no rate limit, so its bucket is adaptive (AIMD): the rate
+creeps up after each success (more slowly near the rate that was last
+throttled) and is halved on a 429. A throttle also pauses every caller, for
+the server's Retry-After or an exponential backoff, with jitter so workers
+don't resume in lockstep. After repeated throttle/error episodes with no
+success in between, the circuit opens and calls fail fast with
+CircuitOpenError until a cooldown has passed.
+"""
+
+import random
+import threading
+import time
+
+# Requests per second allowed per upstream unless overridden from the CLI
+DEFAULT_RATES = {
+    "justwatch": 2.0,
+    "tmdb": 20.0,
+    "letterboxd": 2.0,
+}
+
+# Upstreams whose limiter adapts to throttling responses
+ADAPTIVE_LIMITERS = {"justwatch"}
+
+# AIMD tuning
+INCREASE_STEP = 0.05      # req/s added per successful call
+DECREASE_FACTOR = 0.5     # rate multiplier on a throttle
+MIN_RATE = 0.1            # req/s floor
+CAUTION_ZONE = 0.9        # above this share of the last throttled rate, increase 4x slower
+BACKOFF_BASE = 1.0        # seconds paused after a 429 without Retry-After, doubled per episode
+MAX_PAUSE = 300.0         # cap for Retry-After and backoff pauses
+JITTER = 0.25             # waits are stretched by up to 25%
+BREAKER_THRESHOLD = 5     # consecutive failure episodes that open the circuit
+BREAKER_COOLDOWN = 120.0  # seconds the circuit stays open
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that keeps failing."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket. A rate of 0 or less disables limiting."""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.wait_time = 0.0
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available. Returns the seconds spent waiting."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = self._reserve(tokens, time.monotonic())
+                if delay <= 0:
+                    self.acquired += 1
+                    self.wait_time += waited
+                    return waited
+            time.sleep(delay)
+            waited += delay
+
+    def _reserve(self, tokens: float, now: float) -> float:
+        """Take `tokens` if available (returns 0), else return how long to wait. Lock held."""
+        self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._updated) * self.rate)
+        self._updated = max(self._updated, now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"rate": self.rate, "acquired": self.acquired, "wait_time": self.wait_time}
+
+
+class AdaptiveLimiter(TokenBucket):
+    """
+    Token bucket whose rate follows the upstream (AIMD), capped at the
+    configured rate. Callers report each outcome with on_success(),
+    on_throttle(retry_after) or on_failure().
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        super().__init__(rate, burst)
+        self.max_rate = rate
+        self.throttles = 0
+        self.failures = 0
+        self.breaker_trips = 0
+        self.pause_time = 0.0        # seconds of backoff pauses (callers wait them out in acquire)
+        self._throttled_rate = None  # rate at the last throttle: the server's limit, roughly
+        self._paused_until = 0.0
+        self._episodes = 0           # failure episodes since the last success
+        self._open_until = 0.0
+
+    def _reserve(self, tokens: float, now: float) -> float:
+        if now < self._open_until:
+            raise CircuitOpenError(f"circuit open for another {self._open_until - now:.0f}s "
+                                   f"after {self._episodes} failed attempts in a row")
+        if now < self._paused_until:
+            return (self._paused_until - now) * (1 + random.random() * JITTER)
+        delay = super()._reserve(tokens, now)
+        return delay * (1 + random.random() * JITTER) if delay > 0 else 0.0
+
+    def on_success(self):
+        with self._lock:
+            self._episodes = 0
+            if self.rate <= 0:
+                return
+            step = INCREASE_STEP
+            if self._throttled_rate and self.rate >= CAUTION_ZONE * self._throttled_rate:
+                step /= 4
+            self.rate = min(self.max_rate, self.rate + step)
+
+    def on_throttle(self, retry_after: float | None = None) -> float:
+        """
+        Record a 429. The first throttle of an episode halves the rate and
+        pauses all callers; throttles of requests already in flight during
+        that pause only extend it to the server's Retry-After.
+        Returns the seconds until calls resume.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.throttles += 1
+            if now >= self._paused_until:
+                self._throttled_rate = self.rate
+                self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR) if self.rate > 0 else 0.0
+                self._failed_episode(now)
+                pause = BACKOFF_BASE * 2 ** min(self._episodes - 1, 10)
+            else:
+                pause = 0.0
+            if retry_after is not None:
+                pause = max(pause, retry_after)
+            pause = min(MAX_PAUSE, pause) * (1 + random.random() * JITTER)
+            self.pause_time += max(0.0, now + pause - max(self._paused_until, now))
+            self._paused_until = max(self._paused_until, now + pause)
+            # Nothing accumulates during the pause: resume at the new rate, not in a burst
+            self._tokens = 0.0
+            self._updated = self._paused_until
+            return self._paused_until - now
+
+    def on_failure(self):
+        """Record a server error or connection failure (no rate change)."""
+        with self._lock:
+            self.failures += 1
+            self._failed_episode(time.monotonic())
+
+    def _failed_episode(self, now: float):
+        """Count a failure episode and open the circuit after too many. Lock held."""
+        self._episodes += 1
+        if self._episodes >= BREAKER_THRESHOLD:
+            # Re-opens on the first failure after the cooldown (half-open probe)
+            self._open_until = now + BREAKER_COOLDOWN
+            self.breaker_trips += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate": self.rate, "max_rate": self.max_rate, "acquired": self.acquired,
+                "wait_time": self.wait_time, "throttles": self.throttles, "failures": self.failures,
+                "breaker_trips": self.breaker_trips, "pause_time": self.pause_time,
+            }
+
+
+_LIMITERS: dict[str, TokenBucket] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _make_limiter(name: str, rate: float, burst: float | None = None) -> TokenBucket:
+    cls = AdaptiveLimiter if name in ADAPTIVE_LIMITERS else TokenBucket
+    return cls(rate, burst)
+
+
+def configure_limiter(name: str, rate: float, burst: float | None = None) -> TokenBucket:
+    """(Re)create the limiter for an upstream with the given (maximum) rate."""
+    with _REGISTRY_LOCK:
+        _LIMITERS[name] = _make_limiter(name, rate, burst)
+        return _LIMITERS[name]
+
+
+def get_limiter(name: str) -> TokenBucket:
+    """Return the shared limiter for an upstream, creating it with the default rate."""
+    with _REGISTRY_LOCK:
+        if name not in _LIMITERS:
+            _LIMITERS[name] = _make_limiter(name, DEFAULT_RATES.get(name, 1.0))
+        return _LIMITERS[name]
+
+
+def limiter_stats() -> dict:
+    """Per-upstream counters: current rate, calls, seconds waited (+ throttles/failures/trips/pauses if adaptive)."""
+    with _REGISTRY_LOCK:
+        limiters = dict(_LIMITERS)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
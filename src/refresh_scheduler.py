@@ -0,0 +1,113 @@
+"""
+Priority-based refresh scheduling for films already in the dataset.
+
+Instead of re-querying the whole library every Sunday/1st of the month, each
+film gets its own refresh interval, and every run refreshes only the films
+that are due, most overdue first, up to a number of films per run.
+
+- Offers that changed recently -> short interval (MIN_INTERVAL_DAYS); the
+  longer a film's offers stay the same, the longer the interval, up to
+  MAX_INTERVAL_DAYS.
+- Films from alert-eligible sources are refreshed twice as often.
+- Intervals get a stable per-film jitter of +/-20% so films checked on the
+  same day drift apart instead of coming due together forever.
+- Films without a schedule entry yet are due at once, in a stable
+  pseudo-random order, so the per-run limit spreads the first pass over a few runs.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DEFAULT_SCHEDULE_PATH = Path(__file__).resolve().parent.parent / "data" / "refresh_schedule.json"
+
+MIN_INTERVAL_DAYS = 2     # Offers just changed: check again soon
+BASE_INTERVAL_DAYS = 7    # Interval for films without a schedule entry
+MAX_INTERVAL_DAYS = 30    # Long-stable films: monthly
+ELIGIBLE_FACTOR = 0.5     # Alert-eligible films are refreshed twice as often
+# Known films refreshed per run (new films don't count). A film count, not a
+# request count: requests per film depend on index hits, localized titles and batching.
+DEFAULT_REFRESH_FILMS = 100
+JITTER = 0.2
+
+
+def _spread(film_id: str) -> float:
+    """Stable pseudo-random number in [0, 1) per film."""
+    return int(hashlib.sha1(film_id.encode()).hexdigest()[:8], 16) / 0x100000000
+
+
+class RefreshScheduler:
+    """film_id -> {last_checked, last_changed} map backed by a JSON file."""
+
+    def __init__(self, path: Path = DEFAULT_SCHEDULE_PATH):
+        self.path = Path(path)
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (json.JSONDecodeError, ValueError):
+                self._entries = {}
+
+    def interval(self, film_id: str, eligible: bool, now: datetime) -> timedelta:
+        """How long a film's offers can be trusted before it should be re-checked."""
+        entry = self._entries.get(film_id)
+        if entry is None:
+            days = BASE_INTERVAL_DAYS
+        else:
+            stable_since = datetime.fromisoformat(entry.get("last_changed") or entry["first_checked"])
+            stable_days = (now - stable_since).total_seconds() / 86400
+            days = min(MAX_INTERVAL_DAYS, max(MIN_INTERVAL_DAYS, stable_days / 2))
+        if eligible:
+            days *= ELIGIBLE_FACTOR
+        days *= 1 - JITTER + 2 * JITTER * _spread(film_id)
+        return timedelta(days=days)
+
+    def next_refresh(self, film_id: str, eligible: bool, now: datetime) -> datetime:
+        entry = self._entries.get(film_id)
+        if entry is None:
+            # Unscheduled film: due now, ordered by a stable per-film offset
+            return now - timedelta(days=BASE_INTERVAL_DAYS * _spread(film_id))
+        return datetime.fromisoformat(entry["last_checked"]) + self.interval(film_id, eligible, now)
+
+    def due(self, film_ids, eligible: dict[str, bool], max_films: int | None = DEFAULT_REFRESH_FILMS,
+            now: datetime | None = None) -> list[str]:
+        """
+        Films whose next refresh has passed, most overdue (relative to their
+        interval) first, at most `max_films` of them (None = no limit).
+        """
+        now = now or datetime.now()
+        overdue = []
+        for film_id in film_ids:
+            is_eligible = eligible.get(film_id, False)
+            next_at = self.next_refresh(film_id, is_eligible, now)
+            if next_at <= now:
+                lateness = (now - next_at) / self.interval(film_id, is_eligible, now)
+                overdue.append((lateness, film_id))
+        overdue.sort(key=lambda x: x[0], reverse=True)
+        selected = [film_id for _, film_id in overdue]
+        return selected if max_films is None else selected[:max_films]
+
+    def record(self, film_id: str, changed: bool, now: datetime | None = None):
+        """Note that a film was just checked, and whether its offers changed."""
+        stamp = (now or datetime.now()).isoformat(timespec="seconds")
+        with self._lock:
+            entry = self._entries.setdefault(film_id, {"first_checked": stamp, "last_changed": None})
+            entry["last_checked"] = stamp
+            if changed:
+                entry["last_changed"] = stamp
+
+    def save(self, keep=None):
+        """Write the schedule, dropping films no longer in any source (`keep`)."""
+        with self._lock:
+            if keep is not None:
+                self._entries = {k: v for k, v in self._entries.items() if k in keep}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,93 @@
+"""
+Run journal: per-film checkpoints for the lookup phase of main.py.
+
+Every finished lookup is appended to data/run_journal.jsonl as soon as it
+completes. If the job dies halfway (429 storm, timeout), the next run with
+`--resume` reuses the journaled results and the original run plan (which
+films were due for a refresh), and only looks up the films that are still
+missing. A finished run leaves a single header line marked "finished", so
+there is nothing to resume.
+
+Only the ids of finished lookups stay in memory (the results themselves go
+to the offers store's staging tables as they arrive); `results` holds just
+the ones loaded from an unfinished journal.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_JOURNAL_PATH = Path(__file__).resolve().parent.parent / "data" / "run_journal.jsonl"
+
+
+class RunJournal:
+    """Append-only JSONL journal of one scan run (single writer: the main thread)."""
+
+    def __init__(self, path: Path = DEFAULT_JOURNAL_PATH):
+        self.path = Path(path)
+        self.header: dict = {}
+        self.results: dict[str, dict] = {}   # loaded for --resume
+        self.done: set[str] = set()
+        self._file = None
+
+    def load(self) -> bool:
+        """Read an unfinished journal. Returns True if there is a run to resume."""
+        if not self.path.exists():
+            return False
+        header, results = {}, {}
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn last line from a crash
+                if entry.get("type") == "run":
+                    header = entry
+                elif entry.get("type") == "film":
+                    results[entry["id"]] = entry["result"]
+        if not header or header.get("finished_at"):
+            return False
+        self.header, self.results, self.done = header, results, set(results)
+        return True
+
+    def start(self, plan: dict, resume: bool = False):
+        """
+        Open the journal: continue the loaded run, or truncate and start a new
+        one whose header records `plan` (e.g. the films chosen for refresh).
+        """
+        if resume and self.header:
+            self._file = open(self.path, "a")
+            return
+        self.header = {
+            "type": "run",
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            **plan,
+        }
+        self.results, self.done = {}, set()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w")
+        self._write(self.header)
+
+    def _write(self, entry: dict):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, film_id: str, result: dict):
+        """Checkpoint one finished lookup."""
+        self.done.add(film_id)
+        self._write({"type": "film", "id": film_id, "result": result})
+
+    def finish(self):
+        """Mark the run complete once its offers are persisted (drops the per-film lines)."""
+        self.close()
+        self.header["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        self.header["films"] = len(self.done)
+        with open(self.path, "w") as f:
+            f.write(json.dumps(self.header) + "\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,149 @@
+"""
+Persistent on-disk cache for TMDB lookups (SQLite).
+
+Entries are keyed by (namespace, title, year, language). Found results and
+"No TMDB results" misses get separate TTLs, so a film TMDB doesn't know yet is
+retried sooner than a poster/runtime that will never change. The table is
+trimmed by age and size on every run.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "tmdb_cache.sqlite"
+
+DAY = 24 * 60 * 60
+HIT_TTL = 90 * DAY      # Good results: posters/runtimes rarely change
+MISS_TTL = 7 * DAY      # "No TMDB results": retry sooner, the film may get added
+MAX_AGE = 365 * DAY     # Drop anything not used for a year
+MAX_ENTRIES = 50_000    # Keep the most recently used entries beyond this
+
+# Returned by TmdbCache.get when nothing (valid) is cached
+MISSING = object()
+
+
+class TmdbCache:
+    """Thread-safe SQLite cache. A cached value of None is a negative entry."""
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, hit_ttl: float = HIT_TTL,
+                 miss_ttl: float = MISS_TTL, max_age: float = MAX_AGE,
+                 max_entries: int = MAX_ENTRIES):
+        self.path = Path(path)
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "expired": 0, "writes": 0, "evicted": 0}
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tmdb_cache (
+                namespace  TEXT NOT NULL,
+                title      TEXT NOT NULL,
+                year       TEXT NOT NULL,
+                language   TEXT NOT NULL,
+                value      TEXT,
+                negative   INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used  REAL NOT NULL,
+                PRIMARY KEY (namespace, title, year, language)
+            )
+        """)
+
+    @staticmethod
+    def _key(namespace, title, year, language):
+        return (namespace, title, "" if year is None else str(year), language or "")
+
+    def get(self, namespace: str, title: str, year, language: str = ""):
+        """Return the cached value (None for a negative entry) or MISSING."""
+        key = self._key(namespace, title, year, language)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, negative, expires_at FROM tmdb_cache "
+                "WHERE namespace=? AND title=? AND year=? AND language=?", key
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return MISSING
+            value, negative, expires_at = row
+            if expires_at < now:
+                self._stats["expired"] += 1
+                return MISSING
+            self._conn.execute(
+                "UPDATE tmdb_cache SET last_used=? "
+                "WHERE namespace=? AND title=? AND year=? AND language=?", (now, *key)
+            )
+            if negative:
+                self._stats["negative_hits"] += 1
+                return None
+            self._stats["hits"] += 1
+            return json.loads(value)
+
+    def put(self, namespace: str, title: str, year, value, language: str = ""):
+        """Store a value. Pass None to record a negative ("No TMDB results") entry."""
+        key = self._key(namespace, title, year, language)
+        now = time.time()
+        negative = value is None
+        ttl = self.miss_ttl if negative else self.hit_ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tmdb_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, None if negative else json.dumps(value), int(negative), now, now + ttl, now),
+            )
+            self._stats["writes"] += 1
+
+    def evict(self) -> int:
+        """Drop expired and stale entries, then trim to max_entries by last use."""
+        now = time.time()
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM tmdb_cache WHERE expires_at < ? OR last_used < ?",
+                (now, now - self.max_age),
+            ).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM tmdb_cache WHERE rowid IN ("
+                "  SELECT rowid FROM tmdb_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self._stats["evicted"] += removed
+        return removed
+
+    def stats(self) -> dict:
+        """Counters for this process plus the current number of stored entries."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM tmdb_cache").fetchone()[0]
+            return {**self._stats, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_CACHE: TmdbCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def configure_cache(path: Path = DEFAULT_CACHE_PATH, **kwargs) -> TmdbCache:
+    """Open the shared cache at `path` (replacing any previously opened one)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is not None:
+            _CACHE.close()
+        _CACHE = TmdbCache(path, **kwargs)
+        return _CACHE
+
+
+def get_cache() -> TmdbCache:
+    """Return the shared cache, opening it at the default path on first use."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = TmdbCache()
+        return _CACHE
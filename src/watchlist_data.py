@@ -0,0 +1,181 @@
+"""
+Precomputed views of the offers dataset for the Streamlit app.
+
+Streamlit re-runs app.py on every widget interaction. `WatchlistData` does the
+expensive work once per dataset version (see `dataset_signature`): country,
+provider and source vocabularies, integer codes per offer row, the film each
+row belongs to, and per-row bitmasks of its sources and of the owned-service
+groups its provider belongs to. A filter combination is then a handful of numpy
+lookups and bitwise ANDs, and the per-movie aggregate is built from the rows
+that survive instead of a fresh groupby over the whole table.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+def dataset_signature(*paths: Path) -> tuple:
+    """Cache key for the dataset files: (name, mtime_ns, size) of each existing file."""
+    signature = []
+    for path in paths:
+        if path.exists():
+            stat = path.stat()
+            signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _vocab_codes(values: pd.Series):
+    """Sorted vocabulary and per-row integer codes for a string column."""
+    codes, uniques = pd.factorize(values.astype(str), sort=True)
+    return list(uniques), codes
+
+
+def _bitmask(flags: np.ndarray) -> np.ndarray:
+    """Pack a rows x flags bool matrix into rows x words uint64 masks (flag i -> bit i)."""
+    n_rows, n_flags = flags.shape
+    bits = np.zeros((n_rows, max(1, -(-n_flags // 64))), dtype=np.uint64)
+    for i in range(n_flags):
+        bits[flags[:, i], i // 64] |= np.uint64(1 << (i % 64))
+    return bits
+
+
+def _bits_for(vocab: list[str], selected) -> np.ndarray:
+    """1 x words mask with the bits of the selected vocabulary entries set."""
+    return _bitmask(np.isin(np.array(vocab, dtype=object), list(selected))[np.newaxis, :])
+
+
+def _any_bit(bits: np.ndarray, selection: np.ndarray) -> np.ndarray:
+    """Rows sharing at least one set bit with `selection`."""
+    if bits.shape[1] == 1:
+        return (bits[:, 0] & selection[0, 0]) != 0
+    return ((bits & selection) != 0).any(axis=1)
+
+
+def _source_matrix(sources: pd.Series):
+    """Split comma-separated source labels into (sorted names, rows x names bool matrix)."""
+    # Split each distinct label once; rows of the same film share the same string
+    codes, labels = pd.factorize(sources.fillna("").astype(str))
+    normalized = pd.Series(labels, dtype=object).str.replace(r"\s*,\s*", ",", regex=True).str.strip(" ,")
+    dummies = normalized.str.get_dummies(sep=",")
+    return list(dummies.columns), dummies.to_numpy(dtype=bool)[codes]
+
+
+class WatchlistData:
+    """
+    Read-only, filter-ready view of an offers DataFrame (CSV layout).
+    `owned_services` maps a label to canonical provider names (matched
+    case-insensitively), e.g. providers.OWNED_SERVICES.
+    """
+
+    def __init__(self, df: pd.DataFrame, owned_services: dict[str, list[str]] | None = None):
+        self.last_updated = df["last_updated"].max() if "last_updated" in df.columns else None
+        self.has_source = "source" in df.columns
+
+        # Films are ordered like groupby(["title", "year"]); rows without a year can't be shown
+        df = df.dropna(subset=["title", "year"]).reset_index(drop=True)
+        film_ids = df.groupby(["title", "year"], sort=True).ngroup().to_numpy()
+
+        self.countries, country_codes = _vocab_codes(df["country"])
+        self.services, provider_codes = _vocab_codes(df["provider"])
+        if self.has_source:
+            self.sources, source_matrix = _source_matrix(df["source"])
+        else:
+            self.sources, source_matrix = [], np.zeros((len(df), 0), dtype=bool)
+
+        # One row per offer. Duplicate offers (same film listed by several sources)
+        # keep the first row and the union of their sources.
+        key = (film_ids.astype(np.int64) * len(self.countries) + country_codes) * len(self.services) + provider_codes
+        first = ~pd.Series(key).duplicated(keep="first").to_numpy()
+        if not first.all():
+            offer_ids = pd.factorize(key)[0]
+            source_matrix = pd.DataFrame(source_matrix).groupby(offer_ids, sort=True).any().to_numpy()
+        self.film_ids = film_ids[first]
+        self.country_codes = country_codes[first]
+        self.provider_codes = provider_codes[first]
+        self.source_bits = _bitmask(source_matrix)
+
+        # Owned bits per provider code, then joined onto the offers by code
+        self.owned_labels = list(owned_services or {})
+        owned_names = [{n.casefold() for n in owned_services[label]} for label in self.owned_labels]
+        provider_owned = np.array(
+            [[name.casefold() in names for names in owned_names] for name in self.services],
+            dtype=bool,
+        ).reshape(len(self.services), len(self.owned_labels))
+        self.owned_bits = _bitmask(provider_owned)[self.provider_codes]
+
+        films = df.groupby(["title", "year"], sort=True).agg(poster_url=("poster_url", "first"),
+                                                             runtime=("runtime", "first"))
+        self.films = films.reset_index()
+        self._country_names = np.array(self.countries, dtype=object)
+        self._service_names = np.array(self.services, dtype=object)
+
+    def __len__(self):
+        return len(self.film_ids)
+
+    def _lookup(self, vocab: list[str], selected) -> np.ndarray:
+        """Boolean lookup table over a vocabulary for the selected names."""
+        return np.isin(np.array(vocab, dtype=object), list(selected))
+
+    def services_in(self, countries) -> list[str]:
+        """Providers with at least one offer in the given countries (sorted)."""
+        rows = self._lookup(self.countries, countries)[self.country_codes]
+        return [self.services[i] for i in np.unique(self.provider_codes[rows])]
+
+    def row_mask(self, countries, services, owned=None, sources=None, title_query: str = "") -> np.ndarray:
+        """
+        Offer rows in the selected countries and services, optionally limited to
+        providers in the `owned` service groups, to films from any of `sources`
+        and to titles matching `title_query` (case-insensitive regex, as before).
+        """
+        mask = self._lookup(self.countries, countries)[self.country_codes]
+        mask &= self._lookup(self.services, services)[self.provider_codes]
+        if owned:
+            mask &= _any_bit(self.owned_bits, _bits_for(self.owned_labels, owned))
+        if sources is not None and self.sources:
+            mask &= _any_bit(self.source_bits, _bits_for(self.sources, sources))
+        if title_query:
+            matches = self.films["title"].str.contains(title_query, case=False, na=False).to_numpy()
+            mask &= matches[self.film_ids]
+        return mask
+
+    def sources_in(self, mask: np.ndarray) -> list[str]:
+        """Sources that still have offers among the masked rows (sorted)."""
+        present = np.bitwise_or.reduce(self.source_bits[mask], axis=0)
+        return [s for i, s in enumerate(self.sources) if int(present[i // 64]) >> (i % 64) & 1]
+
+    def counts(self, mask: np.ndarray) -> tuple[int, int, int]:
+        """Distinct (movies, countries, providers) among the masked rows."""
+        return tuple(
+            int(np.count_nonzero(np.bincount(codes[mask], minlength=1)))
+            for codes in (self.film_ids, self.country_codes, self.provider_codes)
+        )
+
+    def matching_films(self, mask: np.ndarray) -> pd.DataFrame:
+        """Films with at least one masked row: film_id, title, year, poster_url, runtime."""
+        present = np.bincount(self.film_ids[mask], minlength=len(self.films)) > 0
+        return self.films[present].rename_axis("film_id").reset_index()
+
+    def movies(self, mask: np.ndarray, film_ids=None) -> pd.DataFrame:
+        """
+        Per-movie aggregate of the masked rows: title, year, poster_url, runtime,
+        and parallel `country` / `provider` lists of its offers. With `film_ids`,
+        only those films are aggregated, in that order.
+        """
+        if film_ids is not None:
+            film_ids = np.asarray(film_ids, dtype=np.int64)
+            mask = mask & np.isin(self.film_ids, film_ids)
+        rows = np.flatnonzero(mask)
+        rows = rows[np.argsort(self.film_ids[rows], kind="stable")]
+        present, starts = np.unique(self.film_ids[rows], return_index=True)
+        movies = self.films.iloc[present].reset_index(drop=True)
+        if len(rows):
+            countries = np.split(self._country_names[self.country_codes[rows]], starts[1:])
+            providers = np.split(self._service_names[self.provider_codes[rows]], starts[1:])
+        else:
+            countries = providers = []
+        movies.insert(2, "country", [c.tolist() for c in countries])
+        movies.insert(3, "provider", [p.tolist() for p in providers])
+        if film_ids is not None:
+            movies = movies.set_axis(present).loc[film_ids[np.isin(film_ids, present)]].reset_index(drop=True)
+        return movies